@@ -1,15 +1,92 @@
+import concurrent.futures
+import functools
+import hashlib
+import hmac
+import io
 import json
+import math
 import os
+import random
+import re
+import secrets
+import threading
+import time
+from array import array
+from collections import OrderedDict
 from datetime import date, datetime, timedelta
 
-from flask import Flask, render_template, jsonify, request
-
-app = Flask(__name__)
-app.config["TEMPLATES_AUTO_RELOAD"] = True
-app.jinja_env.auto_reload = True
+import click
+from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    abort,
+    current_app,
+    g,
+    has_request_context,
+    render_template,
+    jsonify,
+    request,
+    send_from_directory,
+    stream_with_context,
+)
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from backup import DEFAULT_SCOPE, BackupManager
+from changefeed import ChangeNotifier
+from daycalendar import CANT_EX_PREFIX, STATUS_KINDS, DayCalendar, cant_ex_lane, encode_days
+from export import FORMATS as EXPORT_FORMATS, ImportFormatError, decode as decode_import, encode as encode_export, guess_format
+from history import FLAG_TYPE, REPS_TYPE, STATUS_CODES, STATUS_INDEX, DayHistory, compact_columns
+from leaderboard import LeaderboardIndex
+from metrics import Metrics
+from projection import ENGINE as PROJECTION_ENGINE, every, project
+from ratelimit import RateLimiter, parse_rate
+import serializer
+from storage import JsonFileStore, SqliteStore, StateConflict, clone_state
+
+# Routen und CLI-Befehle hängen am Blueprint, die App baut create_app() (unten)
+bp = Blueprint("workout", __name__, cli_group=None)
+
+# Profil der Modul-App (gunicorn.conf.py setzt "production")
+PROFILE = os.getenv("WORKOUT_PROFILE", "development").lower()
 
 STATE_FILE = "state.json"
 
+# Speicher-Modus: "file" (ganzer State pro Änderung), "journal" (Append-Log + Snapshot)
+# oder "sqlite" (normalisierte Tabellen, WAL)
+STORAGE_MODE = os.getenv("WORKOUT_STORAGE", "file").lower()
+JOURNAL_COMPACT_BYTES = int(os.getenv("WORKOUT_JOURNAL_COMPACT_BYTES", str(256 * 1024)))
+JOURNAL_FSYNC_MS = int(os.getenv("WORKOUT_JOURNAL_FSYNC_MS", "50"))
+SQLITE_FILE = os.getenv("WORKOUT_SQLITE_PATH", "state.db")
+GROUPS_DIR = os.getenv("WORKOUT_GROUPS_DIR", "groups")
+GROUP_CACHE_SIZE = int(os.getenv("WORKOUT_GROUP_CACHE", "256"))
+GROUPS_AUTOCREATE = os.getenv("WORKOUT_GROUPS_AUTOCREATE", "0") == "1"
+GROUP_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+COMMIT_RETRIES = 5         # Reducer-Wiederholungen bei Versionskonflikt
+STATE_MEMO_SIZE = int(os.getenv("WORKOUT_STATE_MEMO", "512"))
+STREAM_POLL_MS = int(os.getenv("WORKOUT_STREAM_POLL_MS", "200"))         # Watcher für andere Worker
+STREAM_HEARTBEAT_S = 15                                                  # Keep-alive-Kommentar
+STREAM_MAX_SECONDS = int(os.getenv("WORKOUT_STREAM_MAX_SECONDS", "300"))  # danach reconnect
+STREAM_BUSY_RETRY_MS = (20000, 40000)                                    # Reconnect, wenn kein Platz frei
+NOTIFY_FILE = "state.notify"
+METRICS_DIR = os.getenv("WORKOUT_METRICS_DIR", "metrics")   # Worker-Dateien für /metrics
+METRICS_TOKEN = os.getenv("WORKOUT_METRICS_TOKEN", "")       # Bearer-Token für /metrics und /api/cache-stats; leer = aus
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("WORKOUT_IDEMPOTENCY_KEYS", "256"))       # pro Gruppe
+IDEMPOTENCY_TTL_S = int(os.getenv("WORKOUT_IDEMPOTENCY_TTL_S", str(24 * 3600)))
+AUTO_ROLLOVER = os.getenv("WORKOUT_AUTO_ROLLOVER", "0") == "1"  # Tag folgt dem Kalender statt /api/nextday
+ROLLOVER_POLICY = "skip" if os.getenv("WORKOUT_ROLLOVER_POLICY", "open").lower() == "skip" else "open"  # verpasste Tage
+FASTFORWARD_MAX_DAYS = 3650
+BACKUP_DIR = os.getenv("WORKOUT_BACKUP_DIR", "backups")
+BACKUP_INTERVAL_S = int(os.getenv("WORKOUT_BACKUP_INTERVAL_S", "600"))      # 0 = keine Online-Backups
+BACKUP_KEEP = tuple(int(n) for n in os.getenv("WORKOUT_BACKUP_KEEP", "6,24,7,8").split(","))  # letzte, Stunden, Tage, Wochen
+LEADERBOARD = os.getenv("WORKOUT_LEADERBOARD", "0") == "1"                # /api/leaderboard über alle Instanzen
+LEADERBOARD_POLL_S = float(os.getenv("WORKOUT_LEADERBOARD_POLL_S", "5"))  # mtime-Prüfung der State-Dateien
+LEADERBOARD_MAX_TOP = 100
+RATE_LIMIT_FILE = os.getenv("WORKOUT_RATE_LIMIT_FILE", "ratelimit.bin")  # geteilte Buckets aller Worker (mmap)
+COMPRESS = os.getenv("WORKOUT_COMPRESS", "1") != "0"                      # gzip/Brotli für /api/-Antworten
+COMPRESS_MIN_BYTES = int(os.getenv("WORKOUT_COMPRESS_MIN_BYTES", "1024"))  # kleinere bleiben unkomprimiert
+
 # Namen können hier leicht mit Umgebungsvariablen angepasst werden
 DEFAULT_MALE_NAME = os.getenv("WORKOUT_MALE_NAME", "Person A")
 DEFAULT_FEMALE_NAME = os.getenv("WORKOUT_FEMALE_NAME", "Person B")
@@ -21,6 +98,8 @@ CANT_MIN_DAYS = 10         # "Ich kann nicht mehr!" höchstens alle 10 Tage
 CANT_REDUCTION = 10        # Reps -10 bei "Ich kann nicht mehr!"
 START_REPS = 15            # Startwiederholungen
 CANT_PASSWORD = os.getenv("WORKOUT_CANT_PASSWORD", "reset")
+# Admin-Aktionen (Fast-Forward, Import); leer = ausgeschaltet
+ADMIN_PASSWORD = os.getenv("WORKOUT_ADMIN_PASSWORD", "")
 
 # Mapping zwischen Frontend-Rollen und internem State
 ROLE_TO_INTERNAL = {
@@ -32,6 +111,16 @@ INTERNAL_TO_ROLE = {
     "female": "frau",
 }
 
+# Mitglieder einer Gruppe: Standard ist das klassische Paar, Gruppen können
+# MIN_MEMBERS..MAX_MEMBERS eigene Mitglieder haben. "role" ist der View-/API-Name,
+# "phrase" wählt die Sprüche-Variante (static/phrases/*_male / *_female).
+DEFAULT_MEMBERS = [
+    {"id": internal, "role": role, "phrase": internal}
+    for role, internal in ROLE_TO_INTERNAL.items()
+]
+MIN_MEMBERS = 2
+MAX_MEMBERS = 50
+
 # Mapping zwischen Frontend-Übungsnamen und internem State
 EXTERNAL_TO_INTERNAL_EXERCISE = {
     "crunches": "situps",
@@ -66,74 +155,80 @@ def format_date_swiss_long(d: date) -> str:
     return f"{d.day}. {MONTH_NAMES_DE[d.month - 1]} {d.year}"
 
 
-def load_state():
-    """State aus Datei laden oder Initialstate erzeugen."""
-    if not os.path.exists(STATE_FILE):
-        start = _today()
-        state = {
-            "day": 1,
-            "start_date": start.isoformat(),
-            "reps": {
-                "male": {ex: START_REPS for ex in EXERCISES},
-                "female": {ex: START_REPS for ex in EXERCISES},
-            },
-            "done": {
-                "male": {ex: False for ex in EXERCISES},
-                "female": {ex: False for ex in EXERCISES},
-            },
-            "overall": {
-                "male": {ex: 0 for ex in EXERCISES},
-                "female": {ex: 0 for ex in EXERCISES},
-            },
-            "skip": {"male": [], "female": []},
-            "injured": {"male": [], "female": []},
-            "cant": {"male": [], "female": []},
-            "cheater": {"male": [], "female": []},
-            # NEW: "heute sport gemacht" (pro Person / pro Tag)
-            "sport": {"male": [], "female": []},
-        }
-        save_state(state)
+def _new_epoch() -> str:
+    return secrets.token_hex(4)
+
+
+def _initial_state(members=None):
+    members = [dict(m) for m in (members or DEFAULT_MEMBERS)]
+    ids = [m["id"] for m in members]
+    start = _today()
+    state = {
+        "schema_version": SCHEMA_VERSION,
+        # zufällig pro neu angelegtem State: ETags und Event-IDs bleiben
+        # eindeutig, auch wenn die Version nach Neuanlage wieder bei 1 beginnt
+        "epoch": _new_epoch(),
+        "day": 1,
+        "start_date": start.isoformat(),
+        "version": 0,
+        "members": members,
+        "reps": {p: {ex: START_REPS for ex in EXERCISES} for p in ids},
+        "done": {p: {ex: False for ex in EXERCISES} for p in ids},
+        "overall": {p: {ex: 0 for ex in EXERCISES} for p in ids},
+        # heute beim Abhaken gutgeschriebene Reps (0 = offen); ein späteres
+        # Cant ändert nur reps, overall und Historie folgen diesem Wert
+        "credited": {p: {ex: 0 for ex in EXERCISES} for p in ids},
+        # Status-Tage (skip/injured/cant/cheater/sport/cant_ex.*) als Bitset-Lanes,
+        # inkl. "heute sport gemacht" (pro Person / pro Tag)
+        "calendar": {p: {} for p in ids},
+        # abgeschlossene Tage, spaltenweise (siehe history.py)
+        "history": {},
+    }
+    _recount_today(state)
+    return state
+
+
+def _normalize_state(state):
+    """
+    State beim Laden auf das aktuelle Schema bringen. Aktuelle States
+    (schema_version == SCHEMA_VERSION) werden unverändert durchgereicht –
+    migriert wird nur, was noch nicht mit `flask migrate` bzw. beim Start
+    zurückgeschrieben wurde.
+    """
+    if state.get("schema_version") == SCHEMA_VERSION:
         return state
+    return migrate_state(state)
+
+
+def migrate_state(state):
+    """Alle noch fehlenden Schritte aus MIGRATIONS der Reihe nach anwenden."""
+    current = int(state.get("schema_version") or 0)
+    if current > SCHEMA_VERSION:
+        raise ValueError(f"State hat Schema {current}, diese Version kennt nur bis {SCHEMA_VERSION}.")
+    for version, step in MIGRATIONS:
+        if current < version:
+            step(state)
+    state["schema_version"] = SCHEMA_VERSION
+    if state.get("today", {}).get("day") != state["day"]:
+        _recount_today(state)
+    return state
 
-    with open(STATE_FILE, "r", encoding="utf-8") as f:
-        state = json.load(f)
 
-    # Backwards-Kompatibilität: fehlende Felder ergänzen
+def _migrate_base_fields(state):
+    """Schema 1: start_date, version, members und vollständige reps/done/overall-Blöcke."""
     if "start_date" not in state:
-        try:
-            d = int(state.get("day", 1))
-        except (TypeError, ValueError):
-            d = 1
-        start = _today() - timedelta(days=max(d - 1, 0))
-        state["start_date"] = start.isoformat()
-
-    if "reps" not in state:
-        state["reps"] = {
-            "male": {ex: START_REPS for ex in EXERCISES},
-            "female": {ex: START_REPS for ex in EXERCISES},
-        }
+        state["start_date"] = _fallback_start_date(state).isoformat()
 
-    if "done" not in state:
-        state["done"] = {
-            "male": {ex: False for ex in EXERCISES},
-            "female": {ex: False for ex in EXERCISES},
-        }
+    state.setdefault("version", 0)
 
-    if "overall" not in state:
-        state["overall"] = {
-            "male": {ex: 0 for ex in EXERCISES},
-            "female": {ex: 0 for ex in EXERCISES},
-        }
+    if "members" not in state:
+        state["members"] = [dict(m) for m in DEFAULT_MEMBERS]
 
-    for key in ["skip", "injured", "cant", "cheater", "sport"]:
-        if key not in state:
-            state[key] = {"male": [], "female": []}
-        else:
-            for person in ["male", "female"]:
-                state[key].setdefault(person, [])
+    for key in ["reps", "done", "overall"]:
+        state.setdefault(key, {})
 
-    # fehlende Exercises ergänzen
-    for person in ["male", "female"]:
+    # fehlende Personen/Exercises ergänzen
+    for person in member_ids(state):
         state["reps"].setdefault(person, {})
         state["done"].setdefault(person, {})
         state["overall"].setdefault(person, {})
@@ -142,25 +237,321 @@ def load_state():
             state["done"][person].setdefault(ex, False)
             state["overall"][person].setdefault(ex, 0)
 
-    return state
 
+def _migrate_calendar(state):
+    """Schema 2: Tageslisten als Bitset-Lanes in state["calendar"]."""
+    if "calendar" not in state:
+        _migrate_day_lists(state)
+    for person in member_ids(state):
+        state["calendar"].setdefault(person, {})
+
+
+def _migrate_history(state):
+    """Schema 3: spaltenweise Tageshistorie."""
+    state.setdefault("history", {})
+
+
+def _migrate_start_date(state):
+    """Schema 4: unlesbares start_date ersetzen (früher beim Lesen in calculate_current_date gespeichert)."""
+    try:
+        _parse_start_date(state["start_date"])
+    except (KeyError, TypeError, ValueError):
+        state["start_date"] = _fallback_start_date(state).isoformat()
+
+
+def _migrate_credited(state):
+    """Schema 5: gutgeschriebene Reps von heute (bisher implizit die aktuellen Reps)."""
+    credited = state.setdefault("credited", {})
+    for person in member_ids(state):
+        per_ex = credited.setdefault(person, {})
+        for ex in EXERCISES:
+            per_ex.setdefault(ex, state["reps"][person][ex] if state["done"][person][ex] else 0)
+
+
+def _migrate_epoch(state):
+    """Schema 6: Epoche für ETags/Event-IDs (siehe _initial_state)."""
+    state.setdefault("epoch", _new_epoch())
+
+
+# Schema-Version -> Schritt, der einen State der Vorversion dorthin bringt.
+# Neue Felder: Schritt anhängen und SCHEMA_VERSION erhöhen. Schritte müssen
+# auch auf States laufen, die das Feld schon haben (Dateien vor schema_version).
+MIGRATIONS = (
+    (1, _migrate_base_fields),
+    (2, _migrate_calendar),
+    (3, _migrate_history),
+    (4, _migrate_start_date),
+    (5, _migrate_credited),
+    (6, _migrate_epoch),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def _migrate_day_lists(state):
+    """Alte Tageslisten (skip/injured/cant/cheater/sport/cant_ex) in Kalender-Lanes überführen."""
+    cal = state["calendar"] = {}
+    for kind in STATUS_KINDS:
+        for person, days in (state.pop(kind, None) or {}).items():
+            lanes = cal.setdefault(person, {})
+            if days:
+                lanes[kind] = encode_days(days)
+    for person, per_ex in (state.pop("cant_ex", None) or {}).items():
+        lanes = cal.setdefault(person, {})
+        for ex, days in (per_ex or {}).items():
+            if days:
+                lanes[cant_ex_lane(ex)] = encode_days(days)
+    # nie geschriebener Schlüssel aus _last_cant_ex_day()
+    state.pop("cant_exercise", None)
+
+
+def member_ids(state):
+    return [m["id"] for m in state["members"]]
+
+
+def _member_by_role(state, role: str):
+    for m in state["members"]:
+        if m["role"] == role:
+            return m
+    return None
+
+
+def _role_label(state, internal: str) -> str:
+    for m in state["members"]:
+        if m["id"] == internal:
+            return m["role"]
+    return INTERNAL_TO_ROLE.get(internal, internal)
+
+
+def _phrase_suffix(state, internal: str) -> str:
+    for m in state["members"]:
+        if m["id"] == internal:
+            return m.get("phrase", "male")
+    return "male"
+
+
+# Zähler und Latenzen pro Worker, /metrics summiert über alle Worker (siehe metrics.py)
+METRICS = Metrics(
+    METRICS_DIR,
+    help_texts={
+        "workout_http_requests_total": "Requests nach Endpoint, Methode und Status.",
+        "workout_http_request_seconds": "Dauer der Requests nach Endpoint.",
+        "workout_stage_seconds": "Dauer einzelner Stufen (load, update, write, build, render).",
+        "workout_state_bytes": "Grösse des States der Einzel-Instanz auf der Platte.",
+        "workout_group_state_bytes": "Summe der State-Grössen aller Gruppen auf der Platte.",
+        "workout_groups": "Anzahl Gruppen-Verzeichnisse.",
+        "workout_rate_limited_total": "Mit 429 abgewiesene Requests nach Budget (read, write, password).",
+        "workout_backup_failures_total": "Fehlgeschlagene Backup-Runden im Hintergrund.",
+        "workout_backup_last_success_seconds": "Unix-Zeit der letzten vollständigen Backup-Runde.",
+    },
+)
+
+# Token-Buckets für alle Worker (siehe ratelimit.py), Datei wird beim ersten Check eingeblendet
+RATE_LIMITER = RateLimiter(RATE_LIMIT_FILE)
+
+
+def _observe_stage(stage: str, seconds: float):
+    METRICS.observe("workout_stage_seconds", seconds, (("stage", stage),))
+
+
+def _timed(stage: str):
+    """Decorator: Laufzeit als workout_stage_seconds{stage=...} erfassen."""
+    labels = (("stage", stage),)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                METRICS.observe("workout_stage_seconds", time.perf_counter() - t0, labels)
+        return wrapper
+
+    return decorator
+
+
+def _compact_snapshot(state):
+    """Snapshot-Form des States: Historie-Spalten je ein Block (siehe history.py)."""
+    history = state.get("history")
+    if not history or not history.get("columns"):
+        return state
+    return {**state, "history": compact_columns(history)}
+
+
+def _make_store(base_dir=""):
+    """StateStore gemäss WORKOUT_STORAGE (file / journal / sqlite) in base_dir."""
+    if STORAGE_MODE == "sqlite":
+        store = SqliteStore(
+            os.path.join(base_dir, SQLITE_FILE),
+            _initial_state,
+            _normalize_state,
+            commit_retries=COMMIT_RETRIES,
+        )
+    else:
+        store = JsonFileStore(
+            os.path.join(base_dir, STATE_FILE),
+            _initial_state,
+            _normalize_state,
+            journal=(STORAGE_MODE == "journal"),
+            compact_bytes=JOURNAL_COMPACT_BYTES,
+            fsync_ms=JOURNAL_FSYNC_MS,
+            commit_retries=COMMIT_RETRIES,
+            compact=_compact_snapshot,
+        )
+    store.observe = _observe_stage
+    # Änderungssignal für /api/stream (auch an die anderen Worker)
+    store.notifier = ChangeNotifier(
+        os.path.join(base_dir, NOTIFY_FILE), poll_interval=STREAM_POLL_MS / 1000
+    )
+    return store
+
+
+# Store der klassischen Einzel-Instanz (Routen ohne /g/<group>)
+STORE = _make_store()
+
+# Fertig serialisierte /api/state-Antworten pro (Gruppe, Version, Rolle), pro Worker
+_state_memo = OrderedDict()
+_state_memo_lock = threading.Lock()
+
+# Mehrere Haushalte: ein Shard pro Gruppe unter GROUPS_DIR/<group>/, pro Worker
+# eine LRU der zuletzt benutzten Stores (inkl. deren gecachtem State).
+_group_stores = OrderedDict()
+_group_stores_lock = threading.Lock()
+
+
+def _group_ids():
+    """IDs aller Gruppen-Verzeichnisse unter GROUPS_DIR."""
+    try:
+        names = sorted(os.listdir(GROUPS_DIR))
+    except FileNotFoundError:
+        return []
+    return [name for name in names if is_valid_group(name) and os.path.isdir(group_dir(name))]
+
+
+def _instance_sources():
+    """(Scope, Store-Fabrik) für die Einzel-Instanz und alle Gruppen-Verzeichnisse (Backups, Rangliste)."""
+    sources = [(DEFAULT_SCOPE, _make_store)]
+    for group in _group_ids():
+        sources.append((group, functools.partial(_make_store, group_dir(group))))
+    return sources
+
+
+# Online-Backups im Hintergrund (siehe backup.py), Thread startet mit dem ersten Request
+BACKUPS = BackupManager(BACKUP_DIR, _instance_sources, interval=BACKUP_INTERVAL_S, keep=BACKUP_KEEP)
+BACKUPS.on_failure = lambda exc: METRICS.inc("workout_backup_failures_total")
+
+
+def _leaderboard_values(state):
+    """Einträge für die Rangliste: pro Mitglied overall und reps je Übung und als Summe ("all")."""
+    people = []
+    for m in state["members"]:
+        p = m["id"]
+        values = {}
+        for metric in ("overall", "reps"):
+            block = state[metric][p]
+            for ex in EXERCISES:
+                values[(INTERNAL_TO_EXTERNAL_EXERCISE[ex], metric)] = int(block[ex])
+            values[("all", metric)] = sum(int(block[ex]) for ex in EXERCISES)
+        people.append((m["role"], {"name": m["name"]} if m.get("name") else {}, values))
+    return people
+
+
+# Rangliste über alle Instanzen (siehe leaderboard.py), wird mit dem ersten Abruf aufgebaut
+LEADERBOARD_INDEX = LeaderboardIndex(_instance_sources, _leaderboard_values, interval=LEADERBOARD_POLL_S)
+
+
+def group_dir(group: str) -> str:
+    return os.path.join(GROUPS_DIR, group)
+
+
+def is_valid_group(group: str) -> bool:
+    return bool(GROUP_ID_RE.match(group or ""))
+
+
+def get_store(group=None):
+    """Store einer Gruppe (None = Einzel-Instanz) aus der LRU holen bzw. öffnen."""
+    if group is None:
+        return STORE
+    with _group_stores_lock:
+        store = _group_stores.get(group)
+        if store is not None:
+            _group_stores.move_to_end(group)
+            return store
+        os.makedirs(group_dir(group), exist_ok=True)
+        store = _make_store(group_dir(group))
+        _group_stores[group] = store
+        while len(_group_stores) > GROUP_CACHE_SIZE:
+            _, evicted = _group_stores.popitem(last=False)
+            evicted.close()
+        return store
 
-def save_state(state):
-    """State mit einfacher, aber sicherer Methode speichern."""
-    tmp_file = STATE_FILE + ".tmp"
-    with open(tmp_file, "w", encoding="utf-8") as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
-    os.replace(tmp_file, STATE_FILE)
+
+def _current_group():
+    return g.get("group") if has_request_context() else None
+
+
+@_timed("load")
+def load_state(group=None):
+    """State aus dem Store laden oder Initialstate erzeugen (nicht mutieren, siehe StateStore.load())."""
+    return get_store(group or _current_group()).load()
+
+
+def peek_state(group=None):
+    """Gecachter State ohne Kopie (nicht mutieren!)."""
+    return get_store(group or _current_group()).peek()
+
+
+@_timed("update")
+def update_state(reducer, expected_version=None, group=None):
+    """Reducer mit Compare-and-Swap committen, siehe StateStore.update()."""
+    store = get_store(group or _current_group())
+    committed = []
+
+    def tracked(state):
+        result, commit = reducer(state)
+        committed.append(commit)
+        return result, commit
+
+    state, result = store.update(tracked, expected_version)
+    if committed and committed[-1]:
+        store.notifier.publish(state["version"])
+    return state, result
+
+
+def state_cache_stats():
+    """Hit/Miss-Zähler des State-Caches dieses Workers (alle geladenen Stores)."""
+    stats = STORE.cache_stats()
+    with _group_stores_lock:
+        stores = list(_group_stores.values())
+    for store in stores:
+        group_stats = store.cache_stats()
+        stats["hits"] += group_stats["hits"]
+        stats["misses"] += group_stats["misses"]
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+    stats["groups_loaded"] = len(stores)
+    stats["state_memo"] = len(_state_memo)
+    return stats
+
+
+def _fallback_start_date(state) -> date:
+    """start_date so, dass der aktuelle Tag heute ist (fehlendes/kaputtes start_date)."""
+    try:
+        d = int(state.get("day", 1))
+    except (TypeError, ValueError):
+        d = 1
+    return _today() - timedelta(days=max(d - 1, 0))
 
 
 def calculate_current_date(state):
-    """Berechnet Datum & Wochentag für den aktuellen Tag basierend auf start_date und day."""
+    """
+    Berechnet Datum & Wochentag für den aktuellen Tag basierend auf start_date
+    und day. Liest nur; ein kaputtes start_date repariert die Migration.
+    """
     try:
-        start = datetime.strptime(state["start_date"], "%Y-%m-%d").date()
-    except Exception:
-        start = _today()
-        state["start_date"] = start.isoformat()
-        save_state(state)
+        start = _parse_start_date(state["start_date"])
+    except (KeyError, TypeError, ValueError):
+        start = _fallback_start_date(state)
 
     day_index = max(int(state.get("day", 1)), 1) - 1
     current = start + timedelta(days=day_index)
@@ -177,170 +568,157 @@ def calculate_current_date(state):
     return current, weekday
 
 
+@functools.lru_cache(maxsize=1024)
+def _parse_start_date(raw: str) -> date:
+    return datetime.strptime(raw, "%Y-%m-%d").date()
+
+
+def calendar_day(state) -> int:
+    """Tag laut Kalender (start_date ist Tag 1) – für den automatischen Tageswechsel."""
+    try:
+        start = _parse_start_date(state["start_date"])
+    except (KeyError, TypeError, ValueError):
+        return int(state["day"])
+    return (_today() - start).days + 1
+
+
+def calendar(state, person_internal: str) -> DayCalendar:
+    """Tageskalender (Status-Lanes) einer Person, siehe daycalendar.py."""
+    return DayCalendar(state["calendar"].setdefault(person_internal, {}))
+
+
 def is_sport_done_today(state, person_internal: str) -> bool:
+    return calendar(state, person_internal).has("sport", state["day"])
+
+
+def _person_day_flags(state, person_internal: str, cal: DayCalendar | None = None):
+    """(done_all, closed) einer Person für den aktuellen Tag; Sport zählt als done_all."""
     day = state["day"]
-    return day in state.get("sport", {}).get(person_internal, [])
+    cal = cal or calendar(state, person_internal)
+    done_all = cal.has("sport", day) or all(
+        state["done"][person_internal].get(ex, False) for ex in EXERCISES
+    )
+    closed = (
+        done_all
+        or cal.has("skip", day)
+        or cal.has("injured", day)
+        or cal.has("cant", day)
+    )
+    return done_all, closed
 
 
 def is_day_closed_for_person(state, person_internal: str) -> bool:
     """Prüft, ob eine Person den Tag abgeschlossen hat."""
-    day = state["day"]
-    done_all = all(state["done"][person_internal].get(ex, False) for ex in EXERCISES)
-    skipped = day in state["skip"].get(person_internal, [])
-    injured = day in state["injured"].get(person_internal, [])
-    cant = day in state["cant"].get(person_internal, [])
-    sport = is_sport_done_today(state, person_internal)
-    return done_all or skipped or injured or cant or sport
+    return _person_day_flags(state, person_internal)[1]
 
 
-def _normalize_role(role_raw: str) -> str:
-    role = (role_raw or "").lower()
-    if role not in ROLE_TO_INTERNAL:
-        role = "mann"
-    return role
+def _recount_today(state):
+    """Tagesflags aller Mitglieder neu aufbauen (nur bei Tageswechsel/Normalisierung)."""
+    state["today"] = {
+        "day": state["day"],
+        "done": {},
+        "closed": {},
+        "done_count": 0,
+        "closed_count": 0,
+    }
+    for person in member_ids(state):
+        _update_today(state, person)
 
 
-def _build_totals(state):
-    """Aggregierte Totals für Frontend aufbereiten."""
-    totals = {}
-    for internal in ["male", "female"]:
-        role_label = INTERNAL_TO_ROLE[internal]
-        overall = state["overall"].get(internal, {})
-        skip_days = len(state["skip"].get(internal, []))
-        cant_days = len(state["cant"].get(internal, []))
-        injured_days = len(state["injured"].get(internal, []))
-        sport_days = len(state.get("sport", {}).get(internal, []))
-
-        totals[role_label] = {
-            "crunches": int(overall.get("situps", 0)),
-            "pushups": int(overall.get("pushups", 0)),
-            "squats": int(overall.get("squats", 0)),
-            "skip_days": int(skip_days),
-            "cant_days": int(cant_days),
-            "injured_days": int(injured_days),
-            "sport_days": int(sport_days),
-        }
-    return totals
-
-
-def _build_reps_today(state):
-    reps_today = {}
-    for internal in ["male", "female"]:
-        role_label = INTERNAL_TO_ROLE[internal]
-        reps = state["reps"].get(internal, {})
-        reps_today[role_label] = {
-            "crunches": int(reps.get("situps", START_REPS)),
-            "pushups": int(reps.get("pushups", START_REPS)),
-            "squats": int(reps.get("squats", START_REPS)),
-        }
-    return reps_today
+def _update_today(state, person_internal: str):
+    """
+    Tagesflags einer Person nachführen und done_count/closed_count inkrementell
+    anpassen. So sind /api/nextday und "alle fertig" O(1) statt eines Scans
+    über alle Mitglieder.
+    """
+    today = state["today"]
+    done_all, closed = _person_day_flags(state, person_internal)
+    for key, value in (("done", done_all), ("closed", closed)):
+        previous = today[key].get(person_internal, False)
+        today[key][person_internal] = value
+        if value != previous:
+            today[key + "_count"] += 1 if value else -1
 
 
-def _build_status(state):
-    day = state["day"]
-    status = {}
-    for internal in ["male", "female"]:
-        role_label = INTERNAL_TO_ROLE[internal]
-        done = state["done"].get(internal, {})
+def _normalize_role(state, role_raw: str) -> str:
+    """Gültige Rolle dieser Gruppe; unbekannte Rollen fallen auf das erste Mitglied."""
+    role = (role_raw or "").lower()
+    if _member_by_role(state, role) is None:
+        role = state["members"][0]["role"]
+    return role
 
-        # "heute sport gemacht" soll UI-mässig wie "alle Übungen erledigt" wirken
-        sport_today = day in state.get("sport", {}).get(internal, [])
-
-        status[role_label] = {
-            # crunches in UI corresponds to internal "situps" in state
-            "crunches_done": True if sport_today else bool(done.get("situps", False)),
-            "pushups_done":  True if sport_today else bool(done.get("pushups", False)),
-            "squats_done":   True if sport_today else bool(done.get("squats", False)),
-
-            # per-exercise cant flags (today)
-            "cant_crunches": _is_cant_exercise_today(state, internal, "situps"),
-            "cant_pushups":  _is_cant_exercise_today(state, internal, "pushups"),
-            "cant_squats":   _is_cant_exercise_today(state, internal, "squats"),
-
-            "skip":    day in state.get("skip", {}).get(internal, []),
-            "injured": day in state.get("injured", {}).get(internal, []),
-            "cant":    day in state.get("cant", {}).get(internal, []),
-            "sport":   bool(sport_today),
-        }
-    return status
 
-def _last_cant_ex_day(state, internal_person: str, internal_exercise: str):
-    """
-    Returns the most recent day number when per-exercise 'cant' was used for the given
-    person+exercise. If no entry exists, returns None.
+def _role_to_internal(state, role_view: str) -> str:
+    m = _member_by_role(state, role_view)
+    return m["id"] if m is not None else state["members"][0]["id"]
+
 
-    Expected state shape (tolerant):
-      state["cant_exercise"][internal_person][internal_exercise] = [day, day, ...]
+def _build_member_view(state, internal: str):
     """
-    ce = state.get("cant_exercise", {}) or {}
-    per_person = ce.get(internal_person, {}) or {}
-    days = per_person.get(internal_exercise, []) or []
-    if not days:
-        return None
-    try:
-        return max(int(d) for d in days)
-    except Exception:
-        # be tolerant if legacy/non-int values exist
-        try:
-            return max(days)
-        except Exception:
-            return None
+    Alle Frontend-Daten einer Person in einem Durchgang über ihren Kalender:
+    (totals, reps_today, status, can-Flags).
+    """
+    day = state["day"]
+    cal = calendar(state, internal)
+    done = state["done"].get(internal, {})
+    reps = state["reps"].get(internal, {})
+    overall = state["overall"].get(internal, {})
+
+    sport_today = cal.has("sport", day)
+    skip_today = cal.has("skip", day)
+    injured_today = cal.has("injured", day)
+    cant_today = cal.has("cant", day)
+    done_all = sport_today or all(done.get(ex, False) for ex in EXERCISES)
+    closed = done_all or skip_today or injured_today or cant_today
+
+    totals = {
+        "crunches": int(overall.get("situps", 0)),
+        "pushups": int(overall.get("pushups", 0)),
+        "squats": int(overall.get("squats", 0)),
+        "skip_days": cal.count("skip"),
+        "cant_days": cal.count("cant"),
+        "injured_days": cal.count("injured"),
+        "sport_days": cal.count("sport"),
+    }
+    reps_today = {
+        "crunches": int(reps.get("situps", START_REPS)),
+        "pushups": int(reps.get("pushups", START_REPS)),
+        "squats": int(reps.get("squats", START_REPS)),
+    }
+    status = {
+        # crunches in UI corresponds to internal "situps" in state
+        # "heute sport gemacht" soll UI-mässig wie "alle Übungen erledigt" wirken
+        "crunches_done": True if sport_today else bool(done.get("situps", False)),
+        "pushups_done":  True if sport_today else bool(done.get("pushups", False)),
+        "squats_done":   True if sport_today else bool(done.get("squats", False)),
+
+        # per-exercise cant flags (today)
+        "cant_crunches": cal.has(cant_ex_lane("situps"), day),
+        "cant_pushups":  cal.has(cant_ex_lane("pushups"), day),
+        "cant_squats":   cal.has(cant_ex_lane("squats"), day),
+
+        "skip":    skip_today,
+        "injured": injured_today,
+        "cant":    cant_today,
+        "sport":   sport_today,
+    }
 
+    # Skip/Cant: Abstand seit letzter Nutzung und Tag noch offen
+    last_skip = cal.last("skip")
+    last_cant = cal.last("cant")
+    can = {
+        "skip": not closed and (last_skip is None or day - last_skip >= SKIP_MIN_DAYS),
+        "cant": not closed and (last_cant is None or day - last_cant >= CANT_MIN_DAYS),
+        # Sport: toggeln (undo) erlaubt das Frontend selbst, sonst nur bei offenem Tag
+        "sport": sport_today or not closed,
+        # per-exercise cant availability (cooldown per exercise)
+        "cant_ex": {},
+    }
+    for ui_ex, internal_ex in (("crunches", "situps"), ("pushups", "pushups"), ("squats", "squats")):
+        last_day = cal.last(cant_ex_lane(internal_ex))
+        can["cant_ex"][ui_ex] = last_day is None or day - last_day >= CANT_MIN_DAYS
 
-def _build_can_flags(state):
-    """Berechnet, ob skip/cant/sport laut Regeln erlaubt wäre."""
-    day = state["day"]
-    can_skip = {}
-    can_cant = {}
-    can_sport = {}
-
-    for internal in ["male", "female"]:
-        role_label = INTERNAL_TO_ROLE[internal]
-
-        # Skip: Abstand seit letztem Skip
-        skip_days = state["skip"].get(internal, [])
-        last_skip = max(skip_days) if skip_days else None
-        allow_skip = True
-        if last_skip is not None and (day - last_skip) < SKIP_MIN_DAYS:
-            allow_skip = False
-        if is_day_closed_for_person(state, internal):
-            allow_skip = False
-
-        # Cant: Abstand seit letztem Cant
-        cant_days = state["cant"].get(internal, [])
-        last_cant = max(cant_days) if cant_days else None
-        allow_cant = True
-        if last_cant is not None and (day - last_cant) < CANT_MIN_DAYS:
-            allow_cant = False
-        if is_day_closed_for_person(state, internal):
-            allow_cant = False
-
-        # Sport: nur wenn Tag für diese Person NICHT bereits durch etwas anderes geschlossen ist
-        sport_today = is_sport_done_today(state, internal)
-        allow_sport = True
-        if sport_today:
-            allow_sport = True  # toggeln (undo) erlaubt das Frontend selbst
-        else:
-            if is_day_closed_for_person(state, internal):
-                allow_sport = False
-
-        can_skip[role_label] = allow_skip
-        can_cant[role_label] = allow_cant
-        can_sport[role_label] = allow_sport
-
-    # per-exercise cant availability (cooldown per exercise)
-    can_cant_ex = {}
-    for internal in ["male", "female"]:
-        role_label = INTERNAL_TO_ROLE[internal]
-        can_map = {}
-        # UI exercises -> internal keys
-        pairs = [("crunches","situps"), ("pushups","pushups"), ("squats","squats")]
-        for ui_ex, internal_ex in pairs:
-            last_day = _last_cant_ex_day(state, internal, internal_ex)
-            can_map[ui_ex] = True if (last_day is None) else ((day - last_day) >= CANT_MIN_DAYS)
-        can_cant_ex[role_label] = can_map
-
-    return can_skip, can_cant, can_sport, can_cant_ex
+    return totals, reps_today, status, can
 
 
 def _build_phrase_category(state, role_view: str) -> str:
@@ -354,66 +732,36 @@ def _build_phrase_category(state, role_view: str) -> str:
       - cant_male / cant_female
       - injured_male / injured_female
       - cheater_male / cheater_female
+
+    Bei einem Paar zählt auch der Status der anderen Person; in grösseren
+    Gruppen nur der eigene plus "alle fertig" (done_count, O(1)).
     """
     day = state["day"]
-    active_internal = ROLE_TO_INTERNAL.get(role_view, "male")
-    other_internal = "female" if active_internal == "male" else "male"
-
-    flags = {}
-    for internal in ["male", "female"]:
-        sport_today = day in state.get("sport", {}).get(internal, [])
-        done_all = all(state["done"][internal].get(ex, False) for ex in EXERCISES)
-
-        # Sport zählt für die Sprüche wie "heute erledigt" (all exercises done)
-        if sport_today:
-            done_all = True
-
-        flags[internal] = {
-            "cheater": day in state["cheater"].get(internal, []),
-            "injured": day in state["injured"].get(internal, []),
-            "cant": day in state["cant"].get(internal, []),
-            "skip": day in state["skip"].get(internal, []),
-            "done_all": done_all,
-        }
-
-    def _suffix(internal_role: str) -> str:
-        return "male" if internal_role == "male" else "female"
+    ids = member_ids(state)
+    active_internal = _role_to_internal(state, role_view)
+    others = [p for p in ids if p != active_internal] if len(ids) == 2 else []
 
     # Priorität: Cheater > Injured > Cant > Skip > Done-Status
-    if flags[active_internal]["cheater"]:
-        return f"cheater_{_suffix(active_internal)}"
-    if flags[other_internal]["cheater"]:
-        return f"cheater_{_suffix(other_internal)}"
-
-    if flags[active_internal]["injured"]:
-        return f"injured_{_suffix(active_internal)}"
-    if flags[other_internal]["injured"]:
-        return f"injured_{_suffix(other_internal)}"
-
-    if flags[active_internal]["cant"]:
-        return f"cant_{_suffix(active_internal)}"
-    if flags[other_internal]["cant"]:
-        return f"cant_{_suffix(other_internal)}"
-
-    if flags[active_internal]["skip"]:
-        return f"skip_{_suffix(active_internal)}"
-    if flags[other_internal]["skip"]:
-        return f"skip_{_suffix(other_internal)}"
-
-    # Done-Status
-    active_done = flags[active_internal]["done_all"]
-    other_done = flags[other_internal]["done_all"]
-
-    if active_done and other_done:
+    cals = [(internal, calendar(state, internal)) for internal in [active_internal] + others]
+    for kind in ("cheater", "injured", "cant", "skip"):
+        for internal, cal in cals:
+            if cal.has(kind, day):
+                return f"{kind}_{_phrase_suffix(state, internal)}"
+
+    # Done-Status (Sport zählt wie "alle Übungen erledigt")
+    today = state["today"]
+    if today["done_count"] == len(ids):
         return "all_done"
-    if active_done and not other_done:
-        return f"one_done_{_suffix(active_internal)}"
-    if other_done and not active_done:
-        return f"one_done_{_suffix(other_internal)}"
+    if today["done"].get(active_internal, False):
+        return f"one_done_{_phrase_suffix(state, active_internal)}"
+    for internal in others:
+        if today["done"].get(internal, False):
+            return f"one_done_{_phrase_suffix(state, internal)}"
 
     return "none_done"
 
 
+@_timed("build")
 def _build_client_state(state, role_view: str, message: str | None = None):
     """Baut das JSON, das das Frontend erwartet."""
     current_date, weekday = calculate_current_date(state)
@@ -424,21 +772,43 @@ def _build_client_state(state, role_view: str, message: str | None = None):
     start_display = start_iso
     try:
         if start_iso:
-            sd = datetime.strptime(start_iso, "%Y-%m-%d").date()
+            sd = _parse_start_date(start_iso)
             start_display = format_date_swiss_long(sd)
     except Exception:
         start_display = start_iso
 
-    totals = _build_totals(state)
-    reps_today = _build_reps_today(state)
-    status = _build_status(state)
-    can_skip, can_cant, can_sport, can_cant_ex = _build_can_flags(state)
+    # Paar: die UI zeigt beide Personen -> volle Details für beide.
+    # Grössere Gruppen: volle Details nur für das aktive Mitglied, der Rest kompakt.
+    ids = member_ids(state)
+    internal = _role_to_internal(state, role_view)
+    detail = ids if len(ids) <= 2 else [internal]
+
+    totals, reps_today, status = {}, {}, {}
+    can_skip, can_cant, can_sport, can_cant_ex = {}, {}, {}, {}
+    for person in detail:
+        role_label = _role_label(state, person)
+        (
+            totals[role_label],
+            reps_today[role_label],
+            status[role_label],
+            can,
+        ) = _build_member_view(state, person)
+        can_skip[role_label] = can["skip"]
+        can_cant[role_label] = can["cant"]
+        can_sport[role_label] = can["sport"]
+        can_cant_ex[role_label] = can["cant_ex"]
     phrase_category = _build_phrase_category(state, role_view)
 
+    today = state["today"]
+    members = []
+    for m in state["members"]:
+        entry = {"role": m["role"], "closed": bool(today["closed"].get(m["id"], False))}
+        if m.get("name"):
+            entry["name"] = m["name"]
+        members.append(entry)
+
     # Cheater-Flag nur für die aktive Rolle
-    internal = ROLE_TO_INTERNAL.get(role_view, "male")
-    day = state["day"]
-    cheater_today = day in state["cheater"].get(internal, [])
+    cheater_today = calendar(state, internal).has("cheater", state["day"])
 
     response = {
         "weekday": weekday,
@@ -457,6 +827,11 @@ def _build_client_state(state, role_view: str, message: str | None = None):
         "cheater": bool(cheater_today),
         "cheater_message": "Cheater-Versuch erkannt. Nice try, aber nein." if cheater_today else "",
         "message": message or "",
+        "version": int(state.get("version", 0)),
+        "epoch": state.get("epoch", ""),
+        "members": members,
+        "closed_count": int(today["closed_count"]),
+        "auto_rollover": AUTO_ROLLOVER,
     }
     return response
 
@@ -466,7 +841,7 @@ def _apply_exercise(state, internal_person: str, internal_exercise: str):
     if internal_exercise not in EXERCISES:
         raise ValueError("Ungültige Übung")
 
-    if internal_person not in ["male", "female"]:
+    if internal_person not in state["done"]:
         raise ValueError("Ungültige Person")
 
     # Wenn schon erledigt, nichts tun
@@ -475,6 +850,7 @@ def _apply_exercise(state, internal_person: str, internal_exercise: str):
 
     state["done"][internal_person][internal_exercise] = True
     reps_today = state["reps"][internal_person][internal_exercise]
+    state["credited"][internal_person][internal_exercise] = reps_today
     state["overall"][internal_person][internal_exercise] += reps_today
     return state, True
 
@@ -483,12 +859,12 @@ def _apply_exercise_undo(state, internal_person: str, internal_exercise: str):
     """
     Macht eine erledigte Übung wieder rückgängig:
     - done-Flag zurück auf False
-    - overall-Reps um die Tages-Reps reduzieren (aber nicht unter 0)
+    - overall-Reps um die gutgeschriebenen Reps reduzieren (aber nicht unter 0)
     """
     if internal_exercise not in EXERCISES:
         raise ValueError("Ungültige Übung")
 
-    if internal_person not in ["male", "female"]:
+    if internal_person not in state["done"]:
         raise ValueError("Ungültige Person")
 
     # Wenn sie gar nicht erledigt war, gibt es nichts zu tun
@@ -496,58 +872,46 @@ def _apply_exercise_undo(state, internal_person: str, internal_exercise: str):
         return state, False
 
     state["done"][internal_person][internal_exercise] = False
-    reps_today = state["reps"][internal_person][internal_exercise]
+    credited = state["credited"][internal_person][internal_exercise]
+    state["credited"][internal_person][internal_exercise] = 0
     current_overall = state["overall"][internal_person].get(internal_exercise, 0)
-    new_overall = max(0, current_overall - reps_today)
+    new_overall = max(0, current_overall - credited)
     state["overall"][internal_person][internal_exercise] = new_overall
     return state, True
 
 
+def _mark_cheater(cal: DayCalendar, day: int):
+    cal.add("cheater", day)
+
+
 def _apply_skip(state, internal_person: str):
     day = state["day"]
-    skip_days = state["skip"].get(internal_person, [])
-    last_skip_day = max(skip_days) if skip_days else None
+    cal = calendar(state, internal_person)
+    last_skip_day = cal.last("skip")
 
     if last_skip_day is not None and (day - last_skip_day) < SKIP_MIN_DAYS:
-        cheater_days = state["cheater"].setdefault(internal_person, [])
-        if day not in cheater_days:
-            cheater_days.append(day)
+        _mark_cheater(cal, day)
         return state, "cheater_skip"
 
-    if day not in skip_days:
-        skip_days.append(day)
-        state["skip"][internal_person] = skip_days
-
+    cal.add("skip", day)
     return state, "ok"
 
 
 def _apply_skip_undo(state, internal_person: str):
     """Entfernt den Skip-Status für den aktuellen Tag."""
-    day = state["day"]
-    skip_days = state["skip"].get(internal_person, [])
-    if day in skip_days:
-        skip_days = [d for d in skip_days if d != day]
-        state["skip"][internal_person] = skip_days
+    if calendar(state, internal_person).remove("skip", state["day"]):
         return state, "ok"
     return state, "noop"
 
 
 def _apply_injured(state, internal_person: str):
-    day = state["day"]
-    injured_days = state["injured"].get(internal_person, [])
-    if day not in injured_days:
-        injured_days.append(day)
-        state["injured"][internal_person] = injured_days
+    calendar(state, internal_person).add("injured", state["day"])
     return state, "ok"
 
 
 def _apply_injured_undo(state, internal_person: str):
     """Entfernt den krank/verletzt-Status für den aktuellen Tag."""
-    day = state["day"]
-    injured_days = state["injured"].get(internal_person, [])
-    if day in injured_days:
-        injured_days = [d for d in injured_days if d != day]
-        state["injured"][internal_person] = injured_days
+    if calendar(state, internal_person).remove("injured", state["day"]):
         return state, "ok"
     return state, "noop"
 
@@ -557,18 +921,14 @@ def _apply_cant(state, internal_person: str, password: str):
         return state, "wrong_password"
 
     day = state["day"]
-    cant_days = state["cant"].get(internal_person, [])
-    last_cant_day = max(cant_days) if cant_days else None
+    cal = calendar(state, internal_person)
+    last_cant_day = cal.last("cant")
 
     if last_cant_day is not None and (day - last_cant_day) < CANT_MIN_DAYS:
-        cheater_days = state["cheater"].setdefault(internal_person, [])
-        if day not in cheater_days:
-            cheater_days.append(day)
+        _mark_cheater(cal, day)
         return state, "cheater_cant"
 
-    if day not in cant_days:
-        cant_days.append(day)
-        state["cant"][internal_person] = cant_days
+    cal.add("cant", day)
 
     for ex in EXERCISES:
         current_reps = state["reps"][internal_person].get(ex, START_REPS)
@@ -583,14 +943,9 @@ def _apply_cant_undo(state, internal_person: str):
     Entfernt den „Ich kann nicht mehr!“-Status für den aktuellen Tag
     und setzt die Reps um CANT_REDUCTION wieder her.
     """
-    day = state["day"]
-    cant_days = state["cant"].get(internal_person, [])
-    if day not in cant_days:
+    if not calendar(state, internal_person).remove("cant", state["day"]):
         return state, "noop"
 
-    cant_days = [d for d in cant_days if d != day]
-    state["cant"][internal_person] = cant_days
-
     for ex in EXERCISES:
         current_reps = state["reps"][internal_person].get(ex, START_REPS)
         state["reps"][internal_person][ex] = current_reps + CANT_REDUCTION
@@ -598,13 +953,6 @@ def _apply_cant_undo(state, internal_person: str):
     return state, "ok"
 
 
-
-
-def _is_cant_exercise_today(state, internal_person: str, internal_exercise: str) -> bool:
-    day = state["day"]
-    return day in state.get("cant_ex", {}).get(internal_person, {}).get(internal_exercise, [])
-
-
 def _apply_cant_exercise(state, internal_person: str, internal_exercise: str, password: str):
     """
     Per-exercise "Ich kann nicht mehr":
@@ -617,25 +965,17 @@ def _apply_cant_exercise(state, internal_person: str, internal_exercise: str, pa
         return state, "wrong_password"
 
     day = state["day"]
+    cal = calendar(state, internal_person)
     # reuse global cant cheat window for per-exercise as well
-    last_cant_day = None
-    cant_days = state.get("cant", {}).get(internal_person, [])
-    if cant_days:
-        last_cant_day = max(cant_days)
+    last_cant_day = cal.last("cant")
 
     if last_cant_day is not None and (day - last_cant_day) < CANT_MIN_DAYS:
-        cheater_days = state["cheater"].setdefault(internal_person, [])
-        if day not in cheater_days:
-            cheater_days.append(day)
+        _mark_cheater(cal, day)
         return state, "cheater_cant"
 
-    ex_map = state.setdefault("cant_ex", {}).setdefault(internal_person, {}).setdefault(internal_exercise, [])
-    if day in ex_map:
+    if not cal.add(cant_ex_lane(internal_exercise), day):
         return state, "already"
 
-    ex_map.append(day)
-    state["cant_ex"][internal_person][internal_exercise] = ex_map
-
     # count each per-ex activation
     cnt = state.setdefault("cant_ex_count", {}).setdefault(internal_person, 0)
     state["cant_ex_count"][internal_person] = int(cnt) + 1
@@ -648,237 +988,2028 @@ def _apply_cant_exercise(state, internal_person: str, internal_exercise: str, pa
 
 def _apply_cant_exercise_undo(state, internal_person: str, internal_exercise: str):
     day = state["day"]
-
-    ex_map = state.get("cant_ex", {}).get(internal_person, {})
-    days = ex_map.get(internal_exercise, [])
-    if day not in days:
-        return state, "noop"
+    cal = calendar(state, internal_person)
 
     # remove day for this exercise
-    ex_map[internal_exercise] = [d for d in days if d != day]
-    state.setdefault("cant_ex", {})[internal_person] = ex_map
+    if not cal.remove(cant_ex_lane(internal_exercise), day):
+        return state, "noop"
 
     # revert reps only for this exercise
     current_reps = state["reps"][internal_person].get(internal_exercise, START_REPS)
     state["reps"][internal_person][internal_exercise] = current_reps + CANT_REDUCTION
 
     # if no other cant_ex active today for this person, also remove from global cant_days
-    still_active_today = False
-    for ex, ex_days in ex_map.items():
-        if day in (ex_days or []):
-            still_active_today = True
-            break
+    if not cal.any_on(CANT_EX_PREFIX, day):
+        cal.remove("cant", day)
+
+    return state, "ok"
 
-    if not still_active_today:
-        cant_days = state.get("cant", {}).get(internal_person, [])
-        if cant_days:
-            state["cant"][internal_person] = [d for d in cant_days if d != day]
 
+def _apply_sport(state, internal_person: str):
+    """„Heute Sport gemacht“: schliesst den Tag wie „alle Übungen erledigt“ (togglebar)."""
+    day = state["day"]
+    cal = calendar(state, internal_person)
+    if cal.has("sport", day):
+        return state, "already"
+    if _person_day_flags(state, internal_person, cal)[1]:
+        return state, "not_allowed"
+    cal.add("sport", day)
     return state, "ok"
-@app.route("/")
-def index():
-    view_raw = (request.args.get("view") or "").lower()
-    if view_raw in ("frau", "female", "f"):
-        role = "frau"
+
+
+def _apply_sport_undo(state, internal_person: str):
+    if calendar(state, internal_person).remove("sport", state["day"]):
+        return state, "ok"
+    return state, "noop"
+
+
+# --- Aktionen -------------------------------------------------------------
+# Jede Aktion ist ein Handler (state, internal_person, data) -> (message, http_status).
+# 400/403 bedeuten: nichts wurde geändert, nicht committen.
+
+
+def _exercise_arg(data):
+    """(externer, interner) Übungsname aus data oder None."""
+    exercise_external = data.get("exercise")
+    if exercise_external not in EXTERNAL_TO_INTERNAL_EXERCISE:
+        return None
+    return exercise_external, EXTERNAL_TO_INTERNAL_EXERCISE[exercise_external]
+
+
+def _act_exercise(state, internal_person, data):
+    ex = _exercise_arg(data)
+    if ex is None:
+        return "Ungültige Übung", 400
+    exercise_external, internal_ex = ex
+    state, changed = _apply_exercise(state, internal_person, internal_ex)
+    if changed:
+        return f"{exercise_external.capitalize()} erledigt.", 200
+    return f"{exercise_external.capitalize()} war bereits erledigt.", 200
+
+
+def _act_exercise_undo(state, internal_person, data):
+    ex = _exercise_arg(data)
+    if ex is None:
+        return "Ungültige Übung", 400
+    exercise_external, internal_ex = ex
+    state, changed = _apply_exercise_undo(state, internal_person, internal_ex)
+    if changed:
+        return f"{exercise_external.capitalize()} wieder abgewählt.", 200
+    return f"{exercise_external.capitalize()} war nicht als erledigt markiert.", 200
+
+
+def _act_skip(state, internal_person, data):
+    state, status = _apply_skip(state, internal_person)
+    if status == "cheater_skip":
+        return "Skip zu früh – Cheater erkannt.", 200
+    return "Skip-Tag gesetzt. Heute offiziell faul.", 200
+
+
+def _act_skip_undo(state, internal_person, data):
+    state, status = _apply_skip_undo(state, internal_person)
+    if status == "ok":
+        return "Skip-Tag zurückgenommen.", 200
+    return "Für heute war kein Skip gesetzt.", 200
+
+
+def _act_injured(state, internal_person, data):
+    _apply_injured(state, internal_person)
+    return "Tag als krank/verletzt markiert.", 200
+
+
+def _act_injured_undo(state, internal_person, data):
+    state, status = _apply_injured_undo(state, internal_person)
+    if status == "ok":
+        return "krank/verletzt-Status zurückgenommen.", 200
+    return "Für heute war kein krank/verletzt-Status gesetzt.", 200
+
+
+def _act_cant(state, internal_person, data):
+    state, status = _apply_cant(state, internal_person, data.get("password", ""))
+    if status == "wrong_password":
+        return "Falsches Passwort für „Ich kann nicht mehr!“.", 403
+    if status == "cheater_cant":
+        return "„Ich kann nicht mehr!“ zu früh – Cheater erkannt.", 200
+    return "Reps reduziert. Heute war's hart genug.", 200
+
+
+def _act_cant_undo(state, internal_person, data):
+    state, status = _apply_cant_undo(state, internal_person)
+    if status == "ok":
+        return "„Ich kann nicht mehr!“-Status zurückgenommen.", 200
+    return "Für heute war kein „Ich kann nicht mehr!“-Status gesetzt.", 200
+
+
+def _act_cant_exercise(state, internal_person, data):
+    ex = _exercise_arg(data)
+    if ex is None:
+        return "Ungültige Übung", 400
+    exercise_external, internal_ex = ex
+    state, status = _apply_cant_exercise(state, internal_person, internal_ex, data.get("password", ""))
+    if status == "wrong_password":
+        return "Falsches Passwort für „Ich kann nicht mehr!“ (Übung).", 403
+    if status == "cheater_cant":
+        return "„Ich kann nicht mehr!“ zu früh – Cheater erkannt.", 200
+    if status == "already":
+        return f"„Ich kann nicht mehr!“ für {exercise_external} ist heute bereits gesetzt.", 200
+    return f"Reps reduziert für {exercise_external}. Du lebst noch.", 200
+
+
+def _act_cant_exercise_undo(state, internal_person, data):
+    ex = _exercise_arg(data)
+    if ex is None:
+        return "Ungültige Übung", 400
+    exercise_external, internal_ex = ex
+    state, status = _apply_cant_exercise_undo(state, internal_person, internal_ex)
+    if status == "ok":
+        return f"„Ich kann nicht mehr!“ für {exercise_external} zurückgenommen.", 200
+    return f"Für {exercise_external} war heute kein „Ich kann nicht mehr!“ gesetzt.", 200
+
+
+# NEW: heute sport gemacht (togglebar)
+def _act_sport(state, internal_person, data):
+    state, status = _apply_sport(state, internal_person)
+    if status == "not_allowed":
+        return "Heute ist bereits abgeschlossen (oder in einem Status). „Heute Sport gemacht“ geht jetzt nicht mehr.", 200
+    if status == "already":
+        return "Heute ist bereits als „Sport gemacht“ markiert.", 200
+    return "Heute als „Sport gemacht“ markiert. Übungen gelten als erledigt.", 200
+
+
+def _act_sport_undo(state, internal_person, data):
+    state, status = _apply_sport_undo(state, internal_person)
+    if status == "ok":
+        return "„Sport gemacht“ für heute zurückgenommen.", 200
+    return "Für heute war kein „Sport gemacht“ gesetzt.", 200
+
+
+ACTIONS = {
+    "exercise": _act_exercise,
+    "exercise_undo": _act_exercise_undo,
+    "skip": _act_skip,
+    "skip_undo": _act_skip_undo,
+    "injured": _act_injured,
+    "injured_undo": _act_injured_undo,
+    "cant": _act_cant,
+    "cant_undo": _act_cant_undo,
+    "cant_exercise": _act_cant_exercise,
+    "cant_exercise_undo": _act_cant_exercise_undo,
+    "sport": _act_sport,
+    "sport_undo": _act_sport_undo,
+}
+MAX_BATCH_ACTIONS = 50
+
+
+def dispatch_action(state, role_view: str, action, data):
+    """
+    Wendet eine einzelne Aktion auf state an (ohne zu speichern).
+    Gibt (message, http_status) zurück; bei 400/403 ist state unverändert.
+    """
+    handler = ACTIONS.get(action)
+    if handler is None:
+        return "Ungültige Aktion", 400
+
+    internal_person = _role_to_internal(state, role_view)
+
+    # Wenn "sport" aktiv ist, sind ALLE anderen Aktionen gesperrt (gemäss Vorgabe),
+    # ausser sport_undo (toggle).
+    if action != "sport_undo" and calendar(state, internal_person).has("sport", state["day"]):
+        return "Heute ist bereits als „Sport gemacht“ markiert. Erst wieder deaktivieren, dann ändern.", 403
+
+    message, status = handler(state, internal_person, data)
+    if status == 200:
+        _update_today(state, internal_person)
+    return message, status
+
+
+def _reduce_action(state, role_view: str, action, data):
+    """
+    Wendet eine /api/action-Aktion auf state an (Reducer für update_state).
+    Gibt ((message, http_status), commit) zurück.
+    """
+    message, status = dispatch_action(state, role_view, action, data)
+    return (message, status), status == 200
+
+
+def _reduce_actions(state, role_raw, actions):
+    """
+    Reducer für /api/actions: alle Aktionen der Reihe nach auf denselben
+    State, committet wird nur, wenn alle 200 liefern (sonst gar nichts).
+    Gibt ((results, http_status), commit) zurück.
+    """
+    results = []
+    for item in actions:
+        item = item if isinstance(item, dict) else {}
+        role_view = _normalize_role(state, item.get("role") or role_raw)
+        message, status = dispatch_action(state, role_view, item.get("action"), item)
+        results.append({"action": item.get("action"), "role": role_view, "status": status, "message": message})
+        if status != 200:
+            return (results, status), False
+    return (results, 200), True
+
+
+def _idempotency_key(raw=None):
+    """Client-generierter Idempotency-Key (Header) oder None."""
+    if raw is None and has_request_context():
+        raw = request.headers.get("Idempotency-Key")
+    key = (raw or "").strip()
+    return key[:128] or None
+
+
+class IdempotencyMismatch(Exception):
+    """Idempotency-Key schon für eine Anfrage mit anderem Inhalt benutzt (-> 422)."""
+
+
+def _request_fingerprint(*parts) -> str:
+    """Kurzer Hash des Anfrage-Inhalts, wird mit dem Idempotency-Key gespeichert."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _idempotent(reducer, key, fingerprint=None):
+    """
+    Reducer-Wrapper: Das Ergebnis einer committeten Aktion wird unter key im
+    State abgelegt (atomar mit dem Commit, damit über alle Worker gültig).
+    Ein Replay mit demselben Key liefert das gespeicherte Ergebnis und
+    ändert nichts – aber nur bei gleichem Inhalt (fingerprint), sonst
+    IdempotencyMismatch. Die Tabelle ist auf IDEMPOTENCY_MAX_KEYS Einträge
+    und IDEMPOTENCY_TTL_S Sekunden begrenzt.
+    """
+    if key is None:
+        return reducer
+
+    def wrapped(state):
+        table = state.get("idempotency") or {}
+        seen = table.get(key)
+        if seen is not None:
+            # Einträge von vor dem Fingerprint gelten für jeden Inhalt
+            if fingerprint is not None and seen.get("f", fingerprint) != fingerprint:
+                raise IdempotencyMismatch(key)
+            return tuple(seen["result"]), False
+
+        result, commit = reducer(state)
+        if commit:
+            now = int(time.time())
+            table = state.setdefault("idempotency", {})
+            # Einfügereihenfolge = Alter: vorne abschneiden
+            for old in list(table):
+                if len(table) < IDEMPOTENCY_MAX_KEYS and now - table[old]["t"] < IDEMPOTENCY_TTL_S:
+                    break
+                del table[old]
+            table[key] = {"t": now, "result": list(result)}
+            if fingerprint is not None:
+                table[key]["f"] = fingerprint
+        return result, commit
+
+    return wrapped
+
+
+def _idempotency_mismatch_response():
+    return jsonify({"error": "Idempotency-Key wurde schon für eine andere Anfrage benutzt."}), 422
+
+
+def _if_match_version(raw=None):
+    """Version aus dem If-Match-Header (z.B. "12"), None wenn nicht gesetzt oder "*"."""
+    if raw is None and has_request_context():
+        raw = request.headers.get("If-Match")
+    raw = (raw or "").strip()
+    if raw.startswith("W/"):
+        raw = raw[2:]
+    raw = raw.strip('"')
+    if not raw or raw == "*":
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        return -1  # passt nie -> 412
+
+
+def _conflict_response(exc: StateConflict, role_raw, if_match):
+    role_view = _normalize_role(exc.state, role_raw)
+    if if_match is not None:
+        resp = _build_client_state(exc.state, role_view, "Der Stand hat sich inzwischen geändert. Bitte neu laden.")
+        return jsonify(resp), 412
+    resp = _build_client_state(exc.state, role_view, "Gleichzeitige Änderung – bitte nochmals versuchen.")
+    return jsonify(resp), 409
+
+
+def _day_status(state, internal: str) -> str:
+    """Status-Art des aktuellen Tages einer Person für die Historie."""
+    cal = calendar(state, internal)
+    day = state["day"]
+    for kind in ("injured", "cant", "skip", "sport"):
+        if cal.has(kind, day):
+            return kind
+    done_all, _ = _person_day_flags(state, internal, cal)
+    return "done" if done_all else "open"
+
+
+def _day_reps(state, internal: str) -> dict:
+    """Reps des aktuellen Tages für die Historie: erledigt = gutgeschrieben, offen = Vorgabe."""
+    done = state["done"][internal]
+    credited = state["credited"][internal]
+    reps = state["reps"][internal]
+    return {ex: credited[ex] if done[ex] else reps[ex] for ex in EXERCISES}
+
+
+def _archive_day(state):
+    """Hängt den aktuellen (abgeschlossenen) Tag an state["history"] an."""
+    data = state.setdefault("history", {})
+    ids = member_ids(state)
+    if data.get("first_day") is None:
+        # overall vor Beginn der Historie, damit sich overall später abgleichen lässt
+        data["overall_base"] = {
+            p: {ex: state["overall"][p][ex] - state["credited"][p][ex] for ex in EXERCISES}
+            for p in ids
+        }
+    records = {
+        p: (_day_reps(state, p), state["done"][p], _day_status(state, p))
+        for p in ids
+    }
+    DayHistory(data).append_day(state["day"], records, EXERCISES)
+
+
+def check_history(state):
+    """
+    Gleicht overall mit der Historie ab: overall_base + Reps aller erledigten
+    archivierten Tage + heute gutgeschriebene Reps. Gibt die Abweichungen zurück.
+    """
+    data = state.get("history") or {}
+    hist = DayHistory(data)
+    base = data.get("overall_base") or {}
+    mismatches = []
+    for p in member_ids(state):
+        for ex in EXERCISES:
+            expected = int(base.get(p, {}).get(ex, 0))
+            if hist.first_day is not None:
+                expected += hist.done_reps_sum(p, ex, EXERCISES)
+            expected += int(state["credited"][p][ex])
+            actual = int(state["overall"][p][ex])
+            if hist.first_day is None:
+                expected = actual  # noch nichts archiviert -> nichts zu prüfen
+            if expected != actual:
+                mismatches.append((p, ex, expected, actual))
+    return mismatches
+
+
+def export_rows(state):
+    """
+    Alle archivierten Tage und der aktuelle Tag als (date, day, person,
+    exercise, reps, done, status, source), aufsteigend nach Tag, dann Person
+    und Übung (Felder: export.FIELDS). Generator – liest nur state, baut keine
+    Listen über die Tage auf.
+
+    source: "history" für archivierte Tage, "today" für den aktuellen Tag.
+    reps sind bei erledigten Übungen die gutgeschriebenen Reps (wie in
+    overall), sonst die Vorgabe. Tage vor Beginn der Historie (ältere
+    States) haben keine Daten und fehlen im Export.
+    """
+    ids = member_ids(state)
+    labels = {p: _role_label(state, p) for p in ids}
+    hist = DayHistory(state.get("history") or {})
+    day = int(state["day"])
+    try:
+        start = _parse_start_date(state["start_date"])
+    except (KeyError, TypeError, ValueError):
+        start = _fallback_start_date(state)
+    one_day = timedelta(days=1)
+    first_hist = hist.first_day if hist.first_day is not None else day
+    current = start + timedelta(days=first_hist - 1)
+
+    if hist.days:
+        bits = {ex: 1 << i for i, ex in enumerate(EXERCISES)}
+        cols = {
+            p: (
+                {ex: hist.reps(p, ex) for ex in EXERCISES},
+                hist.done_masks(p),
+                hist.statuses(p),
+            )
+            for p in ids
+        }
+        for i in range(min(hist.days, day - first_hist)):
+            date_str = current.isoformat()
+            d = first_hist + i
+            for p in ids:
+                reps, masks, statuses = cols[p]
+                status = STATUS_CODES[statuses[i]]
+                for ex in EXERCISES:
+                    yield (date_str, d, labels[p], INTERNAL_TO_EXTERNAL_EXERCISE[ex],
+                           reps[ex][i], bool(masks[i] & bits[ex]), status, "history")
+            current += one_day
+
+    date_str = current.isoformat()
+    for p in ids:
+        status = _day_status(state, p)
+        reps = _day_reps(state, p)
+        for ex in EXERCISES:
+            yield (date_str, day, labels[p], INTERNAL_TO_EXTERNAL_EXERCISE[ex],
+                   reps[ex], bool(state["done"][p][ex]), status, "today")
+
+
+IMPORT_MAX_DAYS = 36500   # Reps sind in der Historie uint16, Tage ein Bit pro Tag
+IMPORT_MAX_ERRORS = 50     # danach bricht die Prüfung ab
+IMPORT_STATUSES = ("open", "done", "sport", "skip", "cant", "injured")
+
+
+def _import_int(value) -> int:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    raise ValueError
+
+
+def _import_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    raw = str(value).strip().lower()
+    if raw in ("1", "true"):
+        return True
+    if raw in ("0", "false"):
+        return False
+    raise ValueError
+
+
+def _import_rule_errors(base, statuses, masks):
+    """Regeln über alle importierten Tage: done/open passend zu den Haken, Skip/Cant-Cooldowns."""
+    all_done = (1 << len(EXERCISES)) - 1
+    cooldowns = (("skip", SKIP_MIN_DAYS), ("cant", CANT_MIN_DAYS))
+    errors = []
+    for p, codes in statuses.items():
+        role = _role_label(base, p)
+        for idx, (code, mask) in enumerate(zip(codes, masks[p])):
+            status = STATUS_CODES[code]
+            if status in ("open", "done") and (status == "done") != (mask == all_done):
+                errors.append(f"Tag {idx + 1}, {role}: Status {status}, aber "
+                              f"{'nicht alle' if status == 'done' else 'alle'} Übungen erledigt")
+        for kind, min_days in cooldowns:
+            last = None
+            for idx, code in enumerate(codes):
+                if code == STATUS_INDEX[kind]:
+                    if last is not None and idx - last < min_days:
+                        errors.append(f"Tag {idx + 1}, {role}: {kind} nur {idx - last} Tage nach Tag {last + 1} "
+                                      f"(mindestens {min_days})")
+                    last = idx
+    return errors
+
+
+def import_rows(base, records):
+    """
+    Baut aus Export-Zeilen ((Zeilennummer, dict) aus export.decode) einen
+    neuen State mit den Mitgliedern von base. Gibt (state, errors) zurück;
+    bei Fehlern ist state None.
+
+    Geprüft wird der ganze Stapel, bevor etwas geschrieben wird: Tage
+    lückenlos ab 1 und aufsteigend, jede Person × Übung genau einmal pro Tag,
+    bekannte Rollen, Übungen (EXTERNAL_TO_INTERNAL_EXERCISE) und Status,
+    ein Status pro Person und Tag, passende Datumsangaben und die Cooldowns
+    SKIP_MIN_DAYS / CANT_MIN_DAYS; das Datum des letzten Tages höchstens
+    heute oder der aktuelle Tag von base. Der letzte Tag wird der aktuelle Tag,
+    alle früheren die Historie; reps, done, overall und der Kalender werden
+    direkt aus den Spalten berechnet. Ohne date-Spalte ist der letzte Tag heute.
+    """
+    members = base["members"]
+    ids = [m["id"] for m in members]
+    by_role = {m["role"]: m["id"] for m in members}
+    ex_index = {ui: EXERCISES.index(internal) for ui, internal in EXTERNAL_TO_INTERNAL_EXERCISE.items()}
+    cells = len(ids) * len(EXERCISES)
+    none_code = STATUS_INDEX["none"]
+
+    reps = {p: [array(REPS_TYPE) for _ in EXERCISES] for p in ids}
+    masks = {p: array(FLAG_TYPE) for p in ids}
+    statuses = {p: array(FLAG_TYPE) for p in ids}
+    errors = []
+    day = 0
+    seen = set()
+    start = None
+    expected_date = None
+
+    for line, row in records:
+        if len(errors) >= IMPORT_MAX_ERRORS:
+            break
+        try:
+            d = _import_int(row.get("day"))
+        except ValueError:
+            errors.append(f"Zeile {line}: day fehlt oder ist keine Zahl")
+            continue
+        if d != day:
+            if day and len(seen) < cells:
+                errors.append(f"Tag {day}: {len(seen)} von {cells} Zeilen (Person × Übung)")
+            if d != day + 1:
+                # Reihenfolge kaputt – alles Weitere wäre Folgefehler
+                errors.append(f"Zeile {line}: Tag {d}, erwartet Tag {day + 1} (aufsteigend ab 1, ohne Lücken)")
+                break
+            if d > IMPORT_MAX_DAYS:
+                errors.append(f"Zeile {line}: mehr als {IMPORT_MAX_DAYS} Tage")
+                break
+            day = d
+            seen.clear()
+            expected_date = None if start is None else (start + timedelta(days=d - 1)).isoformat()
+            for p in ids:
+                for col in reps[p]:
+                    col.append(0)
+                masks[p].append(0)
+                statuses[p].append(none_code)
+
+        p = by_role.get(str(row.get("person") or "").lower())
+        i = ex_index.get(row.get("exercise"))
+        if p is None:
+            errors.append(f"Zeile {line}: unbekannte Person {row.get('person')!r}")
+            continue
+        if i is None:
+            errors.append(f"Zeile {line}: unbekannte Übung {row.get('exercise')!r}")
+            continue
+        if (p, i) in seen:
+            errors.append(f"Zeile {line}: Tag {d}, {row['person']}, {row['exercise']} doppelt")
+            continue
+        seen.add((p, i))
+
+        try:
+            n = _import_int(row.get("reps"))
+            if not 1 <= n <= 0xFFFF:
+                raise ValueError
+        except ValueError:
+            errors.append(f"Zeile {line}: reps muss eine Zahl von 1 bis 65535 sein")
+            continue
+        try:
+            done = _import_bool(row.get("done"))
+        except ValueError:
+            errors.append(f"Zeile {line}: done muss true/false bzw. 1/0 sein")
+            continue
+        status = row.get("status")
+        if status not in IMPORT_STATUSES:
+            errors.append(f"Zeile {line}: Status {status!r} (erlaubt: {', '.join(IMPORT_STATUSES)})")
+            continue
+        code = STATUS_INDEX[status]
+        if statuses[p][-1] == none_code:
+            statuses[p][-1] = code
+        elif statuses[p][-1] != code:
+            errors.append(f"Zeile {line}: Tag {d}, {row['person']}: Status {status} statt {STATUS_CODES[statuses[p][-1]]}")
+            continue
+
+        raw_date = row.get("date")
+        if raw_date:
+            if start is None:
+                try:
+                    start = date.fromisoformat(raw_date) - timedelta(days=d - 1)
+                except ValueError:
+                    errors.append(f"Zeile {line}: Datum {raw_date!r} (erwartet JJJJ-MM-TT)")
+                    continue
+                expected_date = raw_date
+            elif raw_date != expected_date:
+                errors.append(f"Zeile {line}: Tag {d} ist der {expected_date}, nicht {raw_date}")
+                continue
+
+        reps[p][i][-1] = n
+        if done:
+            masks[p][-1] |= 1 << i
+
+    if not errors and day and len(seen) < cells:
+        errors.append(f"Tag {day}: {len(seen)} von {cells} Zeilen (Person × Übung)")
+    if not errors and not day:
+        errors.append("Keine Daten.")
+    # der aktuelle Tag darf so weit vorn liegen wie in base (nach „Nächster Tag“ oft morgen)
+    if not errors and start is not None and start + timedelta(days=day - 1) > max(_today(), calculate_current_date(base)[0]):
+        errors.append(f"Tag {day} ({start + timedelta(days=day - 1)}) liegt in der Zukunft.")
+
+    if not errors:
+        errors = _import_rule_errors(base, statuses, masks)
+    if errors:
+        return None, errors[:IMPORT_MAX_ERRORS]
+
+    state = _initial_state(members)
+    if start is None:
+        start = _today() - timedelta(days=day - 1)
+    state["start_date"] = start.isoformat()
+    state["day"] = day
+
+    columns = {}
+    for p in ids:
+        for i, ex in enumerate(EXERCISES):
+            col = reps[p][i]
+            columns[f"{p}:{ex}"] = col
+            state["reps"][p][ex] = col[-1]
+            state["done"][p][ex] = bool(masks[p][-1] & (1 << i))
+            state["credited"][p][ex] = col[-1] if state["done"][p][ex] else 0
+            state["overall"][p][ex] = sum(r for r, m in zip(col, masks[p]) if m & (1 << i))
+        columns[f"{p}:done"] = masks[p]
+        columns[f"{p}:status"] = statuses[p]
+        lanes = state["calendar"][p]
+        for kind in ("skip", "cant", "injured", "sport"):
+            code = STATUS_INDEX[kind]
+            lane = encode_days(idx for idx, c in enumerate(statuses[p], 1) if c == code)
+            if lane:
+                lanes[kind] = lane
+    history = DayHistory(state["history"])
+    history.replace_all(1, day - 1, columns)
+    if history.days:
+        state["history"]["overall_base"] = {p: {ex: 0 for ex in EXERCISES} for p in ids}
+    _recount_today(state)
+    return state, []
+
+
+def _replace_with(new_state):
+    """Reducer: ganzen State ersetzen, Version läuft weiter."""
+    def replace(state):
+        version = state["version"]
+        state.clear()
+        state.update(clone_state(new_state))
+        state["version"] = version
+        return None, True
+    return replace
+
+
+def _backup_current(group=None):
+    """Aktuellen Stand vor dem Ersetzen sichern, damit sich Import/Restore rückgängig machen lassen."""
+    with BACKUPS.locked():
+        current = get_store(group).snapshot()
+        if current is not None:
+            BACKUPS.add(group or DEFAULT_SCOPE, current)
+
+
+def overall_changes(base, state):
+    """(Rolle, Übung, vorher, nachher) für jede Gesamtsumme, die state gegenüber base ändert."""
+    changes = []
+    for p in member_ids(base):
+        for ex in EXERCISES:
+            before = int(base["overall"][p][ex])
+            after = int(state["overall"][p][ex])
+            if before != after:
+                changes.append((_role_label(base, p), INTERNAL_TO_EXTERNAL_EXERCISE[ex], before, after))
+    return changes
+
+
+def apply_import(records, group=None, dry_run=False, accept_overall=False):
+    """
+    Prüft records (export.decode) komplett und ersetzt bei Erfolg den State
+    in einem einzigen Schreibvorgang (vorher Backup). Gibt (state, errors,
+    changes) zurück; changes wie overall_changes(). Ändert der Import
+    Gesamtsummen, wird er ohne accept_overall abgelehnt (die Änderungen
+    stehen dann auch in errors); mit dry_run wird nur geprüft.
+    """
+    group = group or _current_group()
+    base = peek_state(group)
+    try:
+        new_state, errors = import_rows(base, records)
+    except ImportFormatError as exc:
+        return None, [str(exc)], []
+    if errors:
+        return None, errors, []
+    changes = overall_changes(base, new_state)
+    if changes and not accept_overall:
+        errors = [f"Gesamtsumme {role} {ex}: {before} -> {after}" for role, ex, before, after in changes]
+        errors.append("Der Import würde Gesamtsummen ändern; zum Nachtragen ausdrücklich bestätigen.")
+        return new_state, errors, changes
+    if dry_run:
+        return new_state, [], changes
+    _backup_current(group)
+    state, _ = update_state(_replace_with(new_state), group=group)
+    return state, [], changes
+
+
+PROJECTION_MAX_DAYS = 3650
+
+
+def _projection_inputs(state, days: int):
+    """
+    Startwerte und Szenarien für projection.project(). Heute zählt als
+    abgeschlossen: offene Übungen eines noch offenen Tages gelten als erledigt.
+    """
+    day = state["day"]
+    reps0, overall0 = [], []
+    schedules = {"no_cant": ([], []), "cant_max": ([], []), "historical_skips": ([], [])}
+    for p in member_ids(state):
+        cal = calendar(state, p)
+        closed = _person_day_flags(state, p, cal)[1]
+        reps0.append([state["reps"][p][ex] for ex in EXERCISES])
+        overall0.append([
+            state["overall"][p][ex]
+            + (0 if closed or state["done"][p][ex] else state["reps"][p][ex])
+            for ex in EXERCISES
+        ])
+
+        # Cant so oft, wie der Cooldown erlaubt
+        last_cant = cal.last("cant")
+        first_cant = 1 if last_cant is None else max(1, last_cant + CANT_MIN_DAYS - day)
+        # Skip im bisherigen Rhythmus (nie öfter als SKIP_MIN_DAYS)
+        skip_days = cal.count("skip")
+        skip_interval = max(SKIP_MIN_DAYS, round(day / skip_days)) if skip_days else 0
+        last_skip = cal.last("skip")
+        first_skip = skip_interval if last_skip is None else max(1, last_skip + skip_interval - day)
+
+        never = [False] * days
+        schedules["no_cant"][0].append(never)
+        schedules["no_cant"][1].append(never)
+        schedules["cant_max"][0].append(every(first_cant, CANT_MIN_DAYS, days))
+        schedules["cant_max"][1].append(never)
+        schedules["historical_skips"][0].append(never)
+        schedules["historical_skips"][1].append(every(first_skip, skip_interval, days))
+    return reps0, overall0, schedules
+
+
+def _simulate_projection(state, schedules, days: int):
+    """Dieselben Szenarien Tag für Tag mit den echten Reducern (Referenz für check-projection)."""
+    results = {}
+    ids = member_ids(state)
+    for name, (cant_masks, skip_masks) in schedules.items():
+        sim = clone_state(state)
+        for p in ids:
+            if not is_day_closed_for_person(sim, p):
+                for ex in EXERCISES:
+                    _apply_exercise(sim, p, ex)
+                _update_today(sim, p)
+        reps = [[[] for _ in EXERCISES] for _ in ids]
+        overall = [[[] for _ in EXERCISES] for _ in ids]
+        for t in range(days):
+            error, _ = _reduce_nextday(sim)
+            if error:
+                raise RuntimeError(error)
+            for i, p in enumerate(ids):
+                if cant_masks[i][t]:
+                    _, status = _apply_cant(sim, p, CANT_PASSWORD)
+                elif skip_masks[i][t]:
+                    _, status = _apply_skip(sim, p)
+                else:
+                    for ex in EXERCISES:
+                        _apply_exercise(sim, p, ex)
+                    status = "ok"
+                if status != "ok":
+                    raise RuntimeError(f"{name}: Tag {sim['day']} {p}: {status}")
+                _update_today(sim, p)
+                for j, ex in enumerate(EXERCISES):
+                    reps[i][j].append(sim["reps"][p][ex])
+                    overall[i][j].append(sim["overall"][p][ex])
+        results[name] = {"reps": reps, "overall": overall}
+    return results
+
+
+def _advance_days(state, days: int, policy: str = "open"):
+    """
+    Springt days Tage vor – in einem Schritt statt Tag für Tag: der aktuelle
+    Tag wird archiviert, die days-1 übersprungenen Tage als ein Block
+    (Reps +1 pro Tag, nichts erledigt), danach reps += days und done zurück.
+
+    policy bestimmt, wie nicht abgeschlossene Tage zählen: "open" (als
+    verpasst in der Historie) oder "skip" (zusätzlich als Skip-Tage im
+    Kalender, zählen also bei skip_days und für den Skip-Cooldown).
+    """
+    ids = member_ids(state)
+    day = state["day"]
+    missed = days - 1
+
+    if policy == "skip":
+        for internal in ids:
+            cal = calendar(state, internal)
+            if not state["today"]["closed"].get(internal, False):
+                cal.add("skip", day)
+            cal.add_range("skip", day + 1, missed)
+
+    _archive_day(state)
+    if missed > 0:
+        DayHistory(state["history"]).append_missed(
+            day + 1,
+            missed,
+            {p: ({ex: state["reps"][p][ex] + 1 for ex in EXERCISES}, policy) for p in ids},
+            EXERCISES,
+        )
+    state["day"] = day + days
+
+    for internal in ids:
+        for ex in EXERCISES:
+            state["done"][internal][ex] = False
+            state["credited"][internal][ex] = 0
+            state["reps"][internal][ex] += days
+
+    _recount_today(state)
+
+
+def _reduce_nextday(state):
+    """Reducer für /api/nextday: gibt (error, commit) zurück."""
+    if AUTO_ROLLOVER:
+        return "Der Tag wechselt automatisch um Mitternacht.", False
+    ids = member_ids(state)
+    today = state["today"]
+    if today["closed_count"] < len(ids):
+        for internal in ids:
+            if not today["closed"].get(internal, False):
+                return f"{internal} ist für diesen Tag noch nicht fertig.", False
+
+    _advance_days(state, 1)
+    return None, True
+
+
+def _reduce_rollover(state):
+    """Reducer (Auto-Modus): verpasste Kalendertage nachholen. Gibt (Tage, commit) zurück."""
+    gap = calendar_day(state) - state["day"]
+    if gap <= 0:
+        return 0, False
+    _advance_days(state, gap, ROLLOVER_POLICY)
+    return gap, True
+
+
+def admin_password_ok(password) -> bool:
+    """Admin-Passwort prüfen; ohne gesetztes WORKOUT_ADMIN_PASSWORD immer False."""
+    if not ADMIN_PASSWORD or not isinstance(password, str):
+        return False
+    return hmac.compare_digest(password.encode("utf-8"), ADMIN_PASSWORD.encode("utf-8"))
+
+
+ADMIN_DISABLED_MESSAGE = "Admin-Aktionen sind ausgeschaltet (WORKOUT_ADMIN_PASSWORD nicht gesetzt)."
+
+
+def _reduce_fastforward(state, days, password):
+    """
+    Reducer für /api/fastforward: days Tage auf einmal vorspulen (im
+    Auto-Modus bis zum heutigen Kalendertag). Gibt ((message, status), commit) zurück.
+    """
+    if not ADMIN_PASSWORD:
+        return (ADMIN_DISABLED_MESSAGE, 403), False
+    if not admin_password_ok(password):
+        return ("Falsches Passwort.", 403), False
+    if AUTO_ROLLOVER:
+        days = calendar_day(state) - state["day"]
+        if days <= 0:
+            return ("Schon auf dem heutigen Tag.", 200), False
+    elif not isinstance(days, int) or isinstance(days, bool) or not 1 <= days <= FASTFORWARD_MAX_DAYS:
+        return (f"days muss zwischen 1 und {FASTFORWARD_MAX_DAYS} liegen.", 400), False
+    _advance_days(state, days, ROLLOVER_POLICY)
+    return (f"{days} Tag(e) vorgespult.", 200), True
+
+
+@bp.before_app_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+# Budgets der Endpoints; Requests mit Passwort zählen zusätzlich gegen "password"
+RATE_READ_ENDPOINTS = {
+    "workout.api_state",
+    "workout.api_stream",
+    "workout.api_history",
+    "workout.api_export",
+    "workout.api_projection",
+    "workout.api_leaderboard",
+}
+RATE_WRITE_ENDPOINTS = {
+    "workout.api_action",
+    "workout.api_actions",
+    "workout.api_nextday",
+    "workout.api_fastforward",
+    "workout.api_import",
+}
+
+
+def rate_limit_retry(limits, kind: str, addr: str, group, role: str, password: bool = False):
+    """
+    Nimmt je ein Token aus den Buckets eines Requests (kind "read"/"write",
+    mit password zusätzlich "password"); limits ist RATE_LIMITS aus der
+    App-Config. Gibt die Wartezeit in Sekunden zurück, wenn ein Bucket leer
+    ist, sonst 0.0.
+    """
+    checks = [(kind, f"{kind}|{addr}|{group or ''}|{role}")]
+    if password:
+        checks.append(("password", f"password|{addr}"))
+    for bucket, key in checks:
+        rate, burst = limits[bucket]
+        retry = RATE_LIMITER.check(key, rate, burst)
+        if retry:
+            METRICS.inc("workout_rate_limited_total", (("bucket", bucket),))
+            return retry
+    return 0.0
+
+
+def rate_limit_role(role_raw) -> str:
+    """
+    Rolle als Teil des Bucket-Schlüssels, ohne den State zu lesen: wie
+    angefragt (klein), unbrauchbare Werte zählen als "". Unbekannte Rollen
+    bekommen so eigene Buckets – das Passwort-Budget gilt aber pro Adresse.
+    """
+    role = role_raw.lower() if isinstance(role_raw, str) else ""
+    return role if GROUP_ID_RE.match(role) else ""
+
+
+def _carries_password(data) -> bool:
+    """Body einer passwortgeprüften Aktion (Cant, Fast-Forward)? Der Import schickt es als Header."""
+    if not isinstance(data, dict):
+        return False
+    if "password" in data:
+        return True
+    actions = data.get("actions")
+    return isinstance(actions, list) and any(isinstance(a, dict) and "password" in a for a in actions)
+
+
+@bp.before_app_request
+def _rate_limit():
+    """Token-Bucket pro Client (Adresse, Gruppe, Rolle); leer -> 429 mit Retry-After."""
+    if not current_app.config["RATE_LIMIT"]:
+        return None
+    endpoint = request.endpoint
+    if endpoint in RATE_READ_ENDPOINTS:
+        kind, data = "read", None
+        role_raw = request.args.get("role")
+    elif endpoint in RATE_WRITE_ENDPOINTS:
+        kind = "write"
+        data = None if endpoint == "workout.api_import" else request.get_json(force=True, silent=True)
+        role_raw = data.get("role") if isinstance(data, dict) else None
     else:
-        role = "mann"
+        return None
+    role = rate_limit_role(role_raw)
+    password = "X-Workout-Password" in request.headers or _carries_password(data)
+    retry = rate_limit_retry(current_app.config["RATE_LIMITS"], kind, request.remote_addr or "", g.get("group"), role, password)
+    if not retry:
+        return None
+    response = jsonify({"error": "Zu viele Anfragen – bitte kurz warten."})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry)))
+    return response
 
-    male_name = (
-        request.args.get("male_name")
-        or request.args.get("mann")
-        or DEFAULT_MALE_NAME
-    )
-    female_name = (
-        request.args.get("female_name")
-        or request.args.get("frau")
-        or DEFAULT_FEMALE_NAME
+
+@bp.before_app_request
+def _start_backups():
+    BACKUPS.ensure_started()
+
+
+# Endpoints, die den State lesen oder ändern: vorher verpasste Kalendertage nachholen
+ROLLOVER_ENDPOINTS = {
+    "workout.api_state",
+    "workout.api_stream",
+    "workout.api_history",
+    "workout.api_export",
+    "workout.api_projection",
+    "workout.api_action",
+    "workout.api_actions",
+}
+
+
+@bp.before_app_request
+def _auto_rollover():
+    """Auto-Modus: liegt der Kalender vor state["day"], einmal (für alle Worker) vorspulen."""
+    if not AUTO_ROLLOVER or request.endpoint not in ROLLOVER_ENDPOINTS:
+        return
+    state = peek_state()
+    if calendar_day(state) > state["day"]:
+        try:
+            update_state(_reduce_rollover)
+        except StateConflict:
+            pass  # jemand anderes committet gerade; der nächste Request holt es nach
+
+
+@bp.after_app_request
+def _record_request(response):
+    started = g.get("request_started")
+    if started is not None:
+        endpoint = request.endpoint or "unknown"
+        METRICS.observe(
+            "workout_http_request_seconds",
+            time.perf_counter() - started,
+            (("endpoint", endpoint), ("method", request.method)),
+        )
+        METRICS.inc(
+            "workout_http_requests_total",
+            (("endpoint", endpoint), ("method", request.method), ("status", str(response.status_code))),
+        )
+    return response
+
+
+@bp.after_app_request
+def _compress(response):
+    """
+    gzip bzw. Brotli (serializer.negotiate) für /api/-Antworten ab
+    COMPRESS_MIN_BYTES. Gestreamte Antworten (SSE, Export) bleiben roh; das
+    ETag wird schwach, weil sich die Bytes je nach Kodierung unterscheiden.
+    """
+    if (
+        not COMPRESS
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or "/api/" not in request.path
+    ):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = serializer.negotiate(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+    response.set_data(serializer.compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+@bp.url_value_preprocessor
+def _pull_group(endpoint, values):
+    """/g/<group>/...: Gruppe aus der URL in g.group übernehmen."""
+    g.group = (values or {}).pop("group", None)
+    if g.group is None:
+        return
+    if not is_valid_group(g.group):
+        abort(404)
+    if not GROUPS_AUTOCREATE and not os.path.isdir(group_dir(g.group)):
+        abort(404)
+
+
+@bp.route("/")
+@bp.route("/g/<group>/")
+def index():
+    return _render_index(peek_state())
+
+
+# ?view=… Kurzformen aus der Paar-Zeit
+VIEW_ALIASES = {"female": "frau", "f": "frau", "male": "mann", "m": "mann"}
+# Namen des klassischen Paars: Query-Parameter bzw. Umgebung wie bisher
+PAIR_NAME_ARGS = {"mann": ("male_name", DEFAULT_MALE_NAME), "frau": ("female_name", DEFAULT_FEMALE_NAME)}
+
+
+def _member_display_name(member) -> str:
+    """Anzeigename: ?<rolle>= bzw. ?male_name=/female_name=, dann Name aus dem State, dann Default."""
+    name_arg, default = PAIR_NAME_ARGS.get(member["role"], (None, None))
+    return (
+        (name_arg and request.args.get(name_arg))
+        or request.args.get(member["role"])
+        or member.get("name")
+        or default
+        or member["role"].capitalize()
     )
 
-    return render_template(
+
+def _render_index(state):
+    """Startseite für die Mitglieder dieses States (auch von asgi.py genutzt)."""
+    view_raw = (request.args.get("view") or "").lower()
+    role = _normalize_role(state, VIEW_ALIASES.get(view_raw, view_raw))
+    members = [{"role": m["role"], "name": _member_display_name(m)} for m in state["members"]]
+    names = {m["role"]: m["name"] for m in members}
+
+    t0 = time.perf_counter()
+    html = render_template(
         "index.html",
         role=role,
-        male_name=male_name,
-        female_name=female_name,
+        members=members,
+        # {male}/{female} in den Sprüchen
+        male_name=names.get("mann", members[0]["name"]),
+        female_name=names.get("frau", members[1]["name"]),
+        api_base=f"/g/{g.group}" if g.group else "",
+        asset_version=current_app.config.get("ASSET_VERSION") or "",
     )
+    _observe_stage("render", time.perf_counter() - t0)
+    return html
 
 
-@app.route("/api/state")
-def api_state():
-    role_view = _normalize_role(request.args.get("role"))
-    state = load_state()
-    response = _build_client_state(state, role_view)
-    return jsonify(response)
+def _state_etag(epoch: str, version: int, role_view: str) -> str:
+    return f"{epoch}-v{version}-{role_view}"
 
 
-@app.route("/api/action", methods=["POST"])
-def api_action():
-    data = request.get_json(force=True) or {}
-    role_view = _normalize_role(data.get("role"))
-    action = data.get("action")
+def _event_id(epoch: str, version: int) -> str:
+    """SSE-Event-ID: Version mit Epoche, damit ein Reconnect nach Neuanlage nicht falsch anschliesst."""
+    return f"{epoch}.{version}"
+
+
+def _parse_event_id(raw, epoch: str) -> int:
+    """Version aus Last-Event-ID, -1 wenn leer, kaputt oder aus einer anderen Epoche."""
+    last_epoch, _, version = (raw or "").rpartition(".")
+    if last_epoch != epoch:
+        return -1
+    try:
+        return int(version)
+    except ValueError:
+        return -1
+
+
+def _memo_get(epoch: str, version: int, role_view: str):
+    """Memoisierte Client-State-Payload dieser Gruppe/Epoche/Version/Rolle oder None."""
+    key = (_current_group(), epoch, version, role_view)
+    with _state_memo_lock:
+        entry = _state_memo.get(key)
+        if entry is not None:
+            _state_memo.move_to_end(key)
+            return entry[0]
+    return None
+
+
+def _memoized_client_state(epoch: str, version: int, role_view: str):
+    """
+    (Version, Payload, serialisierte Antwort) für /api/state und /api/stream,
+    gebaut höchstens einmal pro (Gruppe, Epoche, Version, Rolle). Payload
+    nicht mutieren; die Epoche des gelieferten Stands steht in payload["epoch"].
+    """
+    key = (_current_group(), epoch, version, role_view)
+    with _state_memo_lock:
+        entry = _state_memo.get(key)
+        if entry is not None:
+            _state_memo.move_to_end(key)
+            return (version,) + entry
+
     state = load_state()
+    role_view = _normalize_role(state, role_view)
+    payload = _build_client_state(state, role_view)
+    body = current_app.json.dumps(payload) + "\n"
+    # Version kann sich seit peek_state() geändert haben -> unter der echten ablegen
+    version = int(state["version"])
+    with _state_memo_lock:
+        _state_memo[(key[0], payload["epoch"], version, role_view)] = (payload, body)
+        while len(_state_memo) > STATE_MEMO_SIZE:
+            _state_memo.popitem(last=False)
+    return version, payload, body
+
+
+@bp.route("/service-worker.js")
+def service_worker():
+    # aus dem Root ausliefern, damit der Scope auch /api/... und /g/... abdeckt
+    response = send_from_directory(current_app.static_folder, "service-worker.js", max_age=0)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
-    internal_person = ROLE_TO_INTERNAL[role_view]
-    day = state["day"]
 
-    message = ""
+@bp.route("/api/state")
+@bp.route("/g/<group>/api/state")
+def api_state():
+    state = peek_state()
+    role_view = _normalize_role(state, request.args.get("role"))
+    version = int(state["version"])
+    etag = _state_etag(state.get("epoch", ""), version, role_view)
 
-    # Wenn "sport" aktiv ist, sind ALLE anderen Aktionen gesperrt (gemäss Vorgabe),
-    # ausser sport_undo (toggle).
-    sport_today = day in state.get("sport", {}).get(internal_person, [])
-    if sport_today and action not in ("sport_undo",):
-        resp = _build_client_state(state, role_view, "Heute ist bereits als „Sport gemacht“ markiert. Erst wieder deaktivieren, dann ändern.")
-        return jsonify(resp), 403
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        version, payload, body = _memoized_client_state(state.get("epoch", ""), version, role_view)
+        etag = _state_etag(payload["epoch"], version, role_view)
+        response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    # Browser dürfen cachen, müssen aber jedes Mal mit If-None-Match nachfragen
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _stream_changes(old, new):
+    """Top-Level-Felder des Client-States, die sich geändert haben."""
+    return {
+        k: v for k, v in new.items()
+        if k not in ("version", "message") and old.get(k) != v
+    }
 
+
+# offene /api/stream-Verbindungen dieses Workers, je eine hält einen gthread-Thread
+_open_streams = 0
+_open_streams_lock = threading.Lock()
+
+
+def _acquire_stream_slot() -> bool:
+    global _open_streams
+    with _open_streams_lock:
+        if _open_streams >= current_app.config["STREAMS_PER_WORKER"]:
+            return False
+        _open_streams += 1
+        return True
+
+
+def _release_stream_slot():
+    global _open_streams
+    with _open_streams_lock:
+        _open_streams -= 1
+
+
+def _stream_busy():
+    """
+    Alle Stream-Plätze belegt: kein Thread wird gehalten. "busy" schaltet den
+    Browser auf Polling von /api/state, retry lässt ihn es später (gestreut)
+    wieder mit dem Stream versuchen.
+    """
+    retry_ms = random.randint(*STREAM_BUSY_RETRY_MS)
+    return Response(
+        f"retry: {retry_ms}\nevent: busy\ndata: {{}}\n\n",
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+def _sse(event: str, event_id: str, data) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+
+@bp.route("/api/stream")
+@bp.route("/g/<group>/api/stream")
+def api_stream():
+    """
+    Server-Sent Events: nach jedem Commit ein Patch mit den geänderten Feldern
+    des Client-States ("patch": base -> version), beim Verbinden bzw. wenn der
+    Stand des Clients unbekannt ist der volle State ("state"). Event-ID ist
+    "Epoche.Version" (_event_id), ein Reconnect mit Last-Event-ID setzt dort fort. Die Verbindung
+    wird nach STREAM_MAX_SECONDS beendet, der Browser verbindet neu. Pro Worker
+    höchstens STREAMS_PER_WORKER gleichzeitig, darüber _stream_busy().
+    """
+    if not _acquire_stream_slot():
+        return _stream_busy()
     try:
-        if action == "exercise":
-            exercise_external = data.get("exercise")
-            if exercise_external not in EXTERNAL_TO_INTERNAL_EXERCISE:
-                return jsonify({"error": "Ungültige Übung"}), 400
-            internal_ex = EXTERNAL_TO_INTERNAL_EXERCISE[exercise_external]
-            state, changed = _apply_exercise(state, internal_person, internal_ex)
-            if changed:
-                message = f"{exercise_external.capitalize()} erledigt."
-            else:
-                message = f"{exercise_external.capitalize()} war bereits erledigt."
-
-        elif action == "exercise_undo":
-            exercise_external = data.get("exercise")
-            if exercise_external not in EXTERNAL_TO_INTERNAL_EXERCISE:
-                return jsonify({"error": "Ungültige Übung"}), 400
-            internal_ex = EXTERNAL_TO_INTERNAL_EXERCISE[exercise_external]
-            state, changed = _apply_exercise_undo(state, internal_person, internal_ex)
-            if changed:
-                message = f"{exercise_external.capitalize()} wieder abgewählt."
-            else:
-                message = f"{exercise_external.capitalize()} war nicht als erledigt markiert."
+        response = _open_stream()
+    except BaseException:
+        _release_stream_slot()
+        raise
+    response.call_on_close(_release_stream_slot)
+    return response
 
-        elif action == "skip":
-            state, status = _apply_skip(state, internal_person)
-            if status == "cheater_skip":
-                message = "Skip zu früh – Cheater erkannt."
-            else:
-                message = "Skip-Tag gesetzt. Heute offiziell faul."
 
-        elif action == "skip_undo":
-            state, status = _apply_skip_undo(state, internal_person)
-            if status == "ok":
-                message = "Skip-Tag zurückgenommen."
-            else:
-                message = "Für heute war kein Skip gesetzt."
+def _open_stream():
+    notifier = get_store(_current_group()).notifier
+    seq = notifier.seq()
+    state = peek_state()
+    role_view = _normalize_role(state, request.args.get("role"))
+    epoch = state.get("epoch", "")
+    last_id = _parse_event_id(request.headers.get("Last-Event-ID"), epoch)
+
+    def events():
+        nonlocal seq
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        yield "retry: 3000\n\n"
+
+        # (Version, Payload) des Stands, den der Client hat
+        sent = None
+        if last_id >= 0:
+            payload = _memo_get(epoch, last_id, role_view)
+            if payload is not None:
+                sent = (last_id, payload)
+
+        while True:
+            current = peek_state()
+            version, payload, _ = _memoized_client_state(current.get("epoch", ""), int(current["version"]), role_view)
+            event_id = _event_id(payload["epoch"], version)
+            if sent is not None and sent[1]["epoch"] != payload["epoch"]:
+                sent = None  # State neu angelegt: voller State statt Patch
+            if sent is None and version == last_id and payload["epoch"] == epoch:
+                sent = (version, payload)
+            elif sent is None:
+                yield _sse("state", event_id, payload)
+                sent = (version, payload)
+            elif version != sent[0]:
+                patch = {"base": sent[0], "version": version, "epoch": payload["epoch"],
+                         "changes": _stream_changes(sent[1], payload)}
+                yield _sse("patch", event_id, patch)
+                sent = (version, payload)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            new_seq = notifier.wait(seq, min(STREAM_HEARTBEAT_S, remaining))
+            if new_seq == seq:
+                yield ": keep-alive\n\n"
+            seq = new_seq
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        elif action == "injured":
-            state, _ = _apply_injured(state, internal_person)
-            message = "Tag als krank/verletzt markiert."
 
-        elif action == "injured_undo":
-            state, status = _apply_injured_undo(state, internal_person)
-            if status == "ok":
-                message = "krank/verletzt-Status zurückgenommen."
-            else:
-                message = "Für heute war kein krank/verletzt-Status gesetzt."
-
-        elif action == "cant":
-            password = data.get("password", "")
-            state, status = _apply_cant(state, internal_person, password)
-            if status == "wrong_password":
-                state = load_state()
-                resp = _build_client_state(
-                    state,
-                    role_view,
-                    "Falsches Passwort für „Ich kann nicht mehr!“."
-                )
-                return jsonify(resp), 403
-            elif status == "cheater_cant":
-                message = "„Ich kann nicht mehr!“ zu früh – Cheater erkannt."
-            else:
-                message = "Reps reduziert. Heute war's hart genug."
+def _int_arg(name):
+    raw = request.args.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        abort(400)
 
-        elif action == "cant_undo":
-            state, status = _apply_cant_undo(state, internal_person)
-            if status == "ok":
-                message = "„Ich kann nicht mehr!“-Status zurückgenommen."
-            else:
-                message = "Für heute war kein „Ich kann nicht mehr!“-Status gesetzt."
-
-
-        elif action == "cant_exercise":
-            exercise_external = data.get("exercise")
-            if exercise_external not in EXTERNAL_TO_INTERNAL_EXERCISE:
-                return jsonify({"error": "Ungültige Übung"}), 400
-            internal_ex = EXTERNAL_TO_INTERNAL_EXERCISE[exercise_external]
-            password = data.get("password", "")
-            state, status = _apply_cant_exercise(state, internal_person, internal_ex, password)
-            if status == "wrong_password":
-                state = load_state()
-                resp = _build_client_state(state, role_view, "Falsches Passwort für „Ich kann nicht mehr!“ (Übung).")
-                return jsonify(resp), 403
-            elif status == "cheater_cant":
-                message = "„Ich kann nicht mehr!“ zu früh – Cheater erkannt."
-            elif status == "already":
-                message = f"„Ich kann nicht mehr!“ für {exercise_external} ist heute bereits gesetzt."
-            else:
-                message = f"Reps reduziert für {exercise_external}. Du lebst noch."
-
-        elif action == "cant_exercise_undo":
-            exercise_external = data.get("exercise")
-            if exercise_external not in EXTERNAL_TO_INTERNAL_EXERCISE:
-                return jsonify({"error": "Ungültige Übung"}), 400
-            internal_ex = EXTERNAL_TO_INTERNAL_EXERCISE[exercise_external]
-            state, status = _apply_cant_exercise_undo(state, internal_person, internal_ex)
-            if status == "ok":
-                message = f"„Ich kann nicht mehr!“ für {exercise_external} zurückgenommen."
-            else:
-                message = f"Für {exercise_external} war heute kein „Ich kann nicht mehr!“ gesetzt."
-
-        # NEW: heute sport gemacht (togglebar)
-        elif action == "sport":
-            state, status = _apply_sport(state, internal_person)
-            if status == "not_allowed":
-                message = "Heute ist bereits abgeschlossen (oder in einem Status). „Heute Sport gemacht“ geht jetzt nicht mehr."
-            elif status == "already":
-                message = "Heute ist bereits als „Sport gemacht“ markiert."
-            else:
-                message = "Heute als „Sport gemacht“ markiert. Übungen gelten als erledigt."
 
-        elif action == "sport_undo":
-            state, status = _apply_sport_undo(state, internal_person)
-            if status == "ok":
-                message = "„Sport gemacht“ für heute zurückgenommen."
-            else:
-                message = "Für heute war kein „Sport gemacht“ gesetzt."
+@bp.route("/api/history")
+@bp.route("/g/<group>/api/history")
+def api_history():
+    """
+    Archivierte Tage als Spalten: ?from=&to= (Tagnummern, inklusive),
+    optional person=<rolle> und exercise=<crunches|pushups|squats>.
+    """
+    state = peek_state()
+    hist = DayHistory(state.get("history") or {})
+    lo, sl = hist.bounds(_int_arg("from"), _int_arg("to"))
+
+    person_raw = request.args.get("person")
+    if person_raw:
+        member = _member_by_role(state, person_raw.lower())
+        if member is None:
+            return jsonify({"error": "Unbekannte Person"}), 400
+        people = [member["id"]]
+    else:
+        people = member_ids(state)
+
+    exercise_raw = request.args.get("exercise")
+    if exercise_raw and exercise_raw not in EXTERNAL_TO_INTERNAL_EXERCISE:
+        return jsonify({"error": "Ungültige Übung"}), 400
+    exercises = [EXTERNAL_TO_INTERNAL_EXERCISE[exercise_raw]] if exercise_raw else EXERCISES
+
+    n = sl.stop - sl.start
+    members = {}
+    for p in people:
+        masks = hist.done_masks(p, sl)
+        entry = {"reps": {}, "done": {}}
+        for ex in exercises:
+            bit = 1 << EXERCISES.index(ex)
+            ui_ex = INTERNAL_TO_EXTERNAL_EXERCISE[ex]
+            entry["reps"][ui_ex] = hist.reps(p, ex, sl).tolist()
+            entry["done"][ui_ex] = [bool(m & bit) for m in masks]
+        entry["status"] = [STATUS_CODES[c] for c in hist.statuses(p, sl)]
+        members[_role_label(state, p)] = entry
+
+    return jsonify({
+        "from": lo if n else None,
+        "to": lo + n - 1 if n else None,
+        "first_day": hist.first_day,
+        "last_day": hist.last_day,
+        "start_date": state.get("start_date"),
+        "members": members,
+    })
+
+
+@bp.route("/api/export")
+@bp.route("/g/<group>/api/export")
+def api_export():
+    """
+    Alle Tage als Download, eine Zeile pro Person × Tag × Übung:
+    ?format=ndjson (Standard) oder csv. Wird in Blöcken gestreamt
+    (chunked), der State-Stand ist der beim Request-Beginn.
+    """
+    fmt = (request.args.get("format") or "ndjson").lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": "format muss ndjson oder csv sein"}), 400
+    state = peek_state()
+    mimetype, ext = EXPORT_FORMATS[fmt]
+    filename = f"workout-{_current_group() or 'export'}-tag{state['day']}.{ext}"
+    return Response(
+        encode_export(export_rows(state), fmt),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
 
-        else:
-            return jsonify({"error": "Ungültige Aktion"}), 400
 
-    finally:
-        save_state(state)
+@bp.route("/api/import", methods=["POST"])
+@bp.route("/g/<group>/api/import", methods=["POST"])
+def api_import():
+    """
+    Ersetzt die Trainingsdaten durch einen Export (Body: CSV oder NDJSON,
+    ?format= oder Content-Type). Admin-Passwort (WORKOUT_ADMIN_PASSWORD, ohne
+    ist der Import ausgeschaltet) im Header X-Workout-Password; ?dry_run=1
+    prüft nur, ?accept_overall=1 erlaubt geänderte Gesamtsummen (Nachtragen).
+    Fehler kommen gesammelt als 400.
+    """
+    if not ADMIN_PASSWORD:
+        return jsonify({"error": ADMIN_DISABLED_MESSAGE}), 403
+    if not admin_password_ok(request.headers.get("X-Workout-Password")):
+        return jsonify({"error": "Falsches Passwort."}), 403
+    fmt = (request.args.get("format") or guess_format(content_type=request.content_type)).lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": "format muss ndjson oder csv sein"}), 400
+    dry_run = request.args.get("dry_run") in ("1", "true")
+    accept_overall = request.args.get("accept_overall") in ("1", "true")
+
+    lines = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    state, errors, changes = apply_import(decode_import(lines, fmt), dry_run=dry_run, accept_overall=accept_overall)
+    overall = [{"person": role, "exercise": ex, "before": before, "after": after} for role, ex, before, after in changes]
+    if errors:
+        return jsonify({"error": "Import abgelehnt.", "errors": errors, "overall_changes": overall}), 400
+    return jsonify({
+        "message": f"{state['day']} Tag(e) {'geprüft' if dry_run else 'importiert'}.",
+        "day": state["day"],
+        "start_date": state["start_date"],
+        "version": None if dry_run else state["version"],
+        "overall_changes": overall,
+    })
+
+
+@bp.route("/api/leaderboard")
+@bp.route("/g/<group>/api/leaderboard")
+def api_leaderboard():
+    """
+    Rangliste über alle Instanzen: ?exercise=crunches|pushups|squats|all
+    (Standard all), metric=overall|reps (Standard overall), top= (1–100,
+    Standard 10). Aus dem Speicher; Änderungen erscheinen nach höchstens
+    WORKOUT_LEADERBOARD_POLL_S Sekunden.
+    """
+    if not LEADERBOARD:
+        abort(404)
+    exercise = request.args.get("exercise") or "all"
+    if exercise != "all" and exercise not in EXTERNAL_TO_INTERNAL_EXERCISE:
+        return jsonify({"error": "Ungültige Übung"}), 400
+    metric = request.args.get("metric") or "overall"
+    if metric not in ("overall", "reps"):
+        return jsonify({"error": "metric muss overall oder reps sein"}), 400
+    top = _int_arg("top")
+    top = 10 if top is None else top
+    if not 1 <= top <= LEADERBOARD_MAX_TOP:
+        return jsonify({"error": f"top muss zwischen 1 und {LEADERBOARD_MAX_TOP} liegen"}), 400
+
+    LEADERBOARD_INDEX.ensure_started()
+    entries = [
+        {"rank": rank, "group": None if scope == DEFAULT_SCOPE else scope, "person": person, **info, "value": value}
+        for rank, scope, person, info, value in LEADERBOARD_INDEX.top(exercise, metric, top)
+    ]
+    return jsonify({
+        "exercise": exercise,
+        "metric": metric,
+        "instances": LEADERBOARD_INDEX.instances(),
+        "entries": entries,
+    })
+
+
+@bp.route("/api/projection")
+@bp.route("/g/<group>/api/projection")
+def api_projection():
+    """
+    Hochrechnung über ?days= (Standard 90) für die Szenarien no_cant,
+    cant_max und historical_skips; mit series=1 inkl. Tageswerten.
+    """
+    days = _int_arg("days") or 90
+    if not 1 <= days <= PROJECTION_MAX_DAYS:
+        return jsonify({"error": f"days muss zwischen 1 und {PROJECTION_MAX_DAYS} liegen"}), 400
+    with_series = request.args.get("series") == "1"
+
+    state = peek_state()
+    reps0, overall0, schedules = _projection_inputs(state, days)
+    projected = project(reps0, overall0, schedules, days, CANT_REDUCTION)
+
+    scenarios = {}
+    for name, result in projected.items():
+        per_member = {}
+        for i, p in enumerate(member_ids(state)):
+            entry = {"reps": {}, "overall": {}}
+            if with_series:
+                entry["series"] = {"reps": {}, "overall": {}}
+            for j, ex in enumerate(EXERCISES):
+                ui_ex = INTERNAL_TO_EXTERNAL_EXERCISE[ex]
+                entry["reps"][ui_ex] = result["reps"][i][j][-1]
+                entry["overall"][ui_ex] = result["overall"][i][j][-1]
+                if with_series:
+                    entry["series"]["reps"][ui_ex] = result["reps"][i][j]
+                    entry["series"]["overall"][ui_ex] = result["overall"][i][j]
+            per_member[_role_label(state, p)] = entry
+        scenarios[name] = per_member
+
+    return jsonify({
+        "engine": PROJECTION_ENGINE,
+        "days": days,
+        "from_day": int(state["day"]) + 1,
+        "to_day": int(state["day"]) + days,
+        "scenarios": scenarios,
+    })
+
+
+def _group_state_bytes():
+    """(Anzahl Gruppen, Summe der State-Dateien) unter GROUPS_DIR."""
+    names = (STATE_FILE, STATE_FILE + ".journal", SQLITE_FILE, SQLITE_FILE + "-wal")
+    count = total = 0
+    try:
+        entries = list(os.scandir(GROUPS_DIR))
+    except FileNotFoundError:
+        return 0, 0
+    for entry in entries:
+        if not entry.is_dir():
+            continue
+        count += 1
+        for name in names:
+            try:
+                total += os.stat(os.path.join(entry.path, name)).st_size
+            except FileNotFoundError:
+                pass
+    return count, total
+
+
+def _metrics_denied():
+    """403, wenn /metrics bzw. /api/cache-stats ohne gültiges Bearer-Token (WORKOUT_METRICS_TOKEN) abgefragt werden."""
+    if not METRICS_TOKEN:
+        return jsonify({"error": "Metriken sind ausgeschaltet (WORKOUT_METRICS_TOKEN nicht gesetzt)."}), 403
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode("utf-8"), METRICS_TOKEN.encode("utf-8")):
+        return jsonify({"error": "Falsches Token."}), 403
+    return None
+
+
+@bp.route("/metrics")
+def metrics():
+    denied = _metrics_denied()
+    if denied:
+        return denied
+    groups, group_bytes = _group_state_bytes()
+    gauges = [
+        ("workout_state_bytes", (), STORE.size_bytes()),
+        ("workout_group_state_bytes", (), group_bytes),
+        ("workout_groups", (), groups),
+    ]
+    last_backup = BACKUPS.last_success()
+    if last_backup is not None:
+        gauges.append(("workout_backup_last_success_seconds", (), int(last_backup)))
+    body = METRICS.render(gauges=gauges)
+    return current_app.response_class(body, mimetype="text/plain; version=0.0.4")
 
+
+@bp.route("/api/cache-stats")
+def api_cache_stats():
+    denied = _metrics_denied()
+    if denied:
+        return denied
+    return jsonify(state_cache_stats())
+
+
+@bp.route("/api/action", methods=["POST"])
+@bp.route("/g/<group>/api/action", methods=["POST"])
+def api_action():
+    data = request.get_json(force=True) or {}
+    role_raw = data.get("role")
+    action = data.get("action")
+    if_match = _if_match_version()
+
+    try:
+        state, (message, status) = update_state(
+            _idempotent(
+                lambda st: _reduce_action(st, _normalize_role(st, role_raw), action, data),
+                _idempotency_key(),
+                _request_fingerprint("action", data),
+            ),
+            expected_version=if_match,
+        )
+    except StateConflict as exc:
+        return _conflict_response(exc, role_raw, if_match)
+    except IdempotencyMismatch:
+        return _idempotency_mismatch_response()
+
+    if status == 400:
+        return jsonify({"error": message}), 400
+
+    role_view = _normalize_role(state, role_raw)
     resp = _build_client_state(state, role_view, message)
+    if status != 200:
+        return jsonify(resp), status
     return jsonify(resp)
 
 
-@app.route("/api/nextday", methods=["POST"])
+@bp.route("/api/actions", methods=["POST"])
+@bp.route("/g/<group>/api/actions", methods=["POST"])
+def api_actions():
+    """
+    Mehrere Aktionen in einem Rutsch: {"role": "mann", "actions": [{"action": ...}, ...]}.
+    Einmal laden, alle anwenden, einmal speichern – alles oder nichts.
+    """
+    data = request.get_json(force=True) or {}
+    role_raw = data.get("role")
+    actions = data.get("actions")
+    if not isinstance(actions, list) or not actions:
+        return jsonify({"error": "actions muss eine nicht-leere Liste sein"}), 400
+    if len(actions) > MAX_BATCH_ACTIONS:
+        return jsonify({"error": f"Höchstens {MAX_BATCH_ACTIONS} Aktionen pro Aufruf"}), 400
+    if_match = _if_match_version()
+
+    try:
+        state, (results, status) = update_state(
+            _idempotent(
+                lambda st: _reduce_actions(st, role_raw, actions),
+                _idempotency_key(),
+                _request_fingerprint("actions", data),
+            ),
+            expected_version=if_match,
+        )
+    except StateConflict as exc:
+        return _conflict_response(exc, role_raw, if_match)
+    except IdempotencyMismatch:
+        return _idempotency_mismatch_response()
+
+    if status == 400:
+        return jsonify({"error": results[-1]["message"], "results": results}), 400
+    if status != 200:
+        state = load_state()  # nichts committet -> teilweise angewendeten State verwerfen
+
+    role_view = _normalize_role(state, role_raw)
+    resp = _build_client_state(state, role_view, results[-1]["message"])
+    resp["results"] = results
+    return jsonify(resp), status
+
+
+@bp.route("/api/nextday", methods=["POST"])
+@bp.route("/g/<group>/api/nextday", methods=["POST"])
 def api_nextday():
-    state = load_state()
+    if_match = _if_match_version()
+    try:
+        state, error = update_state(_reduce_nextday, expected_version=if_match)
+    except StateConflict as exc:
+        return _conflict_response(exc, None, if_match)
 
-    for internal in ["male", "female"]:
-        if not is_day_closed_for_person(state, internal):
-            return (
-                jsonify({"error": f"{internal} ist für diesen Tag noch nicht fertig."}),
-                400,
-            )
+    if error:
+        return jsonify({"error": error}), 400
 
-    state["day"] += 1
+    resp = _build_client_state(state, state["members"][0]["role"], "Neuer Tag gestartet.")
+    return jsonify(resp)
 
-    for internal in ["male", "female"]:
-        for ex in EXERCISES:
-            state["done"][internal][ex] = False
-            state["reps"][internal][ex] += 1
 
-    save_state(state)
-    resp = _build_client_state(state, "mann", "Neuer Tag gestartet.")
-    return jsonify(resp)
+@bp.route("/api/fastforward", methods=["POST"])
+@bp.route("/g/<group>/api/fastforward", methods=["POST"])
+def api_fastforward():
+    """
+    Admin: {"days": 30, "password": "<WORKOUT_ADMIN_PASSWORD>"} spult in
+    einem Commit vor, egal wie viele Tage (im Auto-Modus bis heute, days
+    wird ignoriert).
+    """
+    data = request.get_json(force=True) or {}
+    if_match = _if_match_version()
+    try:
+        state, (message, status) = update_state(
+            lambda st: _reduce_fastforward(st, data.get("days"), data.get("password")),
+            expected_version=if_match,
+        )
+    except StateConflict as exc:
+        return _conflict_response(exc, data.get("role"), if_match)
+
+    if status != 200:
+        return jsonify({"error": message}), status
+    role_view = _normalize_role(state, data.get("role"))
+    return jsonify(_build_client_state(state, role_view, message))
+
+
+@bp.cli.command("import-sqlite")
+@click.option("--source", default=STATE_FILE, show_default=True, help="Bestehende state.json")
+@click.option("--target", default=SQLITE_FILE, show_default=True, help="SQLite-Datei")
+def import_sqlite_command(source, target):
+    """Einmaliger Import einer state.json in die SQLite-Datenbank."""
+    if not os.path.exists(source):
+        raise click.ClickException(f"{source} existiert nicht.")
+    # journal=True liest auch ein allfälliges state.json.journal mit ein
+    state = JsonFileStore(source, _initial_state, _normalize_state, journal=True).load()
+    store = SqliteStore(target, _initial_state, _normalize_state)
+    store.import_state(state)
+    click.echo(f"{source} -> {target} importiert (Tag {state['day']}, Version {state['version']}).")
+
+
+@bp.cli.command("check-history")
+@click.option("--group", default=None, help="Gruppe (Standard: Einzel-Instanz)")
+def check_history_command(group):
+    """Prüft die overall-Summen gegen die Tageshistorie."""
+    state = load_state(group)
+    hist = DayHistory(state.get("history") or {})
+    mismatches = check_history(state)
+    for p, ex, expected, actual in mismatches:
+        click.echo(f"{p} {ex}: Historie {expected}, overall {actual}")
+    if mismatches:
+        raise click.ClickException(f"{len(mismatches)} Abweichung(en).")
+    if hist.first_day is None:
+        click.echo("OK (noch keine Tage archiviert).")
+    else:
+        click.echo(f"OK ({hist.days} Tage archiviert, ab Tag {hist.first_day}).")
+
+
+@bp.cli.command("export")
+@click.option("--source", default=None, help="state.json (Standard: State der Instanz bzw. --group)")
+@click.option("--group", default=None, help="Gruppe (Standard: Einzel-Instanz)")
+@click.option("--format", "fmt", type=click.Choice(sorted(EXPORT_FORMATS)), default="ndjson", show_default=True)
+@click.option("--output", default="-", show_default=True, help="Zieldatei (- = stdout)")
+def export_command(source, group, fmt, output):
+    """Exportiert alle Tage (Person × Tag × Übung) als NDJSON oder CSV."""
+    if source:
+        if not os.path.exists(source):
+            raise click.ClickException(f"{source} existiert nicht.")
+        state = JsonFileStore(source, _initial_state, _normalize_state, journal=True).load()
+    else:
+        state = load_state(group)
+    with click.open_file(output, "w", encoding="utf-8") as f:
+        for chunk in encode_export(export_rows(state), fmt):
+            f.write(chunk)
+
+
+@bp.cli.command("dump-state")
+@click.option("--source", default=None, help="state.json (Standard: State der Instanz bzw. --group)")
+@click.option("--group", default=None, help="Gruppe (Standard: Einzel-Instanz)")
+@click.option("--output", default="-", show_default=True, help="Zieldatei (- = stdout)")
+def dump_state_command(source, group, output):
+    """Gibt den State lesbar aus (eingerückt, sortiert); die Datei selbst ist kompakt."""
+    if source:
+        if not os.path.exists(source):
+            raise click.ClickException(f"{source} existiert nicht.")
+        state = JsonFileStore(source, _initial_state, _normalize_state, journal=True).load()
+    else:
+        state = load_state(group)
+    with click.open_file(output, "w", encoding="utf-8") as f:
+        f.write(serializer.dumps_pretty(state) + "\n")
+
+
+@bp.cli.command("import-history")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False))
+@click.option("--group", default=None, help="Gruppe (Standard: Einzel-Instanz)")
+@click.option("--format", "fmt", type=click.Choice(sorted(EXPORT_FORMATS)), default=None,
+              help="Standard: nach Dateiendung (.csv, sonst ndjson)")
+@click.option("--dry-run", is_flag=True, help="Nur prüfen, nichts schreiben")
+@click.option("--accept-overall", is_flag=True, help="Geänderte Gesamtsummen übernehmen (Nachtragen)")
+def import_history_command(source, group, fmt, dry_run, accept_overall):
+    """Ersetzt die Trainingsdaten durch einen Export (CSV/NDJSON), z.B. zum Nachtragen."""
+    if group is not None and not (is_valid_group(group) and os.path.isdir(group_dir(group))):
+        raise click.ClickException(f"Gruppe {group} existiert nicht.")
+    with open(source, encoding="utf-8", newline="") as f:
+        state, errors, changes = apply_import(decode_import(f, fmt or guess_format(source)), group, dry_run, accept_overall)
+    for error in errors:
+        click.echo(error, err=True)
+    if errors:
+        raise click.ClickException(f"Import abgelehnt ({len(errors)} Fehler).")
+    for role, ex, before, after in changes:
+        click.echo(f"Gesamtsumme {role} {ex}: {before} -> {after}")
+    if dry_run:
+        click.echo(f"OK, {state['day']} Tage ab {state['start_date']} (nichts geschrieben).")
+    else:
+        click.echo(f"{state['day']} Tage ab {state['start_date']} importiert (Version {state['version']}).")
+
+
+@bp.cli.command("check-projection")
+@click.option("--group", default=None, help="Gruppe (Standard: Einzel-Instanz)")
+@click.option("--days", default=365, show_default=True, type=int)
+def check_projection_command(group, days):
+    """Vergleicht /api/projection mit einer Tag-für-Tag-Simulation über die echten Reducer."""
+    state = load_state(group)
+    reps0, overall0, schedules = _projection_inputs(state, days)
+    projected = project(reps0, overall0, schedules, days, CANT_REDUCTION)
+    simulated = _simulate_projection(state, schedules, days)
+    bad = [name for name in schedules if projected[name] != simulated[name]]
+    if bad:
+        raise click.ClickException(f"Abweichung in: {', '.join(bad)}")
+    click.echo(f"OK ({len(schedules)} Szenarien, {days} Tage, Engine {PROJECTION_ENGINE}).")
+
+
+@bp.cli.command("create-group")
+@click.argument("group")
+@click.option(
+    "--member",
+    "member_specs",
+    multiple=True,
+    help="Mitglied als rolle[:male|female], mehrfach angeben (Standard: Paar mann/frau).",
+)
+def create_group_command(group, member_specs):
+    """Legt einen neuen Haushalt (Shard unter WORKOUT_GROUPS_DIR) an."""
+    if not is_valid_group(group):
+        raise click.ClickException("Ungültige Gruppen-ID (a-z, 0-9, _ und -, max. 64 Zeichen).")
+
+    members = None
+    if member_specs:
+        members = []
+        for spec in member_specs:
+            role, _, phrase = spec.lower().partition(":")
+            if not is_valid_group(role) or phrase not in ("", "male", "female"):
+                raise click.ClickException(f"Ungültiges Mitglied: {spec}")
+            if any(m["role"] == role for m in members):
+                raise click.ClickException(f"Mitglied doppelt: {role}")
+            members.append({"id": role, "role": role, "phrase": phrase or "male"})
+        if not MIN_MEMBERS <= len(members) <= MAX_MEMBERS:
+            raise click.ClickException(f"Eine Gruppe hat {MIN_MEMBERS} bis {MAX_MEMBERS} Mitglieder.")
+
+    if members is not None and os.path.isdir(group_dir(group)) and os.listdir(group_dir(group)):
+        raise click.ClickException(f"Gruppe {group} existiert bereits.")
+
+    os.makedirs(group_dir(group), exist_ok=True)
+    store = get_store(group)
+    if members is not None:
+        with store.commit_lock():
+            store.save(_initial_state(members))
+    state = store.load()
+    role = state["members"][0]["role"]
+    click.echo(
+        f"Gruppe {group} bereit: /g/{group}/?view={role} "
+        f"(Tag {state['day']}, {len(state['members'])} Mitglieder)."
+    )
+
+
+def migrate_store_dir(base_dir=""):
+    """
+    Bringt den gespeicherten State in base_dir auf SCHEMA_VERSION und
+    schreibt ihn komplett zurück. Gibt (base_dir, Schema vorher, Schema
+    nachher) zurück; nachher ist None, wenn nichts zu tun war.
+    """
+    store = _make_store(base_dir)
+    try:
+        raw = store.snapshot(normalize=False)
+        if raw is None:
+            return base_dir, None, None
+        before = int(raw.get("schema_version") or 0)
+        if before == SCHEMA_VERSION:
+            return base_dir, before, None
+        state = store.rewrite()
+        store.notifier.publish(state["version"])
+        return base_dir, before, SCHEMA_VERSION
+    finally:
+        store.close()
+
+
+def _migration_targets(root):
+    """Verzeichnisse unter root (rekursiv), in denen ein State im aktuellen Speicher-Modus liegt."""
+    filename = SQLITE_FILE if STORAGE_MODE == "sqlite" else STATE_FILE
+    skip = {os.path.normpath(BACKUP_DIR), os.path.normpath(METRICS_DIR)}
+    targets = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if not d.startswith(".") and d not in ("venv", "__pycache__")
+            and os.path.normpath(os.path.join(dirpath, d)) not in skip
+        )
+        if os.path.basename(filename) in filenames:
+            targets.append(dirpath)
+    return targets
+
+
+@bp.cli.command("migrate")
+@click.option("--dir", "root", default=None, help="Alle Instanzen unter diesem Verzeichnis (rekursiv); Standard: Einzel-Instanz und alle Gruppen")
+@click.option("--jobs", default=os.cpu_count() or 1, show_default=True, type=int, help="Parallele Prozesse")
+def migrate_command(root, jobs):
+    """Bringt gespeicherte States auf das aktuelle Schema und schreibt sie zurück."""
+    if root is not None:
+        targets = _migration_targets(root)
+    else:
+        targets = [""] + [group_dir(group) for group in _group_ids()]
+
+    migrated = current = 0
+    failed = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(migrate_store_dir, target): target for target in targets}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                base_dir, before, after = future.result()
+            except Exception as exc:
+                failed.append(futures[future])
+                click.echo(f"{futures[future] or '.'}: Fehler: {exc}", err=True)
+                continue
+            if after is None:
+                current += before is not None
+            else:
+                migrated += 1
+                click.echo(f"{base_dir or '.'}: Schema {before} -> {after}")
+    click.echo(f"{migrated} migriert, {current} schon aktuell (Schema {SCHEMA_VERSION}).")
+    if failed:
+        raise click.ClickException(f"{len(failed)} Instanz(en) fehlgeschlagen.")
+
+
+@bp.cli.command("backup")
+def backup_command():
+    """Online-Backup aller Instanzen jetzt (auch ohne Änderung seit dem letzten)."""
+    written = BACKUPS.run_once(force=True)
+    click.echo(f"{written} neue(s) Backup(s) unter {BACKUP_DIR}.")
+
+
+@bp.cli.command("restore-backup")
+@click.option("--group", default=None, help="Gruppe (Standard: Einzel-Instanz)")
+@click.option("--at", "at_raw", default=None, help="Zeitpunkt (lokal), z.B. 2026-10-18T14:00; Standard: neuestes Backup")
+@click.option("--list", "list_only", is_flag=True, help="Nur die vorhandenen Backups anzeigen")
+def restore_backup_command(group, at_raw, list_only):
+    """Stellt den State aus dem letzten Backup vor --at wieder her (laufender Server bleibt an)."""
+    if group is not None and not (is_valid_group(group) and os.path.isdir(group_dir(group))):
+        raise click.ClickException(f"Gruppe {group} existiert nicht.")
+    scope = group or DEFAULT_SCOPE
+
+    if list_only:
+        for entry in BACKUPS.catalog(scope):
+            stamp = datetime.fromtimestamp(entry["t"]).strftime("%Y-%m-%d %H:%M:%S")
+            click.echo(f"{stamp}  Version {entry['v']:>6}  {entry['h'][:12]}")
+        return
+
+    at = None
+    if at_raw:
+        try:
+            at = datetime.fromisoformat(at_raw).timestamp()
+        except ValueError:
+            raise click.ClickException(f"Ungültiger Zeitpunkt: {at_raw}")
+    with BACKUPS.locked():
+        entry = BACKUPS.find(scope, at)
+        if entry is None:
+            raise click.ClickException("Kein passendes Backup gefunden.")
+        restored = _normalize_state(BACKUPS.load(scope, entry))
+
+        # aktuellen Stand vorher sichern, damit sich das Zurückspielen rückgängig machen lässt
+        current = get_store(group).snapshot()
+        if current is not None:
+            BACKUPS.add(scope, current)
+
+    state, _ = update_state(_replace_with(restored), group=group)
+    stamp = datetime.fromtimestamp(entry["t"]).strftime("%Y-%m-%d %H:%M:%S")
+    click.echo(f"Backup vom {stamp} (Version {entry['v']}) wiederhergestellt, Tag {state['day']}, Version {state['version']}.")
+
+
+# --- App-Factory ---------------------------------------------------------
+
+# Budgets "Tokens pro Sekunde, Bucket-Grösse" pro Adresse × Gruppe × Rolle; password nur pro Adresse
+RATE_LIMITS_DEFAULT = {"read": (20.0, 60.0), "write": (5.0, 30.0), "password": (0.1, 5.0)}
+
+# gleichzeitige /api/stream-Verbindungen pro Worker (gunicorn.conf.py: ein Viertel der Threads)
+STREAMS_PER_WORKER_DEFAULT = 8
+
+PROFILES = {
+    # Templates bei jeder Änderung neu laden, Static nie cachen;
+    # `python app.py` migriert die Einzel-Instanz vor dem Start
+    "development": {
+        "TEMPLATES_AUTO_RELOAD": True,
+        "SEND_FILE_MAX_AGE_DEFAULT": 0,
+        "MIGRATE_ON_START": True,
+        "RATE_LIMIT": False,
+        "RATE_LIMITS": RATE_LIMITS_DEFAULT,
+        "TRUSTED_PROXIES": 0,
+        "STREAMS_PER_WORKER": STREAMS_PER_WORKER_DEFAULT,
+    },
+    # Templates einmal kompilieren, Static ein Jahr cachen (URLs tragen ?v=<asset_version>);
+    # migriert wird nur explizit per `flask migrate` (deploy.sh); Rate-Limit an
+    "production": {
+        "TEMPLATES_AUTO_RELOAD": False,
+        "SEND_FILE_MAX_AGE_DEFAULT": 365 * 24 * 3600,
+        "MIGRATE_ON_START": False,
+        "RATE_LIMIT": True,
+        "RATE_LIMITS": RATE_LIMITS_DEFAULT,
+        "TRUSTED_PROXIES": 0,
+        "STREAMS_PER_WORKER": STREAMS_PER_WORKER_DEFAULT,
+    },
+}
+
+
+def _env_config(config) -> dict:
+    """
+    Profil-Schlüssel, die die Umgebung (config/instance.env) überschreibt.
+    Erst in create_app() gelesen, nicht beim Import.
+    """
+    env = {}
+    if "WORKOUT_RATE_LIMIT" in os.environ:
+        env["RATE_LIMIT"] = os.environ["WORKOUT_RATE_LIMIT"] != "0"
+    if "WORKOUT_TRUSTED_PROXIES" in os.environ:
+        env["TRUSTED_PROXIES"] = int(os.environ["WORKOUT_TRUSTED_PROXIES"])
+    if "WORKOUT_STREAMS_PER_WORKER" in os.environ:
+        env["STREAMS_PER_WORKER"] = int(os.environ["WORKOUT_STREAMS_PER_WORKER"])
+    limits = dict(config["RATE_LIMITS"])
+    for bucket in limits:
+        raw = os.getenv(f"WORKOUT_RATE_{bucket.upper()}")
+        if raw:
+            limits[bucket] = parse_rate(raw)
+    env["RATE_LIMITS"] = limits
+    return env
+
+
+def _asset_version(static_folder: str) -> str:
+    """Kurzer Hash über Namen, Grösse und mtime aller Static-Dateien (Cache-Busting)."""
+    digest = hashlib.sha1()
+    for root, _, files in sorted(os.walk(static_folder)):
+        for name in sorted(files):
+            st = os.stat(os.path.join(root, name))
+            digest.update(f"{os.path.relpath(os.path.join(root, name), static_folder)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return digest.hexdigest()[:10]
+
+
+class WorkoutJSONProvider(DefaultJSONProvider):
+    """jsonify(), get_json() & Co. über serializer (orjson, falls installiert); kompakt, Schlüssel unsortiert."""
+
+    def dumps(self, obj, **kwargs):
+        if "indent" in kwargs:  # Debug-Profil: eingerückt wie bisher
+            return super().dumps(obj, **kwargs)
+        return serializer.dumps(obj, default=self.default)
+
+    def loads(self, s, **kwargs):
+        return serializer.loads(s)
+
+
+def create_app(config=None):
+    """
+    Baut die Flask-App. config ist ein Profilname ("development" /
+    "production") oder ein dict mit Flask-Config, optional inkl. "PROFILE".
+    Reihenfolge: Profil, dann Umgebung (_env_config), dann config.
+    Liest und schreibt keinen State – Migrationen laufen über
+    migrate_on_start() bzw. `flask migrate`.
+    """
+    overrides = dict(config) if isinstance(config, dict) else {"PROFILE": config or PROFILE}
+    profile = (overrides.pop("PROFILE", None) or PROFILE).lower()
+    if profile not in PROFILES:
+        raise ValueError(f"Unbekanntes Profil: {profile}")
+
+    application = Flask(__name__)
+    application.json = WorkoutJSONProvider(application)
+    application.config["PROFILE"] = profile
+    application.config.update(PROFILES[profile])
+    application.config.update(_env_config(application.config))
+    application.config.update(overrides)
+    application.register_blueprint(bp)
+    if application.config["TRUSTED_PROXIES"]:
+        # Client-Adresse aus X-Forwarded-For der vertrauten Proxies (Rate-Limit, Logs)
+        hops = application.config["TRUSTED_PROXIES"]
+        application.wsgi_app = ProxyFix(application.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
+    if not application.config["TEMPLATES_AUTO_RELOAD"]:
+        application.config.setdefault("ASSET_VERSION", _asset_version(application.static_folder))
+        # vorkompilieren: landet im Template-Cache, ohne Auto-Reload kein stat() pro Render
+        application.jinja_env.get_template("index.html")
+    return application
+
+
+def migrate_on_start(application):
+    """
+    Einzel-Instanz einmal aufs aktuelle Schema bringen, wenn das Profil
+    MIGRATE_ON_START setzt. Aufgerufen vom Startpunkt (python app.py,
+    gunicorn on_starting, asgi.py), nie beim Import; Gruppen: flask migrate.
+    """
+    if application.config["MIGRATE_ON_START"]:
+        migrate_store_dir("")
+
+
+app = create_app(PROFILE)
 
 
 if __name__ == "__main__":
+    migrate_on_start(app)
     app.run(host="0.0.0.0", port=8000, debug=False)
@@ -0,0 +1,648 @@
+"""
+Alternativer asyncio-Einstiegspunkt (ASGI).
+
+Gleicher Vertrag wie die Flask-Routen für /, /api/state, /api/stream,
+/api/action, /api/actions und /api/nextday – für die Einzel-Instanz und
+unter /g/<gruppe>/ für Gruppen (plus /static und den Service Worker), aber
+ein Prozess, ein Event-Loop, kein Thread pro Request:
+
+  - Alle Änderungen laufen über einen einzigen Writer-Task (StateActor) pro
+    Instanz bzw. Gruppe, dem der State gehört. Er wendet die bestehenden Reducer aus app.py an (über
+    dispatch_action & Co.) und sammelt dabei alles, was inzwischen in der
+    Queue steht (Group Commit): ein Schreibvorgang für viele Klicks.
+  - Gespeichert wird über den konfigurierten Store (file/journal/sqlite) im
+    Thread-Pool, der Event-Loop blockiert nicht. Geantwortet wird erst, wenn
+    der Stand auf der Platte ist.
+  - Lesen (/api/state, /api/stream) bedient nur den Snapshot im Speicher.
+
+Der Prozess muss der einzige Schreiber des States sein – nicht parallel zu
+Gunicorn auf denselben Daten betreiben. Anders als die Store-LRU in app.py
+bleibt der Actor einer einmal benutzten Gruppe bis zum Prozessende im
+Speicher (ein zweiter Actor derselben Gruppe wäre ein zweiter Schreiber).
+Nicht angeboten werden Export/Import, Historie, Hochrechnung, Rangliste,
+Fast-Forward und /metrics – dafür Gunicorn bzw. die CLI.
+
+    pip install uvicorn            # optional, siehe README
+    python asgi.py                 # WORKOUT_BIND, Standard 0.0.0.0:8000
+    uvicorn asgi:app --port 8000
+"""
+import asyncio
+import math
+import mimetypes
+import os
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+# wie gunicorn.conf.py: ohne Angabe im Produktionsprofil
+os.environ.setdefault("WORKOUT_PROFILE", "production")
+
+from flask import g  # noqa: E402
+from werkzeug.security import safe_join  # noqa: E402
+
+import app as workout  # noqa: E402
+import serializer  # noqa: E402
+from storage import StateConflict, clone_state  # noqa: E402
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_BATCH_COMMANDS = 256   # Aktionen pro Group Commit
+
+
+class StateActor:
+    """
+    Besitzt den State der Einzel-Instanz. submit() stellt einen Reducer in
+    die Queue; der Writer-Task wendet ihn an, speichert und liefert
+    (state, result) zurück – oder wirft StateConflict wie StateStore.update().
+    """
+
+    def __init__(self, store, migrate=False):
+        self.store = store
+        self.migrate = migrate     # nur die Einzel-Instanz (wie migrate_on_start)
+        self.state = None          # letzter gespeicherter Stand, nie mutieren
+        self._queue = None
+        self._task = None
+        self._started = None
+        self._changed = None       # wird bei jedem Commit ersetzt (Wecker für Streams)
+        self._memo = OrderedDict()  # (version, rolle) -> (payload, body)
+
+    async def start(self):
+        """Lädt den State einmal und startet den Writer (Lifespan oder erster Request)."""
+        if self._started is None:
+            started = self._started = asyncio.get_running_loop().create_future()
+            try:
+                loop = asyncio.get_running_loop()
+                if self.migrate:
+                    await loop.run_in_executor(None, workout.migrate_on_start, workout.app)
+                self.state = await loop.run_in_executor(None, self.store.load)
+            except Exception as exc:
+                self._started = None  # nächster Request versucht es erneut
+                started.set_exception(exc)
+                raise
+            self._queue = asyncio.Queue()
+            self._changed = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            workout.BACKUPS.ensure_started()
+            started.set_result(True)
+        await self._started
+
+    async def stop(self):
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        self._task = None
+        self._started = None
+        await asyncio.get_running_loop().run_in_executor(None, self.store.close)
+
+    async def submit(self, reducer, expected_version=None):
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((reducer, expected_version, future))
+        return await future
+
+    async def changed(self, version, timeout):
+        """Wartet höchstens timeout Sekunden auf einen Stand nach version."""
+        event = self._changed
+        if self.state["version"] != version:
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    # --- Writer ----------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < MAX_BATCH_COMMANDS and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._commit(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit(self, batch):
+        base_version = self.state["version"]
+        work = self.state
+        outcomes = []
+        for reducer, expected_version, future in batch:
+            # If-Match bezieht sich auf den gespeicherten Stand; hat ein früherer
+            # Befehl im selben Batch schon etwas geändert, ist er veraltet
+            if expected_version is not None and (expected_version != base_version or work is not self.state):
+                outcomes.append((future, None, True))
+                continue
+            candidate = clone_state(work)
+            try:
+                result, commit = reducer(candidate)
+            except Exception as exc:  # Fehler eines Reducers trifft nur seinen Request
+                outcomes.append((future, exc, False))
+                continue
+            if commit:
+                work = candidate
+            outcomes.append((future, result, False))
+
+        if work is not self.state:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._persist, work)
+            except Exception as exc:  # Platte voll o.ä.: nichts gilt, Snapshot bleibt
+                for future, _, _ in outcomes:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+            self.state = work
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+        for future, result, conflict in outcomes:
+            if future.done():
+                continue  # Client weg – die Aktion gilt trotzdem
+            if conflict:
+                future.set_exception(StateConflict(self.state))
+            elif isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result((self.state, result))
+
+    def _persist(self, state):
+        """Im Thread-Pool: speichern (erhöht die Version), andere Prozesse benachrichtigen."""
+        self.store.save(state)
+        self.store.notifier.publish(state["version"])
+
+    # --- Lesen -----------------------------------------------------------
+
+    def client_state(self, role_raw):
+        """(Version, Payload, Body) des aktuellen Snapshots, memoisiert wie _memoized_client_state()."""
+        state = self.state
+        role_view = workout._normalize_role(state, role_raw)
+        key = (state.get("epoch", ""), int(state["version"]), role_view)
+        entry = self._memo.get(key)
+        if entry is None:
+            payload = workout._build_client_state(state, role_view)
+            entry = self._memo[key] = (payload, _dumps(payload) + "\n")
+            while len(self._memo) > workout.STATE_MEMO_SIZE:
+                self._memo.popitem(last=False)
+        else:
+            self._memo.move_to_end(key)
+        return (key[1],) + entry
+
+    def memo_get(self, epoch, version, role_view):
+        entry = self._memo.get((epoch, version, role_view))
+        return None if entry is None else entry[0]
+
+
+ACTOR = StateActor(workout.get_store(), migrate=True)
+# Gruppen: ein Actor pro Gruppe, angelegt beim ersten Request (siehe Moduldoku)
+GROUP_ACTORS = {}
+
+
+def _actor(group):
+    if group is None:
+        return ACTOR
+    actor = GROUP_ACTORS.get(group)
+    if actor is None:
+        os.makedirs(workout.group_dir(group), exist_ok=True)
+        actor = GROUP_ACTORS[group] = StateActor(workout._make_store(workout.group_dir(group)))
+    return actor
+
+
+def _split_group(path):
+    """
+    /g/<gruppe>/rest -> (gruppe, /rest), sonst (None, path). Ungültige oder
+    (ohne WORKOUT_GROUPS_AUTOCREATE) unbekannte Gruppen -> (False, path) wie
+    der 404 von _pull_group() in app.py.
+    """
+    if not path.startswith("/g/"):
+        return None, path
+    group, slash, rest = path[len("/g/"):].partition("/")
+    if not workout.is_valid_group(group):
+        return False, path
+    if not workout.GROUPS_AUTOCREATE and not os.path.isdir(workout.group_dir(group)):
+        return False, path
+    return group, slash + rest
+
+
+def _dumps(obj) -> str:
+    # gleiche Serialisierung wie jsonify() in den Flask-Routen
+    return workout.app.json.dumps(obj)
+
+
+# --- HTTP-Hilfen -----------------------------------------------------------
+
+class Request:
+    __slots__ = ("method", "path", "group", "client", "query", "headers", "body")
+
+    def __init__(self, scope, body=b"", group=None, path=None):
+        self.method = scope["method"]
+        self.path = path or scope["path"]
+        self.group = group
+        self.client = (scope.get("client") or ("",))[0]
+        self.query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        self.body = body
+
+    @property
+    def actor(self):
+        return _actor(self.group)
+
+    def arg(self, name):
+        values = self.query.get(name)
+        return values[0] if values else None
+
+    def json(self):
+        """Body als JSON (wie get_json(force=True)); None bei kaputtem JSON."""
+        try:
+            return workout.app.json.loads(self.body or b"null") or {}
+        except ValueError:
+            return None
+
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return False
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _respond(send, status, body=b"", content_type="application/json", headers=()):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    raw_headers = [(b"content-length", str(len(body)).encode())]
+    if content_type:
+        raw_headers.append((b"content-type", content_type.encode()))
+    raw_headers.extend((k.encode(), v.encode()) for k, v in headers)
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _compressed(req, body, headers=()):
+    """Wie _compress() in app.py: (Body, Header), ab COMPRESS_MIN_BYTES gzip/Brotli-kodiert."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not workout.COMPRESS or len(body) < workout.COMPRESS_MIN_BYTES:
+        return body, headers
+    headers = tuple(headers) + (("vary", "Accept-Encoding"),)
+    encoding = serializer.negotiate(req.headers.get("accept-encoding"))
+    if encoding is None:
+        return body, headers
+    headers = tuple(("etag", "W/" + v) if k == "etag" else (k, v) for k, v in headers)
+    return serializer.compress(body, encoding), headers + (("content-encoding", encoding),)
+
+
+async def _respond_json(send, obj, status=200, req=None):
+    body = _dumps(obj) + "\n"
+    if req is not None and status == 200:
+        body, headers = _compressed(req, body)
+        await _respond(send, status, body, headers=headers)
+        return
+    await _respond(send, status, body)
+
+
+def _client_addr(req):
+    """Client-Adresse wie ProxyFix(x_for=TRUSTED_PROXIES) in app.py."""
+    hops = workout.app.config["TRUSTED_PROXIES"]
+    forwarded = [a.strip() for a in req.headers.get("x-forwarded-for", "").split(",") if a.strip()]
+    if hops and len(forwarded) >= hops:
+        return forwarded[-hops]
+    return req.client
+
+
+async def _rate_limited(req, send, kind):
+    """Wie _rate_limit() in app.py; True, wenn schon mit 429 geantwortet wurde."""
+    if not workout.app.config["RATE_LIMIT"]:
+        return False
+    data = req.json() if kind == "write" else None
+    role_raw = data.get("role") if isinstance(data, dict) else req.arg("role")
+    role = workout.rate_limit_role(role_raw)
+    password = "x-workout-password" in req.headers or workout._carries_password(data)
+    retry = workout.rate_limit_retry(workout.app.config["RATE_LIMITS"], kind, _client_addr(req), req.group, role, password)
+    if not retry:
+        return False
+    body = _dumps({"error": "Zu viele Anfragen – bitte kurz warten."}) + "\n"
+    await _respond(send, 429, body, headers=(("retry-after", str(max(1, math.ceil(retry)))),))
+    return True
+
+
+def _etag_matches(header, etag):
+    """If-None-Match enthält etag (schwach oder stark) oder "*"."""
+    for tag in (header or "").split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag.strip('"') == etag:
+            return True
+    return False
+
+
+# --- Routen ----------------------------------------------------------------
+
+async def index(req, send):
+    actor = req.actor
+    await actor.start()
+    query = {k: v[0] for k, v in req.query.items()}
+    with workout.app.test_request_context("/", query_string=query):
+        g.group = req.group
+        html = workout._render_index(actor.state)
+    await _respond(send, 200, html, "text/html; charset=utf-8")
+
+
+async def _auto_rollover(actor):
+    """Wie _auto_rollover() in app.py: verpasste Kalendertage vor dem Lesen/Ändern nachholen."""
+    await actor.start()
+    if workout.AUTO_ROLLOVER and workout.calendar_day(actor.state) > actor.state["day"]:
+        await actor.submit(workout._reduce_rollover)
+
+
+async def api_state(req, send):
+    actor = req.actor
+    await _auto_rollover(actor)
+    role_view = workout._normalize_role(actor.state, req.arg("role"))
+    etag = workout._state_etag(actor.state.get("epoch", ""), int(actor.state["version"]), role_view)
+    if _etag_matches(req.headers.get("if-none-match"), etag):
+        await _respond(send, 304, content_type=None, headers=(("etag", f'"{etag}"'), ("cache-control", "no-cache")))
+        return
+    version, payload, body = actor.client_state(role_view)
+    etag = workout._state_etag(payload["epoch"], version, role_view)
+    body, headers = _compressed(req, body, (("etag", f'"{etag}"'), ("cache-control", "no-cache")))
+    await _respond(send, 200, body, headers=headers)
+
+
+async def api_stream(req, send, receive):
+    """Server-Sent Events wie /api/stream in app.py, gespeist vom Snapshot des Actors."""
+    actor = req.actor
+    await _auto_rollover(actor)
+    role_view = workout._normalize_role(actor.state, req.arg("role"))
+    epoch = actor.state.get("epoch", "")
+    last_id = workout._parse_event_id(req.headers.get("last-event-id"), epoch)
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + workout.STREAM_MAX_SECONDS
+
+    async def emit(text):
+        await send({"type": "http.response.body", "body": text.encode("utf-8"), "more_body": True})
+
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        if req.method == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await emit("retry: 3000\n\n")
+
+        sent = None
+        if last_id >= 0:
+            payload = actor.memo_get(epoch, last_id, role_view)
+            if payload is not None:
+                sent = (last_id, payload)
+
+        while not disconnected.is_set():
+            version, payload, _ = actor.client_state(role_view)
+            event_id = workout._event_id(payload["epoch"], version)
+            if sent is not None and sent[1]["epoch"] != payload["epoch"]:
+                sent = None  # State neu angelegt: voller State statt Patch
+            if sent is None and version == last_id and payload["epoch"] == epoch:
+                sent = (version, payload)
+            elif sent is None:
+                await emit(_sse("state", event_id, payload))
+                sent = (version, payload)
+            elif version != sent[0]:
+                patch = {"base": sent[0], "version": version, "epoch": payload["epoch"],
+                         "changes": workout._stream_changes(sent[1], payload)}
+                await emit(_sse("patch", event_id, patch))
+                sent = (version, payload)
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            waiter = asyncio.create_task(actor.changed(version, min(workout.STREAM_HEARTBEAT_S, remaining)))
+            stop = asyncio.create_task(disconnected.wait())
+            await asyncio.wait((waiter, stop), return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            stop.cancel()
+            if actor.state["version"] == version and not disconnected.is_set():
+                await emit(": keep-alive\n\n")
+        await send({"type": "http.response.body", "body": b""})
+    except OSError:
+        pass  # Verbindung abgebrochen
+    finally:
+        watcher.cancel()
+
+
+def _sse(event, event_id, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {_dumps(data)}\n\n"
+
+
+async def _submit(req, send, reducer, role_raw, if_match):
+    """Reducer über den Actor committen; bei Konflikt gleiche Antwort wie _conflict_response()."""
+    try:
+        return await req.actor.submit(reducer, if_match)
+    except StateConflict as exc:
+        role_view = workout._normalize_role(exc.state, role_raw)
+        if if_match is not None:
+            message, status = "Der Stand hat sich inzwischen geändert. Bitte neu laden.", 412
+        else:
+            message, status = "Gleichzeitige Änderung – bitte nochmals versuchen.", 409
+        await _respond_json(send, workout._build_client_state(exc.state, role_view, message), status)
+    except workout.IdempotencyMismatch:
+        await _respond_json(send, {"error": "Idempotency-Key wurde schon für eine andere Anfrage benutzt."}, 422)
+    except OSError:
+        await _respond_json(send, {"error": "Speichern fehlgeschlagen"}, 503)
+    return None
+
+
+async def api_action(req, send):
+    await _auto_rollover(req.actor)
+    data = req.json()
+    if data is None:
+        await _respond_json(send, {"error": "Ungültiges JSON"}, 400)
+        return
+    role_raw = data.get("role")
+    action = data.get("action")
+    if_match = workout._if_match_version(req.headers.get("if-match", ""))
+    reducer = workout._idempotent(
+        lambda st: workout._reduce_action(st, workout._normalize_role(st, role_raw), action, data),
+        workout._idempotency_key(req.headers.get("idempotency-key", "")),
+        workout._request_fingerprint("action", data),
+    )
+    outcome = await _submit(req, send, reducer, role_raw, if_match)
+    if outcome is None:
+        return
+    state, (message, status) = outcome
+    if status == 400:
+        await _respond_json(send, {"error": message}, 400)
+        return
+    role_view = workout._normalize_role(state, role_raw)
+    await _respond_json(send, workout._build_client_state(state, role_view, message), status, req)
+
+
+async def api_actions(req, send):
+    await _auto_rollover(req.actor)
+    data = req.json()
+    if data is None:
+        await _respond_json(send, {"error": "Ungültiges JSON"}, 400)
+        return
+    role_raw = data.get("role")
+    actions = data.get("actions")
+    if not isinstance(actions, list) or not actions:
+        await _respond_json(send, {"error": "actions muss eine nicht-leere Liste sein"}, 400)
+        return
+    if len(actions) > workout.MAX_BATCH_ACTIONS:
+        await _respond_json(send, {"error": f"Höchstens {workout.MAX_BATCH_ACTIONS} Aktionen pro Aufruf"}, 400)
+        return
+    if_match = workout._if_match_version(req.headers.get("if-match", ""))
+    reducer = workout._idempotent(
+        lambda st: workout._reduce_actions(st, role_raw, actions),
+        workout._idempotency_key(req.headers.get("idempotency-key", "")),
+        workout._request_fingerprint("actions", data),
+    )
+    outcome = await _submit(req, send, reducer, role_raw, if_match)
+    if outcome is None:
+        return
+    state, (results, status) = outcome
+    if status == 400:
+        await _respond_json(send, {"error": results[-1]["message"], "results": results}, 400)
+        return
+    role_view = workout._normalize_role(state, role_raw)
+    resp = workout._build_client_state(state, role_view, results[-1]["message"])
+    resp["results"] = results
+    await _respond_json(send, resp, status, req)
+
+
+async def api_nextday(req, send):
+    if_match = workout._if_match_version(req.headers.get("if-match", ""))
+    outcome = await _submit(req, send, workout._reduce_nextday, None, if_match)
+    if outcome is None:
+        return
+    state, error = outcome
+    if error:
+        await _respond_json(send, {"error": error}, 400)
+        return
+    await _respond_json(send, workout._build_client_state(state, state["members"][0]["role"], "Neuer Tag gestartet."), req=req)
+
+
+async def static_file(send, folder, name, max_age):
+    path = safe_join(folder, name)
+    if path is None or not os.path.isfile(path):
+        await _respond_json(send, {"error": "Nicht gefunden"}, 404)
+        return
+
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+
+    body = await asyncio.get_running_loop().run_in_executor(None, read)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    cache = f"public, max-age={max_age}" if max_age else "no-cache"
+    await _respond(send, 200, body, content_type, headers=(("cache-control", cache),))
+
+
+POST_ROUTES = {
+    "/api/action": api_action,
+    "/api/actions": api_actions,
+    "/api/nextday": api_nextday,
+}
+
+
+def _without_body(send):
+    async def send_headers_only(message):
+        if message["type"] == "http.response.body":
+            if message.get("more_body"):
+                return
+            message = {"type": "http.response.body", "body": b""}
+        await send(message)
+    return send_headers_only
+
+
+async def app(scope, receive, send):
+    """ASGI-3-Einstiegspunkt."""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await ACTOR.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for actor in (ACTOR, *GROUP_ACTORS.values()):
+                    await actor.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    group, path = _split_group(scope["path"])
+    method = scope["method"]
+    if group is False:
+        await _respond_json(send, {"error": "Gruppe nicht gefunden"}, 404)
+        return
+    if group and not path:
+        # /g/<gruppe> -> /g/<gruppe>/, sonst lösen relative URLs der Seite falsch auf
+        await _respond(send, 308, content_type=None, headers=(("location", scope["path"] + "/"),))
+        return
+    if method == "HEAD":
+        # wie Flask: Header (inkl. Content-Length) wie bei GET, aber kein Body
+        send = _without_body(send)
+    if method == "POST" and path in POST_ROUTES:
+        body = await _read_body(receive)
+        if body is None:
+            return
+        if body is False:
+            await _respond_json(send, {"error": "Anfrage zu gross"}, 413)
+            return
+        req = Request(scope, body, group, path)
+        if await _rate_limited(req, send, "write"):
+            return
+        await POST_ROUTES[path](req, send)
+        return
+
+    if method not in ("GET", "HEAD"):
+        await _respond_json(send, {"error": "Methode nicht erlaubt"}, 405)
+        return
+
+    req = Request(scope, group=group, path=path)
+    if path == "/":
+        await index(req, send)
+    elif path in ("/api/state", "/api/stream") and await _rate_limited(req, send, "read"):
+        return
+    elif path == "/api/state":
+        await api_state(req, send)
+    elif path == "/api/stream":
+        await api_stream(req, send, receive)
+    elif path == "/service-worker.js":
+        await static_file(send, workout.app.static_folder, "service-worker.js", 0)
+    elif path.startswith("/static/") and group is None:
+        max_age = workout.app.config["SEND_FILE_MAX_AGE_DEFAULT"] or 0
+        await static_file(send, workout.app.static_folder, path[len("/static/"):], int(max_age))
+    else:
+        await _respond_json(send, {"error": "Nicht gefunden"}, 404)
+
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("Für den asyncio-Betrieb: pip install uvicorn")
+    host, _, port = os.getenv("WORKOUT_BIND", "0.0.0.0:8000").rpartition(":")
+    uvicorn.run(app, host=host or "0.0.0.0", port=int(port), lifespan="on", access_log=False)
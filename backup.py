@@ -0,0 +1,236 @@
+"""
+Online-Backups des States, während der Server läuft.
+
+Ein Hintergrund-Thread holt alle interval Sekunden pro Instanz (Einzel-
+Instanz und jede Gruppe) einen konsistenten Stand direkt von der Platte
+(StateStore.snapshot(), ohne Writer zu blockieren) – aber nur, wenn sich
+die Dateien seit dem letzten Backup geändert haben. Ablage pro Instanz:
+
+    <directory>/<scope>/objects/ab/ab12...ef.json.gz   gzip, Name = SHA-256
+    <directory>/<scope>/catalog.jsonl                  {"t": 1760000000, "v": 42, "h": "ab12..."}
+
+Hash und Backup gehen über den State ohne "version" und "idempotency"
+(Zeitstempel der letzten Requests, nur für Wiederholungen gedacht); gleiche
+Inhalte (z.B. Haken gesetzt und wieder entfernt) liegen also nur einmal auf
+der Platte. Nach
+jedem Backup wird ausgedünnt: behalten werden die keep_last neuesten
+Backups und das jeweils neueste der letzten keep_hourly Stunden, keep_daily
+Tage und keep_weekly Wochen (mit Backups). Nicht mehr referenzierte Objekte
+werden gelöscht.
+
+Laufen mehrere Gunicorn-Worker, macht pro Runde nur der Worker das Backup,
+der den Lock (<directory>/.lock) bekommt. Jede vollständige Runde setzt die
+mtime von <directory>/.last-success (last_success(), für alle Worker gleich);
+fehlgeschlagene Runden werden geloggt und an on_failure gemeldet.
+"""
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_SCOPE = "_default"  # Einzel-Instanz; Gruppen-IDs beginnen nie mit "_"
+
+log = logging.getLogger(__name__)
+
+
+# nicht gesichert: Zähler bzw. Request-Protokoll, kein Trainingsinhalt
+EXCLUDED_KEYS = ("version", "idempotency")
+
+
+def state_digest(state) -> tuple:
+    """(SHA-256, kanonisches JSON) des States ohne EXCLUDED_KEYS."""
+    content = {k: v for k, v in state.items() if k not in EXCLUDED_KEYS}
+    raw = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest(), raw
+
+
+def keep_entries(entries, keep_last: int, keep_hourly: int, keep_daily: int, keep_weekly: int):
+    """
+    Katalogeinträge (nach Zeit sortiert), die die Aufbewahrung überleben:
+    die keep_last neuesten, dazu je Stunde/Tag/Woche das neueste, für die
+    letzten N Zeiträume mit Backups.
+    """
+    keep = set(range(max(0, len(entries) - max(1, keep_last)), len(entries)))
+    rules = (
+        (keep_hourly, "%Y-%m-%d %H"),
+        (keep_daily, "%Y-%m-%d"),
+        (keep_weekly, "%G-%V"),
+    )
+    for count, fmt in rules:
+        seen = set()
+        for i in range(len(entries) - 1, -1, -1):
+            if len(seen) >= count:
+                break
+            bucket = datetime.fromtimestamp(entries[i]["t"]).strftime(fmt)
+            if bucket not in seen:
+                seen.add(bucket)
+                keep.add(i)
+    return [e for i, e in enumerate(entries) if i in keep]
+
+
+class BackupManager:
+    """
+    sources: Callable ohne Argumente -> [(scope, open_store)], open_store()
+    gibt einen StateStore zurück (wird nach dem Backup geschlossen).
+    """
+
+    def __init__(self, directory, sources, interval=600, keep=(6, 24, 7, 8)):
+        self.directory = directory
+        self.sources = sources
+        self.interval = interval
+        self.keep = tuple(keep)  # (letzte, Stunden, Tage, Wochen)
+        self._seen = {}  # scope -> mtime_ns beim letzten Backup
+        self.failures = 0  # fehlgeschlagene Runden dieses Prozesses in Folge
+        self.on_failure = None  # Callable(exc), z.B. Metrik-Zähler
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    # --- Hintergrund-Thread ----------------------------------------------
+
+    def ensure_started(self):
+        """Startet den Thread (einmal pro Prozess, also erst nach dem Gunicorn-Fork)."""
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._seen = {}
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        pid = self._pid
+        while pid == os.getpid():
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception as exc:  # Backups dürfen den Betrieb nie stören; nächste Runde versucht es erneut
+                self.failures += 1
+                log.exception("Backup fehlgeschlagen (%d. Runde in Folge)", self.failures)
+                if self.on_failure is not None:
+                    self.on_failure(exc)
+            else:
+                self.failures = 0
+
+    @contextmanager
+    def locked(self, blocking=True):
+        """Prozessübergreifender Lock auf das Backup-Verzeichnis; liefert False, wenn belegt (blocking=False)."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)
+
+    def run_once(self, force=False):
+        """Eine Runde über alle Instanzen; gibt die Anzahl neuer Katalogeinträge zurück."""
+        with self.locked(blocking=False) as acquired:
+            if not acquired:
+                return 0  # ein anderer Worker ist gerade dran
+            written = 0
+            for scope, open_store in self.sources():
+                store = open_store()
+                try:
+                    mtime = store.mtime_ns()
+                    if not force and (mtime == 0 or self._seen.get(scope) == mtime):
+                        continue
+                    state = store.snapshot()
+                    if state is not None and self.add(scope, state):
+                        written += 1
+                    self._seen[scope] = mtime
+                finally:
+                    store.close()
+            self._mark_success()
+            return written
+
+    def _mark_success(self):
+        path = os.path.join(self.directory, ".last-success")
+        with open(path, "a"):
+            os.utime(path)
+
+    def last_success(self):
+        """Unix-Zeit der letzten vollständigen Runde (irgendeines Workers) oder None."""
+        try:
+            return os.stat(os.path.join(self.directory, ".last-success")).st_mtime
+        except FileNotFoundError:
+            return None
+
+    # --- Ablage ------------------------------------------------------------
+
+    def _scope_dir(self, scope):
+        return os.path.join(self.directory, scope)
+
+    def _object_path(self, scope, digest):
+        return os.path.join(self._scope_dir(scope), "objects", digest[:2], f"{digest}.json.gz")
+
+    def catalog(self, scope):
+        """Alle Backups einer Instanz, älteste zuerst."""
+        try:
+            with open(os.path.join(self._scope_dir(scope), "catalog.jsonl"), encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _write_catalog(self, scope, entries):
+        path = os.path.join(self._scope_dir(scope), "catalog.jsonl")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        os.replace(tmp, path)
+
+    def add(self, scope, state, now=None):
+        """
+        Legt state als Backup ab (Objekt nur, wenn der Inhalt neu ist) und
+        dünnt danach aus. False, wenn sich seit dem letzten Backup nichts
+        geändert hat. Aufrufer hält locked().
+        """
+        digest, raw = state_digest(state)
+        entries = self.catalog(scope)
+        if entries and entries[-1]["h"] == digest:
+            return False
+
+        path = self._object_path(scope, digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(raw)
+            os.replace(tmp, path)
+
+        entries.append({"t": int(now if now is not None else time.time()), "v": int(state.get("version", 0)), "h": digest})
+        kept = keep_entries(entries, *self.keep)
+        self._write_catalog(scope, kept)
+        if len(kept) < len(entries):
+            self._collect_garbage(scope, {e["h"] for e in kept})
+        return True
+
+    def _collect_garbage(self, scope, live):
+        objects = os.path.join(self._scope_dir(scope), "objects")
+        for root, _, files in os.walk(objects):
+            for name in files:
+                if name.endswith(".json.gz") and name[:-len(".json.gz")] not in live:
+                    os.remove(os.path.join(root, name))
+
+    def find(self, scope, at=None):
+        """Neuestes Backup mit Zeitpunkt <= at (Unix-Zeit; None = neuestes überhaupt)."""
+        candidates = [e for e in self.catalog(scope) if at is None or e["t"] <= at]
+        return candidates[-1] if candidates else None
+
+    def load(self, scope, entry):
+        """State eines Katalogeintrags (ohne Version)."""
+        with gzip.open(self._object_path(scope, entry["h"]), "rb") as f:
+            return json.loads(f.read().decode("utf-8"))
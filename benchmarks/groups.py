@@ -0,0 +1,82 @@
+"""
+Latenz von /g/<group>/api/state und /api/action in Abhängigkeit der Anzahl Gruppen.
+
+Legt in einem temporären Verzeichnis N Haushalte an und misst danach Requests
+auf zufällige Gruppen (80 % auf einen heissen Satz, der in die LRU passt,
+20 % quer über alle Gruppen). Die Latenz soll mit N flach bleiben.
+
+    python benchmarks/groups.py --groups 10 100 1000 5000 --requests 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(samples, q):
+    samples = sorted(samples)
+    idx = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+    return samples[idx]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--groups", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--cache", type=int, default=256, help="WORKOUT_GROUP_CACHE")
+    parser.add_argument("--storage", default="file", help="WORKOUT_STORAGE")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="workout-groups-")
+    os.chdir(workdir)
+    os.environ["WORKOUT_GROUPS_DIR"] = os.path.join(workdir, "groups")
+    os.environ["WORKOUT_GROUPS_AUTOCREATE"] = "1"
+    os.environ["WORKOUT_GROUP_CACHE"] = str(args.cache)
+    os.environ["WORKOUT_STORAGE"] = args.storage
+    sys.path.insert(0, ROOT)
+    import app as workout_app
+
+    client = workout_app.app.test_client()
+    rng = random.Random(42)
+    results = []
+    created = 0
+
+    for n in sorted(args.groups):
+        while created < n:
+            client.get(f"/g/h{created}/api/state?role=mann")
+            created += 1
+
+        hot = [f"h{i}" for i in rng.sample(range(n), min(n, args.cache // 2))]
+        reads, writes = [], []
+        for i in range(args.requests):
+            group = rng.choice(hot) if rng.random() < 0.8 else f"h{rng.randrange(n)}"
+            t0 = time.perf_counter()
+            if i % 5 == 0:
+                client.post(
+                    f"/g/{group}/api/action",
+                    json={"role": "mann", "action": "exercise_undo" if i % 10 else "exercise", "exercise": "squats"},
+                )
+                writes.append(time.perf_counter() - t0)
+            else:
+                client.get(f"/g/{group}/api/state?role=frau")
+                reads.append(time.perf_counter() - t0)
+
+        results.append({
+            "groups": n,
+            "read_p50_ms": round(_percentile(reads, 0.50) * 1000, 3),
+            "read_p99_ms": round(_percentile(reads, 0.99) * 1000, 3),
+            "write_p50_ms": round(_percentile(writes, 0.50) * 1000, 3),
+            "write_p99_ms": round(_percentile(writes, 0.99) * 1000, 3),
+            "cache": workout_app.state_cache_stats(),
+        })
+
+    print(json.dumps({"storage": args.storage, "lru_size": args.cache, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
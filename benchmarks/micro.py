@@ -0,0 +1,297 @@
+"""
+Micro-Benchmarks für Builder, Reducer, Laden/Speichern und Serialisierung
+des States.
+
+Erzeugt synthetische States mit 1 Tag, 1 Jahr und 10 Jahren Verlauf
+(Skip ~ alle 10 Tage, Cant ~ alle 30, Sport ~5 %, krank ~2 %, inkl. Historie)
+und misst jede Operation einzeln. Ausgabe als JSON (ops/s, p50/p90/p99 in µs);
+wire_bytes sind die Grössen von Client-State und State-Datei roh bzw.
+gzip-/Brotli-komprimiert.
+
+    python benchmarks/micro.py --output bench.json
+    python benchmarks/micro.py --compare bench.json --threshold 0.25
+
+Mit --compare wird gegen eine gespeicherte Ausgabe verglichen; ist p50 einer
+Messung um mehr als --threshold langsamer, wird sie gemeldet (Exit-Code 1).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = {"1d": 1, "1y": 365, "10y": 3650}
+
+
+def _percentile(samples, q):
+    samples = sorted(samples)
+    idx = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+    return samples[idx]
+
+
+def _summary(samples):
+    mean = statistics.fmean(samples)
+    return {
+        "n": len(samples),
+        "ops_per_s": round(1 / mean, 1) if mean else None,
+        "p50_us": round(_percentile(samples, 0.50) * 1e6, 2),
+        "p90_us": round(_percentile(samples, 0.90) * 1e6, 2),
+        "p99_us": round(_percentile(samples, 0.99) * 1e6, 2),
+    }
+
+
+def synthetic_state(A, days: int, seed: int = 1):
+    """State nach `days` Tagen mit realistischer Dichte an Status-Tagen."""
+    rng = random.Random(seed)
+    state = A._initial_state()
+    for day in range(1, days + 1):
+        for p in A.member_ids(state):
+            r = rng.random()
+            cal = A.calendar(state, p)
+            last_skip = cal.last("skip")
+            last_cant = cal.last("cant")
+            if r < 0.10 and (last_skip is None or day - last_skip >= A.SKIP_MIN_DAYS):
+                A._apply_skip(state, p)
+            elif r < 0.14 and (last_cant is None or day - last_cant >= A.CANT_MIN_DAYS):
+                A._apply_cant(state, p, A.CANT_PASSWORD)
+            elif r < 0.19:
+                A._apply_sport(state, p)
+            elif r < 0.21:
+                A._apply_injured(state, p)
+            else:
+                for ex in A.EXERCISES:
+                    A._apply_exercise(state, p, ex)
+            if rng.random() < 0.01:
+                cal.add("cheater", day)
+            A._update_today(state, p)
+        if day < days:
+            error, _ = A._reduce_nextday(state)
+            assert error is None, error
+    # heute wieder offen, damit die Reducer etwas zu tun haben
+    for p in A.member_ids(state):
+        cal = A.calendar(state, p)
+        for lane in ("skip", "cant", "sport", "injured"):
+            cal.remove(lane, state["day"])
+        for ex in A.EXERCISES:
+            A._apply_exercise_undo(state, p, ex)
+        A._update_today(state, p)
+    return state
+
+
+def _time_calls(fn, setup, repeat):
+    """fn(setup()) repeat-mal; gemessen wird nur fn."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup()
+        t0 = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def bench_builders(A, state, repeat):
+    role = "mann"
+    internal = A._role_to_internal(state, role)
+    same = lambda: state  # noqa: E731 – Builder mutieren nicht
+    return {
+        "build_client_state": _time_calls(lambda st: A._build_client_state(st, role), same, repeat),
+        "build_member_view": _time_calls(lambda st: A._build_member_view(st, internal), same, repeat),
+        "build_phrase_category": _time_calls(lambda st: A._build_phrase_category(st, role), same, repeat),
+        "day_flags": _time_calls(lambda st: A._person_day_flags(st, internal), same, repeat),
+    }
+
+
+def bench_reducers(A, state, repeat):
+    p = A._role_to_internal(state, "mann")
+    fresh = lambda: A.clone_state(state)  # noqa: E731
+
+    def with_(apply):
+        def setup():
+            st = fresh()
+            apply(st)
+            return st
+        return setup
+
+    cases = {
+        "apply_exercise": (lambda st: A._apply_exercise(st, p, "squats"), fresh),
+        "apply_exercise_undo": (lambda st: A._apply_exercise_undo(st, p, "squats"),
+                                with_(lambda st: A._apply_exercise(st, p, "squats"))),
+        "apply_skip": (lambda st: A._apply_skip(st, p), fresh),
+        "apply_skip_undo": (lambda st: A._apply_skip_undo(st, p), with_(lambda st: A._apply_skip(st, p))),
+        "apply_injured": (lambda st: A._apply_injured(st, p), fresh),
+        "apply_injured_undo": (lambda st: A._apply_injured_undo(st, p), with_(lambda st: A._apply_injured(st, p))),
+        "apply_cant": (lambda st: A._apply_cant(st, p, A.CANT_PASSWORD), fresh),
+        "apply_cant_undo": (lambda st: A._apply_cant_undo(st, p),
+                            with_(lambda st: A._apply_cant(st, p, A.CANT_PASSWORD))),
+        "apply_cant_exercise": (lambda st: A._apply_cant_exercise(st, p, "pushups", A.CANT_PASSWORD), fresh),
+        "apply_cant_exercise_undo": (lambda st: A._apply_cant_exercise_undo(st, p, "pushups"),
+                                     with_(lambda st: A._apply_cant_exercise(st, p, "pushups", A.CANT_PASSWORD))),
+        "apply_sport": (lambda st: A._apply_sport(st, p), fresh),
+        "apply_sport_undo": (lambda st: A._apply_sport_undo(st, p), with_(lambda st: A._apply_sport(st, p))),
+        "dispatch_action": (lambda st: A.dispatch_action(st, "mann", "exercise", {"exercise": "squats"}), fresh),
+        "reduce_nextday": (lambda st: A._reduce_nextday(st), with_(lambda st: done_all_apply(A, st))),
+    }
+    return {name: _time_calls(fn, setup, repeat) for name, (fn, setup) in cases.items()}
+
+
+def done_all_apply(A, state):
+    """Alle Mitglieder erledigen alle Übungen (Voraussetzung für nextday)."""
+    for p in A.member_ids(state):
+        for ex in A.EXERCISES:
+            A._apply_exercise(state, p, ex)
+        A._update_today(state, p)
+
+
+def bench_storage(A, state, repeat, modes):
+    results = {}
+    for mode in modes:
+        workdir = tempfile.mkdtemp(prefix=f"workout-bench-{mode}-")
+        try:
+            A.STORAGE_MODE = mode
+            store = A._make_store(workdir)
+            store.save(A.clone_state(state))
+            p = A._role_to_internal(state, "mann")
+
+            def toggle(st):
+                if st["done"][p]["squats"]:
+                    A._apply_exercise_undo(st, p, "squats")
+                else:
+                    A._apply_exercise(st, p, "squats")
+                return None, True
+
+            results[f"{mode}_update"] = _time_calls(lambda _: store.update(toggle), lambda: None, repeat)
+            results[f"{mode}_load_warm"] = _time_calls(lambda _: store.load(), lambda: None, repeat)
+
+            def cold_load(_):
+                other = A._make_store(workdir)
+                other.load()
+                other.close()
+            results[f"{mode}_load_cold"] = _time_calls(cold_load, lambda: None, max(5, repeat // 5))
+            store.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def bench_serialization(A, state, repeat):
+    """
+    Kodieren mit der Standardbibliothek in der bisherigen Form (jsonify:
+    sortiert + ASCII; state.json eingerückt) gegen serializer, dazu die
+    Bytes über die Leitung. (samples, wire_bytes)
+    """
+    import serializer
+
+    client = A._build_client_state(state, "mann")
+    same = lambda: None  # noqa: E731
+    client_raw = serializer.dumps_bytes(client)
+    state_raw = serializer.dumps_bytes(state)
+    samples = {
+        "encode_client_json": _time_calls(lambda _: json.dumps(client, sort_keys=True), same, repeat),
+        f"encode_client_{serializer.ENGINE}": _time_calls(lambda _: serializer.dumps_bytes(client), same, repeat),
+        "encode_state_json_indent": _time_calls(
+            lambda _: json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8"), same, repeat),
+        f"encode_state_{serializer.ENGINE}": _time_calls(lambda _: serializer.dumps_bytes(state), same, repeat),
+        f"decode_state_{serializer.ENGINE}": _time_calls(lambda _: serializer.loads(state_raw), same, repeat),
+    }
+    wire = {
+        "client_json": len(json.dumps(client, sort_keys=True)),
+        "client": len(client_raw),
+        "state_json_indent": len(json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8")),
+        "state": len(state_raw),
+    }
+    for encoding in serializer.ENCODINGS:
+        samples[f"compress_client_{encoding}"] = _time_calls(
+            lambda _: serializer.compress(client_raw, encoding), same, repeat)
+        wire[f"client_{encoding}"] = len(serializer.compress(client_raw, encoding))
+        wire[f"state_{encoding}"] = len(serializer.compress(state_raw, encoding))
+    return samples, wire
+
+
+def run(args):
+    sys.path.insert(0, ROOT)
+    os.chdir(tempfile.mkdtemp(prefix="workout-bench-"))
+    import app as workout_app
+
+    results = {}
+    for size in args.sizes:
+        t0 = time.perf_counter()
+        state = synthetic_state(workout_app, SIZES[size])
+        gen_s = time.perf_counter() - t0
+        samples = {}
+        samples.update(bench_builders(workout_app, state, args.repeat))
+        samples.update(bench_reducers(workout_app, state, args.repeat))
+        samples.update(bench_storage(workout_app, state, args.repeat, args.storage))
+        serialization, wire = bench_serialization(workout_app, state, args.repeat)
+        samples.update(serialization)
+        results[size] = {
+            "state_bytes": len(json.dumps(state)),
+            "wire_bytes": wire,
+            "generate_s": round(gen_s, 3),
+            "benchmarks": {name: _summary(s) for name, s in samples.items()},
+        }
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "projection_engine": workout_app.PROJECTION_ENGINE,
+            "json_engine": workout_app.serializer.ENGINE,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Messungen, deren p50 mehr als threshold (relativ) langsamer ist als in baseline."""
+    regressions = []
+    for size, data in current["results"].items():
+        base = baseline.get("results", {}).get(size, {}).get("benchmarks", {})
+        for name, summary in data["benchmarks"].items():
+            old = base.get(name)
+            if not old or not old.get("p50_us"):
+                continue
+            ratio = summary["p50_us"] / old["p50_us"]
+            if ratio > 1 + threshold:
+                regressions.append({
+                    "size": size,
+                    "benchmark": name,
+                    "baseline_p50_us": old["p50_us"],
+                    "p50_us": summary["p50_us"],
+                    "ratio": round(ratio, 2),
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--storage", nargs="+", default=["file", "journal", "sqlite"])
+    parser.add_argument("--output", help="Ergebnis zusätzlich in diese Datei schreiben")
+    parser.add_argument("--compare", help="Baseline-JSON (frühere --output-Datei)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="erlaubte Verlangsamung von p50")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.threshold)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
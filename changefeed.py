@@ -0,0 +1,127 @@
+"""
+Prozessübergreifendes "State hat sich geändert"-Signal für /api/stream.
+
+Der Worker, der committet, schreibt die neue Version in eine kleine Datei
+neben dem State (state.notify, atomar per os.replace) und weckt seine eigenen
+Stream-Verbindungen direkt. Die anderen Gunicorn-Worker haben, solange bei
+ihnen jemand zuhört, einen Watcher-Thread (einen pro Prozess für alle
+Gruppen), der nur diese Dateien per stat() beobachtet und dann die
+Verbindungen weckt. Kein Broker, kein Polling des eigentlichen States.
+"""
+import os
+import threading
+import time
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class _Watcher:
+    """Ein Thread pro Prozess: prüft reihum die Dateien aller ChangeNotifier mit Zuhörern."""
+
+    IDLE_ROUNDS = 10
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = {}  # ChangeNotifier -> Runden ohne Zuhörer
+        self._thread = None
+
+    def add(self, notifier):
+        """Notifier beobachten; True, wenn er bisher nicht beobachtet wurde."""
+        with self._lock:
+            added = notifier not in self._idle
+            self._idle[notifier] = 0
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            return added
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    self._thread = None
+                    return
+                notifiers = list(self._idle)
+            time.sleep(min(n.poll_interval for n in notifiers))
+            busy = {n: n._check() for n in notifiers}
+            with self._lock:
+                for n, has_waiters in busy.items():
+                    # ohne Zuhörer nach ein paar Runden abmelden (seq() meldet neu an)
+                    idle = 0 if has_waiters else self._idle.get(n, 0) + 1
+                    if idle > self.IDLE_ROUNDS:
+                        self._idle.pop(n, None)
+                    elif n in self._idle:
+                        self._idle[n] = idle
+
+    def _after_fork(self):
+        # der Thread des Elternprozesses existiert im Kind nicht
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._thread = None
+
+
+_WATCHER = _Watcher()
+os.register_at_fork(after_in_child=_WATCHER._after_fork)
+
+
+class ChangeNotifier:
+    """Änderungszähler pro Gruppe; wait() blockiert, bis publish() (irgendwo) aufgerufen wurde."""
+
+    def __init__(self, path, poll_interval=0.2):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._waiters = 0
+        self._key = None
+
+    def publish(self, version):
+        """Neue Version bekanntgeben (nach einem Commit)."""
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(str(int(version)))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # Benachrichtigung ist best effort, der Commit ist schon durch
+        with self._cond:
+            self._key = _stat_key(self.path)
+            self._seq += 1
+            self._cond.notify_all()
+
+    def seq(self):
+        """Aktueller Zählerstand; startet den Watcher, damit ab jetzt nichts verpasst wird."""
+        with self._cond:
+            self._ensure_watcher()
+            return self._seq
+
+    def wait(self, seq, timeout):
+        """Wartet höchstens timeout Sekunden auf eine Änderung nach seq; gibt den neuen Zähler zurück."""
+        with self._cond:
+            self._waiters += 1
+            try:
+                self._ensure_watcher()
+                self._cond.wait_for(lambda: self._seq != seq, timeout)
+                return self._seq
+            finally:
+                self._waiters -= 1
+
+    def _ensure_watcher(self):
+        if _WATCHER.add(self):
+            self._key = _stat_key(self.path)
+
+    def _check(self):
+        """Vom Watcher: Datei geändert -> Zuhörer wecken. Gibt zurück, ob jemand wartet."""
+        key = _stat_key(self.path)
+        with self._cond:
+            if key != self._key:
+                self._key = key
+                self._seq += 1
+                self._cond.notify_all()
+            return bool(self._waiters)
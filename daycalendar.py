@@ -0,0 +1,114 @@
+"""
+Kompakter Tageskalender pro Person.
+
+Jede Status-Art (skip, injured, cant, cheater, sport, cant_ex.<übung>) ist eine
+"Lane": ein Bitset über die Tagnummern (Bit n = Tag n). Im State steht jede
+Lane als Hex-String, z.B. 10 Jahre Skip-Tage in höchstens ~900 Zeichen:
+
+    state["calendar"]["female"] = {"skip": "20", "cant": "400040"}
+
+DayCalendar ist die gemeinsame Abfrage-API für Reducer und Builder. Lanes
+werden beim ersten Zugriff einmal dekodiert; "letzter Tag" (für die
+Cooldowns) ist die höchste gesetzte Bit-Position und damit O(1).
+"""
+
+STATUS_KINDS = ("skip", "injured", "cant", "cheater", "sport")
+CANT_EX_PREFIX = "cant_ex."
+
+
+def cant_ex_lane(exercise: str) -> str:
+    return CANT_EX_PREFIX + exercise
+
+
+def encode_days(days) -> str:
+    """Tagnummern -> Hex-Bitset ("" wenn leer)."""
+    bits = 0
+    for d in days:
+        d = int(d)
+        if d > 0:
+            bits |= 1 << d
+    return format(bits, "x") if bits else ""
+
+
+def decode_days(raw: str):
+    """Hex-Bitset -> aufsteigende Liste der Tagnummern."""
+    return _bits_to_days(int(raw, 16) if raw else 0)
+
+
+def _bits_to_days(bits: int):
+    days = []
+    while bits:
+        low = bits & -bits
+        day = low.bit_length() - 1
+        days.append(day)
+        bits ^= low
+    return days
+
+
+class DayCalendar:
+    """Sicht auf die Lanes einer Person; Änderungen werden direkt in das State-Dict geschrieben."""
+
+    __slots__ = ("_lanes", "_bits")
+
+    def __init__(self, lanes: dict):
+        self._lanes = lanes
+        self._bits = {}
+
+    def _get(self, lane: str) -> int:
+        bits = self._bits.get(lane)
+        if bits is None:
+            raw = self._lanes.get(lane)
+            bits = int(raw, 16) if raw else 0
+            self._bits[lane] = bits
+        return bits
+
+    def _put(self, lane: str, bits: int):
+        self._bits[lane] = bits
+        if bits:
+            self._lanes[lane] = format(bits, "x")
+        else:
+            self._lanes.pop(lane, None)
+
+    def has(self, lane: str, day: int) -> bool:
+        return day > 0 and (self._get(lane) >> day) & 1 == 1
+
+    def add(self, lane: str, day: int) -> bool:
+        """Setzt den Tag; gibt False zurück, wenn er schon gesetzt war."""
+        bits = self._get(lane)
+        mask = 1 << day
+        if day <= 0 or bits & mask:
+            return False
+        self._put(lane, bits | mask)
+        return True
+
+    def add_range(self, lane: str, first: int, count: int):
+        """Setzt die Tage first .. first+count-1 mit einer Bit-Operation."""
+        if count <= 0 or first <= 0:
+            return
+        self._put(lane, self._get(lane) | (((1 << count) - 1) << first))
+
+    def remove(self, lane: str, day: int) -> bool:
+        """Entfernt den Tag; gibt False zurück, wenn er nicht gesetzt war."""
+        bits = self._get(lane)
+        mask = 1 << day
+        if day <= 0 or not bits & mask:
+            return False
+        self._put(lane, bits & ~mask)
+        return True
+
+    def last(self, lane: str):
+        """Letzter gesetzter Tag oder None."""
+        bits = self._get(lane)
+        return bits.bit_length() - 1 if bits else None
+
+    def count(self, lane: str) -> int:
+        return self._get(lane).bit_count()
+
+    def days(self, lane: str):
+        return _bits_to_days(self._get(lane))
+
+    def any_on(self, prefix: str, day: int) -> bool:
+        """Ist der Tag in irgendeiner Lane mit diesem Präfix gesetzt (z.B. alle cant_ex.*)?"""
+        return any(
+            lane.startswith(prefix) and self.has(lane, day) for lane in list(self._lanes)
+        )
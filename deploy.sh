@@ -51,6 +51,13 @@ if [ -f requirements.txt ]; then
   "
 fi
 
+# State-Schema aktualisieren (Einzel-Instanz und alle Gruppen), solange der Dienst steht
+sudo -u "${APP_USER}" bash -lc "
+  cd '${APP_DIR}'
+  set -a; [ -f config/instance.env ] && source config/instance.env; set +a
+  WORKOUT_PROFILE=production venv/bin/flask --app app migrate
+"
+
 sudo systemctl start "${SERVICE}"
 sudo systemctl status "${SERVICE}" --no-pager | sed -n '1,12p'
 
@@ -0,0 +1,115 @@
+"""
+Export und Import der Trainingsdaten als NDJSON oder CSV – gestreamt statt
+als ein grosses json.dumps: eine Zeile pro Person × Tag × Übung,
+
+    {"date":"2026-01-05","day":5,"person":"mann","exercise":"squats","reps":24,"done":true,"status":"done","source":"history"}
+
+Die Zeilen kommen als Tupel in FIELDS-Reihenfolge aus einem Generator
+(app.export_rows) und werden hier in Blöcken zu je chunk_rows Zeilen
+kodiert. Der Speicherbedarf hängt damit nur von der Blockgrösse ab, nicht
+von der Länge der Historie, und der erste Block geht sofort raus.
+
+decode() liest dasselbe Format zeilenweise zurück (app.import_rows prüft
+und baut daraus den State); date und source sind dabei optional.
+"""
+import csv
+import io
+import json
+
+FIELDS = ("date", "day", "person", "exercise", "reps", "done", "status", "source")
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+CHUNK_ROWS = 512
+
+
+def iter_ndjson(rows, chunk_rows=CHUNK_ROWS):
+    """NDJSON-Blöcke (str). Personen werden einmal JSON-kodiert, der Rest ist ASCII ohne Escapes."""
+    quoted = {}
+    buf = []
+    for date, day, person, exercise, reps, done, status, source in rows:
+        q = quoted.get(person)
+        if q is None:
+            q = quoted[person] = json.dumps(person, ensure_ascii=False)
+        buf.append(
+            f'{{"date":"{date}","day":{day},"person":{q},"exercise":"{exercise}",'
+            f'"reps":{reps},"done":{"true" if done else "false"},'
+            f'"status":"{status}","source":"{source}"}}\n'
+        )
+        if len(buf) >= chunk_rows:
+            yield "".join(buf)
+            buf.clear()
+    if buf:
+        yield "".join(buf)
+
+
+def iter_csv(rows, chunk_rows=CHUNK_ROWS):
+    """CSV-Blöcke (str) mit Kopfzeile; done als 0/1."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(FIELDS)
+    n = 0
+    for date, day, person, exercise, reps, done, status, source in rows:
+        writer.writerow((date, day, person, exercise, reps, 1 if done else 0, status, source))
+        n += 1
+        if n >= chunk_rows:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+            n = 0
+    if out.tell():
+        yield out.getvalue()
+
+
+def encode(rows, fmt: str, chunk_rows=CHUNK_ROWS):
+    """Blöcke im gewünschten Format ("ndjson" oder "csv")."""
+    if fmt == "csv":
+        return iter_csv(rows, chunk_rows)
+    return iter_ndjson(rows, chunk_rows)
+
+
+REQUIRED_FIELDS = ("day", "person", "exercise", "reps", "done", "status")
+
+
+class ImportFormatError(ValueError):
+    """Zeile lässt sich nicht lesen; line ist die Zeilennummer (1-basiert)."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"Zeile {line}: {message}")
+        self.line = line
+
+
+def guess_format(name: str = "", content_type: str = "") -> str:
+    """Format ("csv" oder "ndjson") anhand Dateiendung bzw. Content-Type, sonst ndjson."""
+    if name.lower().endswith(".csv") or "csv" in (content_type or "").lower():
+        return "csv"
+    return "ndjson"
+
+
+def decode(lines, fmt: str):
+    """
+    (Zeilennummer, dict) für jede Datenzeile aus einem Iterable von
+    Textzeilen; Leerzeilen werden übersprungen. Wirft ImportFormatError.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        missing = [f for f in REQUIRED_FIELDS if f not in (reader.fieldnames or ())]
+        if missing:
+            raise ImportFormatError(1, f"Spalten fehlen: {', '.join(missing)}")
+        for row in reader:
+            if any(row.values()):
+                yield reader.line_num, row
+        return
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise ImportFormatError(line_no, "kein gültiges JSON")
+        if not isinstance(row, dict):
+            raise ImportFormatError(line_no, "JSON-Objekt erwartet")
+        yield line_no, row
@@ -0,0 +1,39 @@
+"""
+Gunicorn-Konfiguration für den Betrieb (systemd: gunicorn -c gunicorn.conf.py).
+
+Die App wird einmal im Master geladen (preload_app) und per fork an die
+Worker vererbt: Imports, kompilierte Templates und Asset-Hash liegen dann
+nur einmal im Speicher. Alles per Umgebung überschreibbar, gelesen beim Start.
+"""
+import multiprocessing
+import os
+
+# vor dem Import von app.py setzen, damit create_app() das Produktionsprofil nimmt
+os.environ.setdefault("WORKOUT_PROFILE", "production")
+
+_cpus = multiprocessing.cpu_count()
+
+wsgi_app = "app:app"
+bind = os.getenv("WORKOUT_BIND", "0.0.0.0:8000")
+
+# Der State liegt pro Gruppe in einer Datei/DB – mehr Prozesse bringen wenig,
+# gthread-Threads halten die SSE-Streams (/api/stream) offen.
+workers = int(os.getenv("WORKOUT_WORKERS", max(2, min(_cpus, 4))))
+worker_class = "gthread"
+threads = int(os.getenv("WORKOUT_THREADS", min(64, max(16, 8 * _cpus))))
+# jeder offene Stream hält einen Thread: höchstens ein Viertel davon, der Rest
+# bedient Requests; weitere Browser pollen /api/state (viele Live-Clients: asgi.py)
+os.environ.setdefault("WORKOUT_STREAMS_PER_WORKER", str(max(1, threads // 4)))
+
+preload_app = True
+reload = False
+timeout = 90
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    # einmal im Master, vor dem Fork der Worker (nur wenn das Profil es verlangt)
+    import app as workout
+
+    workout.migrate_on_start(workout.app)
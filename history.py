@@ -0,0 +1,240 @@
+"""
+Spaltenweise Tageshistorie.
+
+Bei jedem Tageswechsel (/api/nextday) wird pro Mitglied ein Datensatz des
+abgeschlossenen Tages angehängt: Ziel-Reps pro Übung, erledigte Übungen und
+die Status-Art des Tages. Gespeichert wird das nicht als Liste von Dicts,
+sondern als eine array-Spalte pro Person×Feld (Index = Tag - first_day),
+im State base64-kodiert (little endian):
+
+    state["history"] = {
+        "first_day": 1, "days": 26,
+        "columns": {"male:squats": ["DwAQ...", "EQA="], "male:done": ["Bwc...", "Bw=="], ...},
+        "overall_base": {"male": {"squats": 0, ...}},
+    }
+
+Eine Spalte ist eine Liste von Blöcken, die aneinandergehängt die Spalte
+ergeben. Ein Tageswechsel hängt nur einen Block an (im Journal ein kurzer
+"a"-Eintrag statt der ganzen Spalte); compact_columns() fasst die Blöcke
+beim Schreiben eines Snapshots wieder zu einem zusammen. Ältere States mit
+einem String pro Spalte werden weiter gelesen.
+
+Bereichsabfragen dekodieren nur die benötigten Spalten und schneiden sie zu.
+Reps sind uint16 (2 Byte/Tag/Übung), done ist eine Bitmaske und status ein
+Code (je 1 Byte/Tag) – zehn Jahre eines Paares sind so unter 60 KB.
+"""
+import base64
+import sys
+from array import array
+
+# Status-Art eines archivierten Tages ("none" = keine Daten, z.B. Lücke)
+STATUS_CODES = ("none", "open", "done", "sport", "skip", "cant", "injured")
+STATUS_INDEX = {name: i for i, name in enumerate(STATUS_CODES)}
+
+REPS_TYPE = "H"
+FLAG_TYPE = "B"
+
+
+def _pack(arr: array) -> str:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return base64.b64encode(arr.tobytes()).decode("ascii")
+
+
+def _raw_bytes(raw) -> bytes:
+    """Gespeicherte Spalte (String oder Liste von Blöcken) als Bytes."""
+    if isinstance(raw, str):
+        return base64.b64decode(raw)
+    return b"".join(base64.b64decode(chunk) for chunk in raw)
+
+
+def _unpack(typecode: str, raw) -> array:
+    arr = array(typecode)
+    if raw:
+        arr.frombytes(_raw_bytes(raw))
+        if sys.byteorder != "little":
+            arr.byteswap()
+    return arr
+
+
+def _packed_len(raw, itemsize: int) -> int:
+    """Anzahl Einträge einer gespeicherten Spalte, ohne sie zu dekodieren."""
+    chunks = [raw] if isinstance(raw, str) else raw
+    return sum(len(c) // 4 * 3 - c[-2:].count("=") for c in chunks if c) // itemsize
+
+
+def column_typecode(name: str) -> str:
+    """array-Typ einer Spalte "person:feld": Flags für done/status, sonst Reps."""
+    return FLAG_TYPE if name.rpartition(":")[2] in ("done", "status") else REPS_TYPE
+
+
+def column_values(name: str, raw) -> array:
+    """Gespeicherte Spalte (oder angehängte Blöcke) als array, z.B. für SqliteStore."""
+    return _unpack(column_typecode(name), raw)
+
+
+def column_len(name: str, raw) -> int:
+    """Anzahl Tage einer gespeicherten Spalte, ohne sie zu dekodieren."""
+    return _packed_len(raw, array(column_typecode(name)).itemsize) if raw else 0
+
+
+def pack_column(name: str, values) -> list:
+    """Spalte aus Werten pro Tag, als ein Block."""
+    return [_pack(array(column_typecode(name), values))]
+
+
+def compact_columns(data: dict) -> dict:
+    """
+    Kopie von state["history"] mit je einem Block pro Spalte (für Snapshots).
+    data selbst bleibt unverändert; Spalten mit einem Block werden geteilt.
+    """
+    columns = data.get("columns")
+    if not columns:
+        return data
+    merged = {}
+    for name, raw in columns.items():
+        if isinstance(raw, list) and len(raw) == 1:
+            merged[name] = raw
+        else:
+            merged[name] = [base64.b64encode(_raw_bytes(raw)).decode("ascii")]
+    return {**data, "columns": merged}
+
+
+class DayHistory:
+    """Sicht auf state["history"]; Spalten werden bei Bedarf einmal dekodiert."""
+
+    __slots__ = ("_data", "_columns")
+
+    def __init__(self, data: dict):
+        self._data = data
+        self._columns = {}
+
+    @property
+    def first_day(self):
+        return self._data.get("first_day")
+
+    @property
+    def days(self) -> int:
+        return int(self._data.get("days", 0))
+
+    @property
+    def last_day(self):
+        return None if self.first_day is None else self.first_day + self.days - 1
+
+    def column(self, name: str, typecode: str) -> array:
+        """Spalte auf volle Länge (fehlende Tage = 0)."""
+        col = self._columns.get(name)
+        if col is None:
+            col = _unpack(typecode, self._data.get("columns", {}).get(name, ""))
+            if len(col) < self.days:
+                col.extend([0] * (self.days - len(col)))
+            self._columns[name] = col
+        return col
+
+    def append_day(self, day: int, records: dict, exercises):
+        """
+        Hängt den Tag an. records: {person: (reps{ex: n}, done{ex: bool}, status)}.
+        Lücken (Tage ohne Datensatz) werden mit 0 / "none" aufgefüllt.
+        """
+        if self.first_day is None:
+            self._data["first_day"] = day
+            self._data["days"] = 0
+        gap = day - (self.first_day + self.days)
+        if gap < 0:
+            return False  # Tag schon archiviert
+        new_len = self.days + gap + 1
+
+        columns = self._data.setdefault("columns", {})
+        for person, (reps, done, status) in records.items():
+            mask = 0
+            for i, ex in enumerate(exercises):
+                self._append(columns, f"{person}:{ex}", REPS_TYPE, new_len, int(reps.get(ex, 0)))
+                if done.get(ex, False):
+                    mask |= 1 << i
+            self._append(columns, f"{person}:done", FLAG_TYPE, new_len, mask)
+            self._append(columns, f"{person}:status", FLAG_TYPE, new_len, STATUS_INDEX[status])
+        self._data["days"] = new_len
+        return True
+
+    def append_missed(self, day: int, count: int, records: dict, exercises):
+        """
+        Hängt count verpasste Tage ab day an, ohne Schleife über die Tage:
+        Reps steigen um 1 pro Tag, nichts erledigt, gleicher Status.
+        records: {person: (reps{ex: n} am Tag day, status)}.
+        """
+        if count <= 0:
+            return False
+        if self.first_day is None:
+            self._data["first_day"] = day
+            self._data["days"] = 0
+        if day != self.first_day + self.days:
+            return False  # nur direkt anschliessend
+        new_len = self.days + count
+
+        columns = self._data.setdefault("columns", {})
+        for person, (reps, status) in records.items():
+            for ex in exercises:
+                start = int(reps.get(ex, 0))
+                self._extend(columns, f"{person}:{ex}", REPS_TYPE, new_len, range(start, start + count))
+            self._extend(columns, f"{person}:done", FLAG_TYPE, new_len, bytes(count))
+            self._extend(columns, f"{person}:status", FLAG_TYPE, new_len, bytes([STATUS_INDEX[status]]) * count)
+        self._data["days"] = new_len
+        return True
+
+    def replace_all(self, first_day: int, days: int, columns: dict):
+        """
+        Ersetzt die ganze Historie auf einmal (z.B. Import). columns:
+        {"person:feld": array} mit je days Einträgen, Typen wie oben.
+        """
+        self._data.clear()
+        self._columns = {}
+        if days <= 0:
+            return
+        self._data["first_day"] = first_day
+        self._data["days"] = days
+        self._data["columns"] = {name: [_pack(col[:days])] for name, col in columns.items()}
+
+    def _extend(self, columns, name, typecode, new_len, values):
+        """Hängt values (Lücke davor mit 0) als neuen Block an, ohne die Spalte neu zu kodieren."""
+        raw = columns.get(name)
+        if raw is None:
+            raw = columns[name] = []
+        elif isinstance(raw, str):
+            raw = columns[name] = [raw]  # altes Format, einmalig
+        block = array(typecode)
+        block.extend([0] * (new_len - len(values) - _packed_len(raw, block.itemsize)))
+        if isinstance(values, bytes):
+            block.frombytes(values)  # Flag-Spalten: 1 Byte pro Tag
+        else:
+            block.extend(values)
+        raw.append(_pack(block))
+        self._columns.pop(name, None)  # dekodierte Kopie ist veraltet
+
+    def _append(self, columns, name, typecode, new_len, value):
+        self._extend(columns, name, typecode, new_len, [value])
+
+    def bounds(self, day_from=None, day_to=None):
+        """(erster Tag, Slice) für den Bereich, auf die vorhandenen Tage begrenzt."""
+        if self.first_day is None:
+            return None, slice(0, 0)
+        lo = self.first_day if day_from is None else max(day_from, self.first_day)
+        hi = self.last_day if day_to is None else min(day_to, self.last_day)
+        if hi < lo:
+            return lo, slice(0, 0)
+        return lo, slice(lo - self.first_day, hi - self.first_day + 1)
+
+    def reps(self, person: str, exercise: str, sl: slice = slice(None)) -> array:
+        return self.column(f"{person}:{exercise}", REPS_TYPE)[sl]
+
+    def done_masks(self, person: str, sl: slice = slice(None)) -> array:
+        return self.column(f"{person}:done", FLAG_TYPE)[sl]
+
+    def statuses(self, person: str, sl: slice = slice(None)) -> array:
+        return self.column(f"{person}:status", FLAG_TYPE)[sl]
+
+    def done_reps_sum(self, person: str, exercise: str, exercises) -> int:
+        """Summe der Reps aller erledigten Tage dieser Übung (für den overall-Abgleich)."""
+        bit = 1 << list(exercises).index(exercise)
+        reps = self.reps(person, exercise)
+        return sum(r for r, m in zip(reps, self.done_masks(person)) if m & bit)
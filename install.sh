@@ -44,7 +44,7 @@ User=${APP_USER}
 WorkingDirectory=${APP_DIR}
 Environment=PYTHONUNBUFFERED=1
 Environment=PYTHONPATH=${APP_DIR}
-ExecStart=${APP_DIR}/venv/bin/gunicorn --workers 2 --reload --timeout 90 --bind 0.0.0.0:8000 app:app
+ExecStart=${APP_DIR}/venv/bin/gunicorn -c gunicorn.conf.py
 Restart=always
 
 [Install]
@@ -0,0 +1,140 @@
+"""
+Rangliste über alle Instanzen (Einzel-Instanz und jede Gruppe).
+
+Beim ersten Zugriff liest LeaderboardIndex jede Instanz einmal und legt pro
+(Übung, Kennzahl) eine sortierte Liste an. Danach prüft ein Hintergrund-
+Thread alle interval Sekunden nur die mtimes der State-Dateien
+(StateStore.mtime_ns(), ein stat() pro Datei; die Stores werden dafür pro
+Scope einmal angelegt und behalten) und liest ausschliesslich geänderte
+Instanzen neu;
+deren Einträge werden per bisect aus den Listen genommen und neu
+einsortiert – kein kompletter Neuaufbau. top() ist danach nur ein Slice:
+
+    _lists[("squats", "overall")] = [(-4210, "meier", "frau"), (-3980, "_default", "mann"), ...]
+
+Jeder Worker hält seinen eigenen Index (Thread startet nach dem Fork).
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class LeaderboardIndex:
+    """
+    sources: wie bei BackupManager, Callable -> [(scope, open_store)].
+    extract(state) -> [(person, info, {(übung, kennzahl): wert})]; info sind
+    Zusatzfelder für die Ausgabe (z.B. Name).
+    """
+
+    def __init__(self, sources, extract, interval=5.0):
+        self.sources = sources
+        self.extract = extract
+        self.interval = interval
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # nach fork(): eigener Index, eigener Poll-Thread
+        self._lists = {}     # (übung, kennzahl) -> sortiert [(-wert, scope, person)]
+        self._values = {}    # scope -> {person: {(übung, kennzahl): wert}}
+        self._info = {}      # (scope, person) -> info
+        self._mtimes = {}    # scope -> mtime_ns beim letzten Lesen
+        self._stores = {}    # scope -> Store (nur für mtime_ns()/snapshot(), vom Poll-Thread)
+        self._lock = threading.Lock()          # Listen (Lesen/Ändern)
+        self._refresh_lock = threading.Lock()  # nur ein refresh() gleichzeitig
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self.refreshed_at = None
+
+    # --- Hintergrund-Thread ----------------------------------------------
+
+    def ensure_started(self):
+        """Erster Aufruf pro Prozess liest alles einmal ein (andere warten) und startet den Poll-Thread."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.refresh()
+            self._pid = os.getpid()
+            if self.interval > 0:
+                threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        pid = self._pid
+        while pid == os.getpid():
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception:  # Rangliste darf den Betrieb nie stören; nächste Runde versucht es erneut
+                log.exception("Rangliste: Aktualisierung fehlgeschlagen")
+
+    def refresh(self):
+        """Geänderte Instanzen neu einlesen, verschwundene entfernen; gibt die Anzahl Änderungen zurück."""
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self):
+        changed = 0
+        present = set()
+        for scope, open_store in self.sources():
+            present.add(scope)
+            store = self._stores.get(scope)
+            if store is None:
+                store = self._stores[scope] = open_store()
+            mtime = store.mtime_ns()
+            if self._mtimes.get(scope) == mtime:
+                continue
+            state = store.snapshot() if mtime else None
+            self._replace(scope, self.extract(state) if state is not None else [])
+            self._mtimes[scope] = mtime
+            changed += 1
+        for scope in set(self._stores) - present:
+            self._stores.pop(scope).close()
+        for scope in set(self._mtimes) - present:
+            self._replace(scope, [])
+            del self._mtimes[scope]
+            changed += 1
+        self.refreshed_at = time.time()
+        return changed
+
+    # --- Index -------------------------------------------------------------
+
+    def _replace(self, scope, people):
+        with self._lock:
+            for person, values in self._values.pop(scope, {}).items():
+                self._info.pop((scope, person), None)
+                for key, value in values.items():
+                    entries = self._lists[key]
+                    i = bisect.bisect_left(entries, (-value, scope, person))
+                    if i < len(entries) and entries[i] == (-value, scope, person):
+                        del entries[i]
+            if not people:
+                return
+            current = self._values[scope] = {}
+            for person, info, values in people:
+                current[person] = dict(values)
+                self._info[(scope, person)] = info
+                for key, value in values.items():
+                    bisect.insort(self._lists.setdefault(key, []), (-value, scope, person))
+
+    def instances(self) -> int:
+        return len(self._values)
+
+    def top(self, exercise, metric, n):
+        """Die n Besten als [(rang, scope, person, info, wert)]; gleiche Werte teilen sich den Rang."""
+        with self._lock:
+            entries = self._lists.get((exercise, metric), [])[:n]
+            info = [self._info.get((scope, person)) for _, scope, person in entries]
+        result = []
+        rank = 0
+        previous = None
+        for i, ((neg, scope, person), extra) in enumerate(zip(entries, info), 1):
+            if neg != previous:
+                rank, previous = i, neg
+            result.append((rank, scope, person, extra, -neg))
+        return result
@@ -0,0 +1,236 @@
+"""
+Leichtgewichtige Metriken (Zähler, Histogramme, Gauges) im Prometheus-Textformat.
+
+Jeder Worker zählt im Speicher (ein Lock, kein I/O pro Request) und schreibt
+seinen Stand etwa einmal pro Sekunde aus einem Hintergrund-Thread nach
+<directory>/worker-<pid>.json (atomar per os.replace). /metrics summiert
+alle Worker-Dateien – der eigene Worker steuert seinen Live-Stand bei.
+Dateien beendeter Worker werden in <directory>/retired.json aufaddiert und
+erst danach entfernt (unter <directory>/.lock), damit die _total-Zähler
+über Worker-Neustarts hinweg nie sinken.
+"""
+import bisect
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Latenz-Buckets in Sekunden (Prometheus "le")
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _merge(snapshots):
+    """Summiert Worker-Stände (None = fehlend/unlesbar) zu ({(name, labels): wert}, {(name, labels): histogramm})."""
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        if snap is None:
+            continue
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(tuple(p) for p in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, hist in snap["histograms"]:
+            key = (name, tuple(tuple(p) for p in labels))
+            total = histograms.get(key)
+            histograms[key] = hist if total is None else [a + b for a, b in zip(total, hist)]
+    return counters, histograms
+
+
+def _as_snapshot(counters, histograms):
+    return {
+        "counters": [[n, [list(p) for p in l], v] for (n, l), v in counters.items()],
+        "histograms": [[n, [list(p) for p in l], list(h)] for (n, l), h in histograms.items()],
+    }
+
+
+class Metrics:
+    def __init__(self, directory: str, flush_interval: float = 1.0, help_texts=None):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.help_texts = dict(help_texts or {})
+        self._lock = threading.Lock()
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # nach fork(): eigene Zahlen, eigene Datei, eigener Flush-Thread
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._thread = None
+        self._pid = os.getpid()
+
+    # --- erfassen --------------------------------------------------------
+
+    def inc(self, name: str, labels=(), amount: float = 1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            if self._thread is None:
+                self._start_flusher()
+
+    def observe(self, name: str, seconds: float, labels=()):
+        key = (name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                # [Bucket-Zähler..., +Inf-Zähler, Summe]
+                hist = self._histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+                if self._thread is None:
+                    self._start_flusher()
+            hist[bisect.bisect_left(BUCKETS, seconds)] += 1
+            hist[-1] += seconds
+
+    # --- über Worker zusammenführen ---------------------------------------
+
+    def _snapshot(self):
+        with self._lock:
+            return _as_snapshot(self._counters, self._histograms)
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"worker-{pid}.json")
+
+    def _start_flusher(self):
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def _flush_loop(self):
+        pid = self._pid
+        while pid == os.getpid():
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass  # Metriken dürfen den Betrieb nie stören
+
+    def flush(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(self._pid)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._snapshot(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _worker_files(self):
+        """[(pid, Pfad)] aller Worker-Dateien ausser der eigenen."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        files = []
+        for fname in names:
+            if not (fname.startswith("worker-") and fname.endswith(".json")):
+                continue
+            try:
+                pid = int(fname[len("worker-"):-len(".json")])
+            except ValueError:
+                continue
+            if pid != self._pid:
+                files.append((pid, os.path.join(self.directory, fname)))
+        return files
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @contextmanager
+    def _locked(self):
+        """Lock über alle Worker: Einsammeln und Lesen sehen retired.json und die Worker-Dateien konsistent."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _retire(self, retired, dead):
+        """Stände beendeter Worker zu retired addieren, speichern, dann ihre Dateien löschen."""
+        counters, histograms = _merge([retired] + [self._read(path) for path in dead])
+        path = os.path.join(self.directory, "retired.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_as_snapshot(counters, histograms), f, separators=(",", ":"))
+        os.replace(tmp, path)
+        for path in dead:
+            os.remove(path)
+
+    def _collect(self):
+        """Summen über alle Worker: ({(name, labels): wert}, {(name, labels): histogramm})."""
+        with self._locked():
+            retired = self._read(os.path.join(self.directory, "retired.json"))
+            snapshots = [self._snapshot(), retired]
+            dead = []
+            for pid, path in self._worker_files():
+                snapshots.append(self._read(path))
+                if not _pid_alive(pid):
+                    dead.append(path)
+            if dead:
+                try:
+                    self._retire(retired, dead)
+                except OSError:
+                    pass  # nächster Abruf versucht es erneut, gezählt sind sie oben schon
+        return _merge(snapshots)
+
+    def render(self, gauges=()) -> str:
+        """
+        Prometheus-Textformat. gauges: [(name, labels, wert)] – werden beim
+        Abruf berechnet (z.B. State-Grösse) und nicht über Worker summiert.
+        """
+        counters, histograms = self._collect()
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name in seen:
+                return
+            seen.add(name)
+            if name in self.help_texts:
+                lines.append(f"# HELP {name} {self.help_texts[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for (name, labels), hist in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            cumulative += hist[len(BUCKETS)]
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {hist[-1]:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+        for name, labels, value in gauges:
+            header(name, "gauge")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
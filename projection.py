@@ -0,0 +1,94 @@
+"""
+Hochrechnung der Reps ("wo stehe ich in 90 Tagen?") nach den Regeln aus app.py.
+
+Pro Tag gibt es +1 Rep pro Übung. Ein "Ich kann nicht mehr!" zieht `reduction`
+ab, mindestens bleibt 1. Skip- und Cant-Tage zählen nicht zu overall.
+
+Statt Tag für Tag zu simulieren, wird alles als Array über
+(Szenario, Person, Übung, Tag) gerechnet:
+
+    x_t = r0 + t - reduction * (Cants bis t)       ohne Untergrenze
+    y_t = x_t + max(0, max_{s<=t} (1 - x_s))       Untergrenze 1 (Reflexion)
+
+Weil x zwischen zwei Cants nur steigt, greift die Untergrenze genau an den
+Cant-Tagen – das laufende Maximum ergibt deshalb dasselbe wie die Reducer.
+overall ist die kumulierte Summe von y an den Tagen, an denen trainiert wird.
+
+NumPy steht in requirements.txt; fehlt es, rechnet dieselbe Formel in reinem Python.
+"""
+try:
+    import numpy as np
+except ImportError:  # Fallback, siehe README
+    np = None
+
+ENGINE = "numpy" if np is not None else "python"
+
+
+def every(first: int, interval: int, days: int):
+    """Maske über die Tage 1..days: Ereignis an Tag first, first+interval, ..."""
+    mask = [False] * days
+    if interval > 0:
+        for t in range(max(first, 1), days + 1, interval):
+            mask[t - 1] = True
+    return mask
+
+
+def project(reps0, overall0, scenarios: dict, days: int, reduction: int):
+    """
+    reps0, overall0: [[Wert pro Übung] pro Person] am Ende von heute.
+    scenarios: {name: (cant_masks, skip_masks)}, je eine Maske pro Person über
+    die Tage 1..days (Index 0 = morgen); Cant hat Vorrang vor Skip.
+
+    Gibt {name: {"reps": [[[...]]], "overall": [[[...]]]}} zurück, jeweils
+    Person × Übung × Tag.
+    """
+    if np is not None:
+        return _project_numpy(reps0, overall0, scenarios, days, reduction)
+    return {
+        name: _project_python(reps0, overall0, cant, skip, days, reduction)
+        for name, (cant, skip) in scenarios.items()
+    }
+
+
+def _project_numpy(reps0, overall0, scenarios, days, reduction):
+    names = list(scenarios)
+    r0 = np.asarray(reps0, dtype=np.int64)[None, :, :, None]        # (1, P, E, 1)
+    o0 = np.asarray(overall0, dtype=np.int64)[None, :, :, None]
+    cant = np.asarray([scenarios[n][0] for n in names], dtype=bool)  # (S, P, N)
+    skip = np.asarray([scenarios[n][1] for n in names], dtype=bool) & ~cant
+    t = np.arange(1, days + 1, dtype=np.int64)
+
+    x = r0 + t - reduction * np.cumsum(cant, axis=-1)[:, :, None, :]  # (S, P, E, N)
+    y = x + np.maximum.accumulate(np.maximum(0, 1 - x), axis=-1)
+    trained = ~(cant | skip)[:, :, None, :]
+    overall = o0 + np.cumsum(np.where(trained, y, 0), axis=-1)
+
+    return {
+        name: {"reps": y[i].tolist(), "overall": overall[i].tolist()}
+        for i, name in enumerate(names)
+    }
+
+
+def _project_python(reps0, overall0, cant, skip, days, reduction):
+    reps_out, overall_out = [], []
+    for p, (person_reps, person_overall) in enumerate(zip(reps0, overall0)):
+        reps_rows, overall_rows = [], []
+        for r0, total in zip(person_reps, person_overall):
+            cants = 0
+            lift = 0
+            reps_row, overall_row = [], []
+            for t in range(1, days + 1):
+                is_cant = cant[p][t - 1]
+                cants += is_cant
+                x = r0 + t - reduction * cants
+                lift = max(lift, 1 - x)
+                y = x + lift
+                if not is_cant and not skip[p][t - 1]:
+                    total += y
+                reps_row.append(y)
+                overall_row.append(total)
+            reps_rows.append(reps_row)
+            overall_rows.append(overall_row)
+        reps_out.append(reps_rows)
+        overall_out.append(overall_rows)
+    return {"reps": reps_out, "overall": overall_out}
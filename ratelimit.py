@@ -0,0 +1,114 @@
+"""
+Token-Bucket-Rate-Limiter, den alle Gunicorn-Worker teilen.
+
+Die Buckets liegen in einer per mmap eingeblendeten Datei fester Grösse
+(geteilter Speicher über alle Prozesse, kein I/O pro Check): eine Hash-
+Tabelle aus stripes × slots Einträgen à 24 Byte
+
+    Schlüssel-Hash (u64) | Tokens (f64) | letzte Auffüllung (f64, Unix-Zeit)
+
+Ein Schlüssel landet in genau einem Streifen und wird dort in höchstens
+PROBE Slots gesucht; ist nichts frei, wird der am längsten unbenutzte
+Bucket überschrieben (der Client startet dann mit vollem Bucket). Gesperrt
+wird nur dieser Streifen – per fcntl-Byte-Range-Lock zwischen den Prozessen
+und einem threading.Lock zwischen den Threads eines Workers. Es gibt keinen
+globalen Lock; ein Check kostet zwei Syscalls und ein paar struct-Zugriffe.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+HEADER = struct.Struct("<4sII")  # Magic, Streifen, Slots pro Streifen
+SLOT = struct.Struct("<Qdd")
+MAGIC = b"WRL1"
+PROBE = 16
+
+
+def parse_rate(raw: str):
+    """Budget aus "rate,burst" (Tokens pro Sekunde, Bucket-Grösse), z.B. "0.1,5" -> (0.1, 5.0)."""
+    rate, _, burst = raw.partition(",")
+    rate = float(rate)
+    return rate, float(burst) if burst else max(1.0, rate)
+
+
+class RateLimiter:
+    def __init__(self, path, stripes=64, slots=256):
+        self.path = path
+        self.stripes = stripes
+        self.slots = slots
+        self._stripe_bytes = slots * SLOT.size
+        self._size = HEADER.size + stripes * self._stripe_bytes
+        self._pid = None
+        self._init_lock = threading.Lock()
+
+    def _open(self):
+        """Datei öffnen/anlegen und einblenden (einmal pro Prozess, also nach dem Fork)."""
+        with self._init_lock:
+            if self._pid == os.getpid():
+                return
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            header = HEADER.pack(MAGIC, self.stripes, self.slots)
+            fcntl.lockf(fd, fcntl.LOCK_EX)  # ganze Datei, nur beim Öffnen
+            try:
+                if os.fstat(fd).st_size < self._size or os.pread(fd, HEADER.size, 0) != header:
+                    # neu oder anderes Layout: leeren statt kürzen – ein noch
+                    # eingeblendeter Prozess mit altem Layout bekäme sonst SIGBUS
+                    if os.fstat(fd).st_size < self._size:
+                        os.ftruncate(fd, self._size)
+                    os.pwrite(fd, header + bytes(self._size - HEADER.size), 0)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._mm = mmap.mmap(fd, self._size)
+            self._locks = [threading.Lock() for _ in range(self.stripes)]
+            self._pid = os.getpid()
+
+    def check(self, key: str, rate: float, burst: float, now=None) -> float:
+        """
+        Nimmt ein Token aus dem Bucket von key. 0.0 = erlaubt, sonst die
+        Sekunden, bis wieder ein Token da ist. rate <= 0 = unbegrenzt.
+        """
+        if rate <= 0:
+            return 0.0
+        if self._pid != os.getpid():
+            self._open()
+        h = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") | 1
+        stripe = h % self.stripes
+        base = HEADER.size + stripe * self._stripe_bytes
+        first = (h >> 32) % self.slots
+        now = time.time() if now is None else now
+        mm = self._mm
+
+        with self._locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self._stripe_bytes, base)
+            try:
+                target, tokens, stamp = None, burst, now
+                oldest = None
+                for i in range(PROBE):
+                    off = base + ((first + i) % self.slots) * SLOT.size
+                    slot_hash, slot_tokens, slot_stamp = SLOT.unpack_from(mm, off)
+                    if slot_hash == h:
+                        target, tokens, stamp = off, slot_tokens, slot_stamp
+                        break
+                    if slot_hash == 0:
+                        target = off  # frei; danach kann der Schlüssel nicht mehr kommen
+                        break
+                    if oldest is None or slot_stamp < oldest[1]:
+                        oldest = (off, slot_stamp)
+                if target is None:
+                    target = oldest[0]
+
+                tokens = min(burst, tokens + max(0.0, now - stamp) * rate)
+                if tokens >= 1.0:
+                    tokens -= 1.0
+                    retry = 0.0
+                else:
+                    retry = (1.0 - tokens) / rate
+                SLOT.pack_into(mm, target, h, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self._stripe_bytes, base)
+        return retry
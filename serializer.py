@@ -0,0 +1,84 @@
+"""
+JSON-Kodierung für State-Dateien, Journal, SQLite und API-Antworten.
+
+Ist orjson installiert, kodiert es (deutlich schneller, direkt nach UTF-8);
+sonst die Standardbibliothek mit denselben Einstellungen: kompakt, ohne
+Einrückung, Umlaute unverändert. WORKOUT_JSON=json erzwingt die
+Standardbibliothek. Gelesen wird mit derselben Engine – auch ältere, noch
+eingerückte Dateien.
+
+Zusätzlich Kompression für HTTP: gzip immer, Brotli, wenn das Modul
+installiert ist (pip install brotli, optional).
+"""
+import gzip
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # optional, siehe README
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, siehe README
+    brotli = None
+
+if os.getenv("WORKOUT_JSON", "auto") == "json":
+    orjson = None
+
+ENGINE = "orjson" if orjson is not None else "json"
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj, default=None) -> bytes:
+        return orjson.dumps(obj, default=default, option=_OPTIONS)
+
+    def dumps(obj, default=None) -> str:
+        return orjson.dumps(obj, default=default, option=_OPTIONS).decode("utf-8")
+
+    def loads(raw):
+        return orjson.loads(raw)
+
+else:
+    def dumps(obj, default=None) -> str:
+        return json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps_bytes(obj, default=None) -> bytes:
+        return dumps(obj, default).encode("utf-8")
+
+    def loads(raw):
+        return json.loads(raw)
+
+
+def dumps_pretty(obj) -> str:
+    """Lesbare Form (eingerückt, Schlüssel sortiert) für Menschen, z.B. `flask dump-state`."""
+    return json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def negotiate(accept_encoding: str):
+    """Beste Kodierung aus Accept-Encoding (br vor gzip) oder None; q=0 schliesst aus."""
+    offered = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    for encoding in ENCODINGS:
+        if offered.get(encoding, offered.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
@@ -1,12 +1,118 @@
+// Offline-Queue für Aktionen: schlägt ein POST auf /api/action(s) fehl (kein Netz),
+// wird er in IndexedDB gespeichert und später in derselben Reihenfolge nachgereicht.
+// Jede Aktion hat einen Idempotency-Key, doppelte Zustellung zählt also nie doppelt.
+
+const DB_NAME = "workout-queue";
+const DB_STORE = "actions";
+const ACTION_PATH = /\/api\/actions?$/;
+let replaying = null;
+
 self.addEventListener("install", e => {
   self.skipWaiting();
 });
 
 self.addEventListener("activate", e => {
-  // nothing needed
+  e.waitUntil(self.clients.claim());
 });
 
 self.addEventListener("fetch", e => {
-  // Netzwerk first – kein offline caching nötig
-  return fetch(e.request);
+  const req = e.request;
+  if (req.method === "POST" && ACTION_PATH.test(new URL(req.url).pathname)) {
+    e.respondWith(handleAction(req));
+  }
+  // sonst: Netzwerk first – kein offline caching nötig
+});
+
+self.addEventListener("sync", e => {
+  if (e.tag === "workout-actions") e.waitUntil(replayQueue());
 });
+
+self.addEventListener("message", e => {
+  if (e.data && e.data.type === "replay") e.waitUntil(replayQueue());
+});
+
+function openDb() {
+  return new Promise((resolve, reject) => {
+    const open = indexedDB.open(DB_NAME, 1);
+    open.onupgradeneeded = () => open.result.createObjectStore(DB_STORE, { keyPath: "id", autoIncrement: true });
+    open.onsuccess = () => resolve(open.result);
+    open.onerror = () => reject(open.error);
+  });
+}
+
+function tx(mode, fn) {
+  return openDb().then(db => new Promise((resolve, reject) => {
+    const t = db.transaction(DB_STORE, mode);
+    const result = fn(t.objectStore(DB_STORE));
+    t.oncomplete = () => resolve(result && result.result);
+    t.onerror = () => reject(t.error);
+  }));
+}
+
+const enqueue = entry => tx("readwrite", store => store.add(entry));
+const queued = () => tx("readonly", store => store.getAll());
+const dequeue = id => tx("readwrite", store => store.delete(id));
+
+async function handleAction(req) {
+  const entry = {
+    url: req.url,
+    body: await req.clone().text(),
+    headers: {
+      "Content-Type": req.headers.get("Content-Type") || "application/json",
+      "Idempotency-Key": req.headers.get("Idempotency-Key") || "",
+    },
+  };
+
+  // Reihenfolge wahren: solange noch etwas in der Queue steht, hinten anstellen
+  if ((await queued()).length === 0) {
+    try {
+      return await fetch(req);
+    } catch (err) {
+      // offline -> unten in die Queue
+    }
+  }
+
+  await enqueue(entry);
+  if (self.registration.sync) {
+    self.registration.sync.register("workout-actions").catch(() => {});
+  }
+  replayQueue();
+  return new Response(
+    JSON.stringify({ queued: true, message: "Offline – Aktion wird nachgereicht." }),
+    { status: 202, headers: { "Content-Type": "application/json" } }
+  );
+}
+
+function replayQueue() {
+  if (!replaying) {
+    replaying = doReplay().finally(() => { replaying = null; });
+  }
+  return replaying;
+}
+
+async function doReplay() {
+  let sent = 0;
+  for (const entry of await queued()) {
+    let res;
+    try {
+      res = await fetch(entry.url, { method: "POST", headers: entry.headers, body: entry.body });
+    } catch (err) {
+      break;  // immer noch offline, später weiter
+    }
+    if (res.status >= 500) break;
+    // 409 (gleichzeitige Änderung) und 429 (Rate-Limit) sind vorübergehend:
+    // in der Queue lassen und nach Retry-After (sonst 1 s) nochmal versuchen
+    if (res.status === 409 || res.status === 429) {
+      const wait = Number(res.headers.get("Retry-After")) || 1;
+      setTimeout(replayQueue, Math.min(wait, 300) * 1000);
+      break;
+    }
+    // sonst 2xx/4xx: erledigt (4xx würde auch beim nächsten Versuch scheitern)
+    await dequeue(entry.id);
+    sent += 1;
+  }
+  if (sent) {
+    const clients = await self.clients.matchAll();
+    clients.forEach(c => c.postMessage({ type: "replayed", count: sent }));
+  }
+}
@@ -0,0 +1,1036 @@
+"""
+Persistenz für den Workout-State.
+
+Alle Backends implementieren StateStore:
+  - JsonFileStore: state.json (optional mit Append-Journal, siehe unten)
+  - SqliteStore:   SQLite im WAL-Modus mit normalisierten Tabellen
+
+Gemeinsam ist allen ein Per-Worker-Cache des geladenen States und
+Optimistic Concurrency über state["version"] (Compare-and-Swap beim Commit).
+Die fachlichen Regeln (Initialstate, Normalisierung) kommen aus app.py.
+"""
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import serializer
+from daycalendar import CANT_EX_PREFIX, cant_ex_lane, decode_days, encode_days
+from history import column_len, column_values, pack_column
+
+
+class StateConflict(Exception):
+    """Der State wurde zwischen Laden und Commit von jemand anderem geändert."""
+
+    def __init__(self, state):
+        super().__init__("state version conflict")
+        self.state = state
+
+
+def clone_state(obj):
+    """Schnelle Tiefenkopie für JSON-Strukturen (dict/list/Skalare)."""
+    if isinstance(obj, dict):
+        return {k: clone_state(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [clone_state(v) for v in obj]
+    return obj
+
+
+def diff_state(old, new, path=()):
+    """
+    Minimale Ops, die old in new überführen (ohne "version"):
+      ["s", pfad, wert]    setzen
+      ["a", pfad, [werte]] an Liste anhängen
+      ["d", pfad]          Schlüssel entfernen
+    """
+    ops = []
+    for k, v in new.items():
+        if not path and k == "version":
+            continue
+        p = path + (k,)
+        if k not in old:
+            ops.append(["s", list(p), v])
+            continue
+        ov = old[k]
+        if ov == v:
+            continue
+        if isinstance(v, dict) and isinstance(ov, dict):
+            ops.extend(diff_state(ov, v, p))
+        elif (
+            isinstance(v, list)
+            and isinstance(ov, list)
+            and len(v) > len(ov)
+            and v[: len(ov)] == ov
+        ):
+            ops.append(["a", list(p), v[len(ov):]])
+        else:
+            ops.append(["s", list(p), v])
+    for k in old:
+        if k not in new and not (not path and k == "version"):
+            ops.append(["d", list(path + (k,))])
+    return ops
+
+
+def apply_ops(state, ops):
+    """Wendet Ops aus diff_state() auf state an."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        parent = state
+        for k in path[:-1]:
+            parent = parent.setdefault(k, {})
+        last = path[-1]
+        if kind == "s":
+            parent[last] = op[2]
+        elif kind == "a":
+            parent.setdefault(last, []).extend(op[2])
+        elif kind == "d":
+            parent.pop(last, None)
+
+
+class StateStore:
+    """
+    Basisklasse: Cache, load/save und update() mit Compare-and-Swap.
+
+    Subklassen implementieren _cached() (aktueller State, nicht mutieren),
+    _write(state) und commit_lock() (kurzer exklusiver Lock/Transaktion).
+    """
+
+    def __init__(self, initial_state, normalize, commit_retries=5):
+        self._initial_state = initial_state
+        self._normalize = normalize
+        self.commit_retries = commit_retries
+        self.stats = {"hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()  # Zähler werden aus allen Request-Threads erhöht
+        # optional: observe(stage, seconds), z.B. für /metrics
+        self.observe = None
+
+    def _cached(self):
+        raise NotImplementedError
+
+    def _write(self, state):
+        raise NotImplementedError
+
+    @contextmanager
+    def commit_lock(self):
+        raise NotImplementedError
+        yield
+
+    def load(self):
+        """
+        State laden: der gecachte Stand ohne Kopie, also nicht mutieren (der
+        Cache wird nur ersetzt, nie verändert). Änderungen laufen über
+        update(), das auf einer eigenen Kopie arbeitet; wer selbst ändern
+        will, nimmt clone_state(store.load()).
+        """
+        return self._cached()
+
+    def peek(self):
+        """Wie load(); für reine Lesezugriffe wie die Version für ETags."""
+        return self._cached()
+
+    def save(self, state):
+        """State speichern und Version erhöhen."""
+        with self.commit_lock():
+            self._timed_write(state)
+
+    def rewrite(self):
+        """
+        Liest den State (inkl. normalize, also z.B. Schema-Migration) und
+        schreibt ihn komplett neu statt als Diff gegen den Cache. Gibt den
+        geschriebenen State zurück (Version +1).
+        """
+        with self.commit_lock():
+            state = clone_state(self._cached())
+            self._invalidate()
+            self._timed_write(state)
+        return state
+
+    def _invalidate(self):
+        """Cache verwerfen; der nächste _write() kennt keine Basis mehr."""
+        raise NotImplementedError
+
+    def _timed_write(self, state):
+        if self.observe is None:
+            self._write(state)
+            return
+        t0 = time.perf_counter()
+        self._write(state)
+        self.observe("write", time.perf_counter() - t0)
+
+    def update(self, reducer, expected_version=None):
+        """
+        Lädt den State, wendet reducer(state) an und committet nur, wenn
+        state["version"] unverändert ist. Bei Konflikt läuft der Reducer auf
+        dem frischen State erneut, höchstens commit_retries-mal.
+
+        reducer gibt (result, commit) zurück; bei commit=False wird nichts
+        gespeichert. Mit expected_version (If-Match) wird nicht wiederholt,
+        sondern sofort StateConflict geworfen.
+        """
+        for _ in range(self.commit_retries):
+            state = clone_state(self._cached())
+            base_version = state["version"]
+            if expected_version is not None and base_version != expected_version:
+                raise StateConflict(state)
+
+            result, commit = reducer(state)
+            if not commit:
+                return state, result
+
+            with self.commit_lock():
+                if self._cached()["version"] == base_version:
+                    self._timed_write(state)
+                    return state, result
+
+            if expected_version is not None:
+                raise StateConflict(self.load())
+
+        raise StateConflict(self.load())
+
+    def close(self):
+        """Ressourcen freigeben (z.B. wenn der Store aus der LRU fällt)."""
+
+    def paths(self):
+        """Dateien, in denen der State liegt."""
+        return ()
+
+    def size_bytes(self) -> int:
+        """Belegter Platz des States auf der Platte."""
+        return self._file_sizes(*self.paths())
+
+    def mtime_ns(self) -> int:
+        """Zeitpunkt der letzten Änderung auf der Platte (0 = noch nichts geschrieben)."""
+        latest = 0
+        for path in self.paths():
+            try:
+                latest = max(latest, os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                pass
+        return latest
+
+    def snapshot(self, normalize=True):
+        """
+        Konsistenter, committeter Stand direkt von der Platte (z.B. für
+        Backups) oder None. Läuft am Cache vorbei und blockiert keine Writer.
+        normalize=False: Rohdaten wie gespeichert (Journal-Modus: nur der
+        Snapshot), z.B. um die Schema-Version zu prüfen.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _file_sizes(*paths) -> int:
+        total = 0
+        for path in paths:
+            try:
+                total += os.stat(path).st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def cache_stats(self):
+        """Hit/Miss-Zähler des State-Caches dieses Workers."""
+        with self._stats_lock:
+            hits = self.stats["hits"]
+            misses = self.stats["misses"]
+        total = hits + misses
+        return {
+            "pid": os.getpid(),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+
+def _stat_key(st):
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class JsonFileStore(StateStore):
+    """
+    State als JSON-Datei.
+
+    Der Cache ist gültig, solange Inode/mtime/Grösse der Datei unverändert
+    sind; ersetzt ein anderer Gunicorn-Worker die Datei (os.replace -> neuer
+    Inode), wird neu geladen.
+
+    Mit journal=True wird jede Mutation als eine kompakte JSON-Zeile
+    {"v": version, "ops": [...]} an <path>.journal angehängt, statt den ganzen
+    State neu zu schreiben. Die Datei ist dann ein Snapshot; der aktuelle
+    State = Snapshot + alle Journal-Einträge mit v > Snapshot-Version.
+    Überschreitet das Journal compact_bytes, faltet ein Hintergrund-Thread es
+    in einen neuen Snapshot. fsync_ms > 0 gruppiert fsyncs (0 = sofort).
+
+    compact(state) liefert die Form, in der ein Snapshot geschrieben wird
+    (z.B. Historie-Blöcke zusammengefasst); state selbst bleibt unverändert,
+    der Cache behält die ungefaltete, inhaltlich gleiche Form.
+
+    load() und peek() geben den gecachten State ohne Kopie an andere Threads heraus: er
+    wird nie verändert, sondern immer als Ganzes ersetzt (self._cache wird
+    in einem Schritt neu zugewiesen, nie feldweise).
+    """
+
+    def __init__(
+        self,
+        path,
+        initial_state,
+        normalize,
+        journal=False,
+        compact_bytes=256 * 1024,
+        fsync_ms=50,
+        commit_retries=5,
+        compact=None,
+    ):
+        super().__init__(initial_state, normalize, commit_retries)
+        self.path = path
+        self.journal = journal
+        self.compact = compact
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.compact_bytes = compact_bytes
+        self.fsync_ms = fsync_ms
+        self._cache = {"key": None, "state": None, "journal_ino": None, "journal_pos": 0}
+        self._lock_local = threading.local()
+        self._jfd = None
+        self._jino = None
+        self._jlock = threading.Lock()
+        self._dirty = threading.Event()
+        self._flusher = None
+        self._compacting = False
+        self._closed = False
+
+    def paths(self):
+        return (self.path, self.journal_path) if self.journal else (self.path,)
+
+    def _invalidate(self):
+        self._cache = {"key": None, "state": None, "journal_ino": None, "journal_pos": 0}
+
+    def snapshot(self, normalize=True):
+        if self.journal and normalize:
+            # Anhängen läuft unter LOCK_SH, nur Kompaktierung/Snapshot unter LOCK_EX
+            with self._file_lock(fcntl.LOCK_SH):
+                return self._read_journaled()[0]
+        try:
+            with open(self.path, "rb") as f:
+                state = serializer.loads(f.read())
+        except FileNotFoundError:
+            return None
+        return self._normalize(state) if normalize else state
+
+    @contextmanager
+    def _file_lock(self, mode):
+        """
+        Prozessübergreifender Lock (flock) neben der State-Datei.
+        Reentrant pro Thread: hält der Thread den Lock schon, wird nicht erneut gelockt.
+        """
+        if getattr(self._lock_local, "held", False):
+            yield
+            return
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, mode)
+            self._lock_local.held = True
+            yield
+        finally:
+            self._lock_local.held = False
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def commit_lock(self):
+        return self._file_lock(fcntl.LOCK_EX)
+
+    def _write_snapshot(self, state, fsync=False):
+        """Schreibt den kompletten State atomar und gibt den Stat-Key zurück."""
+        if self.compact is not None:
+            state = self.compact(state)
+        tmp_file = self.path + ".tmp"
+        with open(tmp_file, "wb") as f:
+            # kompakt; lesbar per `flask dump-state`
+            f.write(serializer.dumps_bytes(state))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+            # Inode/mtime/Grösse bleiben beim Umbenennen erhalten
+            key = _stat_key(os.fstat(f.fileno()))
+        os.replace(tmp_file, self.path)
+        return key
+
+    def _cached(self):
+        if self.journal:
+            return self._cached_journal()
+
+        try:
+            key = _stat_key(os.stat(self.path))
+        except FileNotFoundError:
+            key = None
+
+        cached = self._cache
+        if key is not None and key == cached["key"]:
+            self._count("hits")
+            return cached["state"]
+
+        self._count("misses")
+
+        if key is None:
+            self.save(self._initial_state())
+            return self._cache["state"]
+
+        with open(self.path, "rb") as f:
+            state = self._normalize(serializer.loads(f.read()))
+
+        self._cache = dict(self._cache, key=key, state=state)
+        return state
+
+    def _write(self, state):
+        if self.journal:
+            self._write_journal(state)
+            return
+        with self.commit_lock():
+            state["version"] = int(state.get("version", 0)) + 1
+            key = self._write_snapshot(state)
+        self._cache = dict(self._cache, key=key, state=clone_state(state))
+
+    # -- Journal --------------------------------------------------------------
+
+    def _replay(self, state, data: bytes) -> int:
+        """Wendet vollständige Journal-Zeilen an; gibt die Anzahl gelesener Bytes zurück."""
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = serializer.loads(line)
+            except ValueError:
+                # abgeschnittene Zeile nach Absturz
+                continue
+            if record.get("v", 0) > state.get("version", 0):
+                apply_ops(state, record.get("ops", []))
+                state["version"] = record["v"]
+        return end
+
+    def _read_journaled(self):
+        """Liest Snapshot + Journal vollständig von Disk (ohne Cache)."""
+        try:
+            with open(self.path, "rb") as f:
+                snap_key = _stat_key(os.fstat(f.fileno()))
+                state = self._normalize(serializer.loads(f.read()))
+        except FileNotFoundError:
+            return None, None, None, 0
+
+        try:
+            with open(self.journal_path, "rb") as f:
+                j_ino = os.fstat(f.fileno()).st_ino
+                pos = self._replay(state, f.read())
+        except FileNotFoundError:
+            j_ino, pos = None, 0
+        return state, snap_key, j_ino, pos
+
+    def _cached_journal(self):
+        try:
+            snap_key = _stat_key(os.stat(self.path))
+        except FileNotFoundError:
+            snap_key = None
+        try:
+            jst = os.stat(self.journal_path)
+            j_ino, j_size = jst.st_ino, jst.st_size
+        except FileNotFoundError:
+            j_ino, j_size = None, 0
+
+        cached = self._cache
+        if (
+            snap_key is not None
+            and snap_key == cached["key"]
+            and j_ino == cached["journal_ino"]
+        ):
+            pos = cached["journal_pos"]
+            if j_size == pos:
+                self._count("hits")
+                return cached["state"]
+            if j_size > pos:
+                # nur den neuen Journal-Tail anderer Worker nachlesen – auf einer
+                # Kopie, Leser des alten States sehen nie einen halben Tag
+                self._count("misses")
+                state = clone_state(cached["state"])
+                with open(self.journal_path, "rb") as f:
+                    f.seek(pos)
+                    pos += self._replay(state, f.read())
+                self._cache = dict(cached, state=state, journal_pos=pos)
+                return state
+
+        self._count("misses")
+
+        if snap_key is None:
+            with self.commit_lock():
+                self._reset_journal(self._initial_state())
+            return self._cache["state"]
+
+        state, snap_key, j_ino, pos = self._read_journaled()
+        self._cache = {"key": snap_key, "state": state, "journal_ino": j_ino, "journal_pos": pos}
+        return state
+
+    def _reset_journal(self, state):
+        """Schreibt state als Snapshot und beginnt ein leeres Journal (LOCK_EX halten)."""
+        state["version"] = int(state.get("version", 0)) + 1
+        snap_key = self._write_snapshot(state)
+        # Stürzt der Prozess hier ab, überspringt das Replay die alten Einträge (v <= Snapshot).
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "wb") as f:
+            j_ino = os.fstat(f.fileno()).st_ino
+        os.replace(tmp, self.journal_path)
+        self._cache = {"key": snap_key, "state": clone_state(state), "journal_ino": j_ino, "journal_pos": 0}
+
+    def _journal_fd(self):
+        """Offener O_APPEND-Deskriptor auf das aktuelle Journal (Lock halten)."""
+        try:
+            ino = os.stat(self.journal_path).st_ino
+        except FileNotFoundError:
+            ino = None
+        if self._jfd is None or ino is None or ino != self._jino:
+            if self._jfd is not None:
+                os.close(self._jfd)
+            self._jfd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._jino = os.fstat(self._jfd).st_ino
+        return self._jfd
+
+    def _flush_loop(self):
+        """Gruppiertes fsync: alle Writes innerhalb von fsync_ms teilen sich einen fsync."""
+        while not self._closed:
+            self._dirty.wait()
+            time.sleep(self.fsync_ms / 1000.0)
+            self._dirty.clear()
+            with self._jlock:
+                if self._jfd is not None:
+                    try:
+                        os.fsync(self._jfd)
+                    except OSError:
+                        pass
+
+    def close(self):
+        self._closed = True
+        with self._jlock:
+            if self._jfd is not None:
+                os.fsync(self._jfd)
+                os.close(self._jfd)
+                self._jfd = None
+        self._dirty.set()
+
+    def _schedule_fsync(self, fd):
+        if self.fsync_ms <= 0:
+            os.fsync(fd)
+            return
+        # Thread erst nach dem Fork des Gunicorn-Workers starten
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+        self._dirty.set()
+
+    def _compact(self):
+        try:
+            with self._file_lock(fcntl.LOCK_EX):
+                try:
+                    if os.stat(self.journal_path).st_size < self.compact_bytes:
+                        return
+                except FileNotFoundError:
+                    return
+                state, _, _, _ = self._read_journaled()
+                if state is None:
+                    return
+                self._write_snapshot(state, fsync=True)
+                tmp = self.journal_path + ".tmp"
+                open(tmp, "wb").close()
+                os.replace(tmp, self.journal_path)
+        finally:
+            self._compacting = False
+
+    def _write_journal(self, state):
+        cached = self._cache
+        base = cached["state"]
+        if base is None or base.get("version") != state.get("version"):
+            # Basis unbekannt (z.B. fremder Stand) -> vollständiger Snapshot
+            with self.commit_lock():
+                self._reset_journal(state)
+            return
+
+        ops = diff_state(base, state)
+        if not ops:
+            return
+
+        state["version"] = int(state.get("version", 0)) + 1
+        record = {"v": state["version"], "ops": ops}
+        line = serializer.dumps_bytes(record) + b"\n"
+
+        with self._file_lock(fcntl.LOCK_SH):
+            with self._jlock:
+                fd = self._journal_fd()
+                os.write(fd, line)
+                end = os.lseek(fd, 0, os.SEEK_CUR)
+                self._schedule_fsync(fd)
+            ino = self._jino
+
+        if ino == cached["journal_ino"] and end - len(line) == cached["journal_pos"]:
+            # eigener Eintrag schliesst direkt an den Cache an: auf einer Kopie
+            # anwenden und tauschen, base kann gerade gelesen werden (peek())
+            new = clone_state(base)
+            apply_ops(new, ops)
+            new["version"] = record["v"]
+            self._cache = dict(cached, state=new, journal_pos=end)
+
+        if end >= self.compact_bytes and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._compact, daemon=True).start()
+
+
+class SqliteStore(StateStore):
+    """
+    State in SQLite (WAL) mit normalisierten Tabellen:
+
+      meta(key, value)                         day, start_date, version, sonstige Felder (JSON)
+      reps/done/overall/credited(person, exercise, value)
+      status_events(kind, person, exercise, day)
+          eine Zeile pro gesetztem Tag einer Kalender-Lane (daycalendar.py):
+          kind: skip/injured/cant/cheater/sport (exercise = '') und cant_ex
+      history_days(day, person, exercise, value)
+          archivierte Tage (history.py), eine Zeile pro Tag × Spalte: Reps
+          pro Übung, dazu exercise = 'done' (Bitmaske) und 'status' (Code);
+          first_day/days/overall_base stehen in meta.history
+      idempotency(key, t, result, fingerprint) Idempotency-Keys, Index auf t
+
+    Eine Aktion schreibt nur die Zeilen, die sie ändert (aus diff_state()),
+    innerhalb einer Transaktion – ein Tageswechsel also nur die Zeilen des
+    neuen Tages. Der Cache wird über PRAGMA data_version invalidiert, sobald
+    eine andere Verbindung committet hat. Ältere Dateien mit Historie und
+    Idempotency-Keys als JSON in meta werden beim ersten Schreiben einmal
+    komplett umgeschrieben.
+    """
+
+    TABLES = ("reps", "done", "overall", "credited")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key   TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS reps (
+            person TEXT NOT NULL, exercise TEXT NOT NULL, value INTEGER NOT NULL,
+            PRIMARY KEY (person, exercise)
+        );
+        CREATE TABLE IF NOT EXISTS done (
+            person TEXT NOT NULL, exercise TEXT NOT NULL, value INTEGER NOT NULL,
+            PRIMARY KEY (person, exercise)
+        );
+        CREATE TABLE IF NOT EXISTS overall (
+            person TEXT NOT NULL, exercise TEXT NOT NULL, value INTEGER NOT NULL,
+            PRIMARY KEY (person, exercise)
+        );
+        CREATE TABLE IF NOT EXISTS credited (
+            person TEXT NOT NULL, exercise TEXT NOT NULL, value INTEGER NOT NULL,
+            PRIMARY KEY (person, exercise)
+        );
+        CREATE TABLE IF NOT EXISTS status_events (
+            kind     TEXT NOT NULL,
+            person   TEXT NOT NULL,
+            exercise TEXT NOT NULL DEFAULT '',
+            day      INTEGER NOT NULL,
+            UNIQUE (kind, person, exercise, day)
+        );
+        CREATE TABLE IF NOT EXISTS history_days (
+            day      INTEGER NOT NULL,
+            person   TEXT NOT NULL,
+            exercise TEXT NOT NULL,
+            value    INTEGER NOT NULL,
+            PRIMARY KEY (day, person, exercise)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS idempotency (
+            key         TEXT PRIMARY KEY,
+            t           INTEGER NOT NULL,
+            result      TEXT NOT NULL,
+            fingerprint TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS idempotency_t ON idempotency (t);
+    """
+
+    # Schlüssel in meta, die früher als ganzer JSON-Block gespeichert wurden
+    LEGACY_META = ("idempotency",)
+
+    def __init__(self, path, initial_state, normalize, commit_retries=5):
+        super().__init__(initial_state, normalize, commit_retries)
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._rlock = threading.RLock()
+        self._in_tx = False
+        self._cache = {"data_version": None, "state": None, "legacy": False}
+
+    def _db(self):
+        # eine Verbindung pro Prozess (nicht über den Gunicorn-Fork hinweg teilen)
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(self.SCHEMA)
+            self._add_fingerprint_column(conn)
+            self._conn = conn
+            self._pid = os.getpid()
+            self._cache = {"data_version": None, "state": None, "legacy": False}
+        return self._conn
+
+    @staticmethod
+    def _add_fingerprint_column(conn):
+        """Ältere Dateien: idempotency ohne fingerprint-Spalte ergänzen."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(idempotency)")}
+        if "fingerprint" in columns:
+            return
+        try:
+            conn.execute("ALTER TABLE idempotency ADD COLUMN fingerprint TEXT NOT NULL DEFAULT ''")
+        except sqlite3.OperationalError as exc:
+            if "duplicate column" not in str(exc):  # anderer Worker war schneller
+                raise
+
+    def paths(self):
+        return (self.path, self.path + "-wal")
+
+    def _invalidate(self):
+        self._cache = {"data_version": None, "state": None, "legacy": False}
+
+    def snapshot(self, normalize=True):
+        if not os.path.exists(self.path):
+            return None
+        # eigene Verbindung: eine Lese-Transaktion sieht im WAL einen festen Stand
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("BEGIN")
+            if not self._has_state(conn):
+                return None
+            state = self._read_all(conn)
+            return self._normalize(state) if normalize else state
+        except sqlite3.OperationalError:
+            return None  # Schema noch nicht angelegt
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._rlock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    @contextmanager
+    def commit_lock(self):
+        """BEGIN IMMEDIATE-Transaktion (reentrant)."""
+        with self._rlock:
+            if self._in_tx:
+                yield
+                return
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            self._in_tx = True
+            try:
+                yield
+            except BaseException:
+                db.execute("ROLLBACK")
+                self._cache["data_version"] = None
+                raise
+            else:
+                db.execute("COMMIT")
+            finally:
+                self._in_tx = False
+
+    def _cached(self):
+        with self._rlock:
+            db = self._db()
+            data_version = db.execute("PRAGMA data_version").fetchone()[0]
+            if self._cache["state"] is not None and data_version == self._cache["data_version"]:
+                self._count("hits")
+                return self._cache["state"]
+
+            self._count("misses")
+            raw = legacy = None
+            with self._read_tx(db):
+                if self._has_state(db):
+                    raw = self._read_all(db)
+                    legacy = self._is_legacy(raw)
+            if raw is None:
+                with self.commit_lock():
+                    # zwei Worker können gleichzeitig anlegen: unter dem Lock erneut prüfen
+                    if self._has_state(db):
+                        raw = self._read_all(db)
+                        legacy = self._is_legacy(raw)
+                    else:
+                        state = self._initial_state()
+                        state["version"] = int(state.get("version", 0)) + 1
+                        self._rewrite_all(db, state)
+            if raw is not None:
+                state = self._normalize(raw)
+            # data_version von vor dem Lesen: ein Commit dazwischen führt höchstens
+            # zu einem weiteren Miss, nie zu einem veralteten Cache
+            self._cache["legacy"] = bool(legacy)
+            self._cache["data_version"] = data_version
+            self._cache["state"] = state
+            return state
+
+    @contextmanager
+    def _read_tx(self, db):
+        """Lese-Transaktion: alle SELECTs sehen denselben WAL-Stand (in commit_lock() schon gegeben)."""
+        if self._in_tx:
+            yield
+            return
+        db.execute("BEGIN")
+        try:
+            yield
+        finally:
+            db.execute("COMMIT")
+
+    @staticmethod
+    def _has_state(db):
+        return db.execute("SELECT 1 FROM meta WHERE key = 'version'").fetchone() is not None
+
+    def _read_all(self, db):
+        state = {}
+        for key, value in db.execute("SELECT key, value FROM meta"):
+            state[key] = serializer.loads(value)
+        for table in self.TABLES:
+            per_person = state.setdefault(table, {})
+            for person, ex, value in db.execute(f"SELECT person, exercise, value FROM {table}"):
+                per_person.setdefault(person, {})[ex] = bool(value) if table == "done" else value
+        lanes = {}
+        for kind, person, ex, day in db.execute(
+            "SELECT kind, person, exercise, day FROM status_events"
+        ):
+            lanes.setdefault(person, {}).setdefault(self._lane_name(kind, ex), []).append(day)
+        state["calendar"] = {
+            person: {lane: encode_days(days) for lane, days in per_lane.items()}
+            for person, per_lane in lanes.items()
+        }
+        history = state.get("history")
+        if isinstance(history, dict) and "columns" not in history and history.get("first_day") is not None:
+            history["columns"] = self._read_history(db, history["first_day"], int(history.get("days", 0)))
+        keys = db.execute("SELECT key, t, result, fingerprint FROM idempotency ORDER BY t, rowid").fetchall()
+        if keys:
+            table = state.setdefault("idempotency", {})
+            for key, t, result, fingerprint in keys:
+                table[key] = {"t": t, "result": serializer.loads(result)}
+                if fingerprint:
+                    table[key]["f"] = fingerprint
+        return state
+
+    @staticmethod
+    def _read_history(db, first_day, days):
+        """Spalten "person:feld" aus history_days, je ein Block (fehlende Tage = 0)."""
+        values = {}
+        for day, person, field, value in db.execute(
+            "SELECT day, person, exercise, value FROM history_days ORDER BY day"
+        ):
+            col = values.setdefault(f"{person}:{field}", [0] * days)
+            idx = day - first_day
+            if 0 <= idx < days:
+                col[idx] = value
+        return {name: pack_column(name, col) for name, col in values.items()}
+
+    def _is_legacy(self, raw):
+        """Historie-Spalten oder Idempotency-Keys noch als JSON in meta?"""
+        if "columns" in (raw.get("history") or {}):
+            return True
+        db = self._db()
+        marks = ",".join("?" * len(self.LEGACY_META))
+        return db.execute(f"SELECT 1 FROM meta WHERE key IN ({marks})", self.LEGACY_META).fetchone() is not None
+
+    def _write(self, state):
+        with self.commit_lock():
+            db = self._db()
+            base = self._cache["state"]
+            if base is None or base.get("version") != state.get("version") or self._cache["legacy"]:
+                state["version"] = int(state.get("version", 0)) + 1
+                self._rewrite_all(db, state)
+                self._cache["legacy"] = False
+            else:
+                ops = diff_state(base, state)
+                state["version"] = int(state.get("version", 0)) + 1
+                for op in ops:
+                    self._apply_op(db, base, state, op)
+                self._set_meta(db, "version", state["version"])
+        # eigene Commits ändern data_version dieser Verbindung nicht
+        self._cache["state"] = clone_state(state)
+        if self._cache["data_version"] is None:
+            self._cache["data_version"] = self._db().execute("PRAGMA data_version").fetchone()[0]
+
+    @staticmethod
+    def _set_meta(db, key, value):
+        db.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, serializer.dumps(value)),
+        )
+
+    def _write_values(self, db, table, state, person=None, exercise=None):
+        """Schreibt reps/done/overall/credited für eine Person/Übung (oder alles) neu."""
+        where, args = "", []
+        if person is not None:
+            where, args = " WHERE person = ?", [person]
+            if exercise is not None:
+                where += " AND exercise = ?"
+                args.append(exercise)
+        db.execute(f"DELETE FROM {table}{where}", args)
+        rows = []
+        for p, per_ex in (state.get(table) or {}).items():
+            if person is not None and p != person:
+                continue
+            for ex, value in (per_ex or {}).items():
+                if exercise is not None and ex != exercise:
+                    continue
+                rows.append((p, ex, int(value)))
+        db.executemany(f"INSERT INTO {table} (person, exercise, value) VALUES (?, ?, ?)", rows)
+
+    @staticmethod
+    def _lane_key(lane):
+        """Kalender-Lane -> (kind, exercise) in status_events."""
+        if lane.startswith(CANT_EX_PREFIX):
+            return "cant_ex", lane[len(CANT_EX_PREFIX):]
+        return lane, ""
+
+    @staticmethod
+    def _lane_name(kind, exercise):
+        return cant_ex_lane(exercise) if kind == "cant_ex" else kind
+
+    def _write_lane(self, db, person, lane, old_raw, new_raw):
+        """Schreibt nur die Tage, die in dieser Lane dazugekommen/weggefallen sind."""
+        kind, exercise = self._lane_key(lane)
+        old_days = set(decode_days(old_raw or ""))
+        new_days = set(decode_days(new_raw or ""))
+        db.executemany(
+            "DELETE FROM status_events WHERE kind = ? AND person = ? AND exercise = ? AND day = ?",
+            [(kind, person, exercise, d) for d in old_days - new_days],
+        )
+        db.executemany(
+            "INSERT OR IGNORE INTO status_events (kind, person, exercise, day) VALUES (?, ?, ?, ?)",
+            [(kind, person, exercise, d) for d in sorted(new_days - old_days)],
+        )
+
+    def _write_calendar(self, db, base, state, person=None):
+        """Gleicht die Kalender-Lanes einer Person (oder aller) mit status_events ab."""
+        old_cal = (base or {}).get("calendar") or {}
+        new_cal = state.get("calendar") or {}
+        people = [person] if person is not None else set(old_cal) | set(new_cal)
+        for p in people:
+            old_lanes = old_cal.get(p) or {}
+            new_lanes = new_cal.get(p) or {}
+            for lane in set(old_lanes) | set(new_lanes):
+                if old_lanes.get(lane) != new_lanes.get(lane):
+                    self._write_lane(db, p, lane, old_lanes.get(lane), new_lanes.get(lane))
+
+    def _apply_op(self, db, base, state, op):
+        path = op[1]
+        top = path[0]
+        if top in self.TABLES:
+            self._write_values(db, top, state, *path[1:3])
+        elif top == "calendar":
+            if len(path) >= 3:
+                person, lane = path[1], path[2]
+                old_raw = ((base.get("calendar") or {}).get(person) or {}).get(lane)
+                new_raw = ((state.get("calendar") or {}).get(person) or {}).get(lane)
+                self._write_lane(db, person, lane, old_raw, new_raw)
+            else:
+                self._write_calendar(db, base, state, *path[1:2])
+        elif top == "history":
+            self._apply_history_op(db, base, state, op)
+        elif top == "idempotency":
+            self._apply_idempotency_op(db, state, path)
+        elif top in state:
+            self._set_meta(db, top, state[top])
+        else:
+            db.execute("DELETE FROM meta WHERE key = ?", (top,))
+
+    def _set_history_meta(self, db, history):
+        if history is None:
+            db.execute("DELETE FROM meta WHERE key = 'history'")
+        else:
+            self._set_meta(db, "history", {k: v for k, v in history.items() if k != "columns"})
+
+    def _write_history_column(self, db, first_day, name, values, offset=0):
+        """Tage ab offset einer Spalte als Zeilen (ersetzt vorhandene)."""
+        person, _, field = name.rpartition(":")
+        db.executemany(
+            "INSERT OR REPLACE INTO history_days (day, person, exercise, value) VALUES (?, ?, ?, ?)",
+            [(first_day + offset + i, person, field, int(v)) for i, v in enumerate(values)],
+        )
+
+    def _write_history(self, db, history):
+        """Ganze Historie neu (erster Tag, Import, Umstellung)."""
+        db.execute("DELETE FROM history_days")
+        self._set_history_meta(db, history)
+        if not history or history.get("first_day") is None:
+            return
+        for name, raw in (history.get("columns") or {}).items():
+            self._write_history_column(db, history["first_day"], name, column_values(name, raw))
+
+    def _apply_history_op(self, db, base, state, op):
+        kind, path = op[0], op[1]
+        history = state.get("history")
+        if len(path) == 3 and path[1] == "columns" and (base.get("history") or {}).get("first_day") == history.get("first_day"):
+            name = path[2]
+            person, _, field = name.rpartition(":")
+            if kind == "a":
+                # nur die angehängten Blöcke: Tage ab der bisherigen Länge
+                old_raw = ((base.get("history") or {}).get("columns") or {}).get(name)
+                self._write_history_column(db, history["first_day"], name, column_values(name, op[2]),
+                                           column_len(name, old_raw))
+                return
+            db.execute("DELETE FROM history_days WHERE person = ? AND exercise = ?", (person, field))
+            if kind == "s":
+                self._write_history_column(db, history["first_day"], name, column_values(name, op[2]))
+            return
+        if len(path) >= 2 and path[1] != "columns":
+            self._set_history_meta(db, history)
+            return
+        self._write_history(db, history)
+
+    def _apply_idempotency_op(self, db, state, path):
+        table = state.get("idempotency") or {}
+        if len(path) == 1:
+            self._write_idempotency(db, table)
+            return
+        key = path[1]
+        if key in table:
+            entry = table[key]
+            db.execute(
+                "INSERT OR REPLACE INTO idempotency (key, t, result, fingerprint) VALUES (?, ?, ?, ?)",
+                self._idempotency_row(key, entry),
+            )
+        else:
+            db.execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+    @staticmethod
+    def _idempotency_row(key, entry):
+        return (key, int(entry["t"]), serializer.dumps(entry["result"]), entry.get("f", ""))
+
+    def _write_idempotency(self, db, table):
+        db.execute("DELETE FROM idempotency")
+        db.executemany(
+            "INSERT INTO idempotency (key, t, result, fingerprint) VALUES (?, ?, ?, ?)",
+            [self._idempotency_row(key, entry) for key, entry in table.items()],
+        )
+
+    def _rewrite_all(self, db, state):
+        db.execute("DELETE FROM meta")
+        db.execute("DELETE FROM status_events")
+        for table in self.TABLES:
+            self._write_values(db, table, state)
+        self._write_history(db, state.get("history"))
+        self._write_idempotency(db, state.get("idempotency") or {})
+        for key, value in state.items():
+            if key in self.TABLES or key in ("history", "idempotency"):
+                continue
+            if key == "calendar":
+                self._write_calendar(db, None, state)
+            else:
+                self._set_meta(db, key, value)
+        self._cache["state"] = clone_state(state)
+
+    def import_state(self, state):
+        """Einmaliger Import (z.B. aus state.json): ersetzt den kompletten Inhalt."""
+        with self.commit_lock():
+            self._rewrite_all(self._db(), state)
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# app.py & Co. liegen im Repo-Wurzelverzeichnis (kein Paket)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def _workdir(tmp_path, monkeypatch):
+    """Jeder Test in einem eigenen Verzeichnis: relative Pfade (state.json, groups/, ...) landen dort."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
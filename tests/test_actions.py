@@ -0,0 +1,69 @@
+import app
+
+
+def _batch(*actions, role="mann"):
+    return {"role": role, "actions": list(actions)}
+
+
+def _exercise(name):
+    return {"action": "exercise", "exercise": name}
+
+
+def test_failing_item_commits_nothing():
+    client = app.app.test_client()
+    before = app.load_state()
+
+    invalid = client.post("/api/actions", json=_batch(_exercise("pushups"), _exercise("burpees")))
+    assert invalid.status_code == 400
+    assert [r["status"] for r in invalid.get_json()["results"]] == [200, 400]
+
+    forbidden = client.post("/api/actions", json=_batch(
+        _exercise("pushups"), {"action": "cant_exercise", "exercise": "squats", "password": "falsch"},
+    ))
+    assert forbidden.status_code == 403
+    body = forbidden.get_json()
+    assert [r["status"] for r in body["results"]] == [200, 403]
+    assert body["version"] == before["version"]  # Antwort zeigt den gespeicherten Stand
+
+    after = app.load_state()
+    assert after["version"] == before["version"]
+    assert after["done"]["male"]["pushups"] is False
+    assert after["overall"]["male"]["pushups"] == before["overall"]["male"]["pushups"]
+
+
+def test_all_items_commit_in_one_version():
+    client = app.app.test_client()
+    version = app.load_state()["version"]
+    resp = client.post("/api/actions", json=_batch(*(_exercise(ex) for ex in app.EXTERNAL_TO_INTERNAL_EXERCISE)))
+    assert resp.status_code == 200
+    assert resp.get_json()["version"] == version + 1
+    assert all(app.load_state()["done"]["male"].values())
+
+
+def test_batch_size_limit():
+    client = app.app.test_client()
+    too_many = [{"action": "exercise_undo", "exercise": "squats"}] * (app.MAX_BATCH_ACTIONS + 1)
+    assert client.post("/api/actions", json=_batch(*too_many)).status_code == 400
+    assert client.post("/api/actions", json=_batch()).status_code == 400
+    assert client.post("/api/actions", json={"actions": "squats"}).status_code == 400
+    assert client.post("/api/actions", json=_batch(*too_many[:app.MAX_BATCH_ACTIONS])).status_code == 200
+
+
+def test_batch_replay_is_idempotent():
+    client = app.app.test_client()
+    batch = _batch(_exercise("squats"), _exercise("crunches"))
+    headers = {"Idempotency-Key": "batch-1"}
+    first = client.post("/api/actions", json=batch, headers=headers)
+    assert first.status_code == 200
+    state = app.load_state()
+
+    replay = client.post("/api/actions", json=batch, headers=headers)
+    assert replay.status_code == 200
+    assert replay.get_json()["results"] == first.get_json()["results"]
+    again = app.load_state()
+    assert again["version"] == state["version"]
+    assert again["overall"]["male"] == state["overall"]["male"]
+
+    other = client.post("/api/actions", json=_batch(_exercise("pushups")), headers=headers)
+    assert other.status_code == 422
+    assert app.load_state()["done"]["male"]["pushups"] is False
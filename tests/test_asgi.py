@@ -0,0 +1,183 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+
+import pytest
+
+import app
+import asgi
+
+
+@pytest.fixture(autouse=True)
+def actors(monkeypatch):
+    """Frischer Actor pro Test (der Modul-Actor hängt am cwd beim Import)."""
+    monkeypatch.setattr(asgi, "ACTOR", asgi.StateActor(app._make_store()))
+    monkeypatch.setattr(asgi, "GROUP_ACTORS", {})
+
+
+def _run(main):
+    async def wrapper():
+        try:
+            return await main()
+        finally:
+            for actor in (asgi.ACTOR, *asgi.GROUP_ACTORS.values()):
+                await actor.stop()
+    return asyncio.run(wrapper())
+
+
+async def _call(method, path, body=None, headers=(), query=b""):
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+    }
+    pending = [{"type": "http.request", "body": json.dumps(body).encode() if body is not None else b""}]
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        await asyncio.sleep(3600)
+
+    out = {"body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            out["status"] = message["status"]
+            out["headers"] = dict(message["headers"])
+        else:
+            out["body"] += message.get("body", b"")
+
+    await asgi.app(scope, receive, send)
+    return out
+
+
+def _exercise(role, exercise):
+    return {"role": role, "action": "exercise", "exercise": exercise}
+
+
+def test_concurrent_actions_are_coalesced_into_few_writes(monkeypatch):
+    saves = []
+    save = asgi.ACTOR.store.save
+
+    def slow_save(state):
+        saves.append(state["version"])
+        time.sleep(0.05)  # Zeit, in der sich die übrigen Befehle anstauen
+        return save(state)
+
+    bodies = [_exercise(role, ex) for role in ("mann", "frau") for ex in app.EXTERNAL_TO_INTERNAL_EXERCISE]
+
+    async def main():
+        await asgi.ACTOR.start()
+        monkeypatch.setattr(asgi.ACTOR.store, "save", slow_save)
+        base = asgi.ACTOR.state["version"]
+        results = await asyncio.gather(*(_call("POST", "/api/action", body) for body in bodies))
+        return base, results
+
+    base, results = _run(main)
+    assert [r["status"] for r in results] == [200] * len(bodies)
+    assert 1 <= len(saves) < len(bodies)
+    state = app.load_state()
+    assert state["version"] == base + len(saves)
+    assert all(state["done"][p][ex] for p in ("male", "female") for ex in app.EXERCISES)
+
+
+def test_failing_persist_rejects_the_batch_and_keeps_the_snapshot(monkeypatch):
+    disk_full = [True]
+    save = asgi.ACTOR.store.save
+
+    def flaky_save(state):
+        if disk_full[0]:
+            raise OSError("Platte voll")
+        return save(state)
+
+    async def main():
+        await asgi.ACTOR.start()
+        before = asgi.ACTOR.state
+        monkeypatch.setattr(asgi.ACTOR.store, "save", flaky_save)
+        failed = await _call("POST", "/api/action", _exercise("mann", "squats"))
+        assert asgi.ACTOR.state is before
+        disk_full[0] = False
+        retried = await _call("POST", "/api/action", _exercise("mann", "squats"))
+        return failed, retried
+
+    failed, retried = _run(main)
+    assert failed["status"] == 503
+    assert retried["status"] == 200
+    assert app.load_state()["done"]["male"]["squats"] is True
+
+
+def test_if_match_conflicts_answer_412():
+    async def main():
+        state = await _call("GET", "/api/state", query=b"role=mann")
+        version = str(json.loads(state["body"])["version"])
+        stale = await _call("POST", "/api/action", _exercise("mann", "squats"), [("If-Match", '"0"')])
+        both = await asyncio.gather(
+            _call("POST", "/api/action", _exercise("mann", "squats"), [("If-Match", version)]),
+            _call("POST", "/api/action", _exercise("frau", "squats"), [("If-Match", version)]),
+        )
+        return stale, both
+
+    stale, both = _run(main)
+    assert stale["status"] == 412
+    assert "version" in json.loads(stale["body"])
+    # Der zweite Befehl auf denselben Stand verliert, auch im selben Batch
+    assert sorted(r["status"] for r in both) == [200, 412]
+    done = app.load_state()["done"]
+    assert done["male"]["squats"] != done["female"]["squats"]
+
+
+def test_group_routes_use_their_own_state(monkeypatch):
+    monkeypatch.setattr(app, "GROUPS_AUTOCREATE", True)
+
+    async def main():
+        action = await _call("POST", "/g/team/api/action", _exercise("mann", "squats"))
+        redirect = await _call("GET", "/g/team")
+        page = await _call("GET", "/g/team/")
+        return action, redirect, page
+
+    action, redirect, page = _run(main)
+    assert action["status"] == 200
+    assert redirect["status"] == 308
+    assert redirect["headers"][b"location"] == b"/g/team/"
+    assert page["status"] == 200
+    assert app.load_state("team")["done"]["male"]["squats"] is True
+    assert app.load_state()["done"]["male"]["squats"] is False
+
+
+def test_unknown_or_invalid_groups_are_404():
+    async def main():
+        return [await _call("GET", path) for path in ("/g/team/api/state", "/g/Nicht Gültig/", "/g/team/static/app.js")]
+
+    assert [r["status"] for r in _run(main)] == [404, 404, 404]
+    assert not os.path.exists(app.group_dir("team"))
+
+
+def test_head_sends_headers_without_body():
+    async def main():
+        get = await _call("GET", "/api/state", query=b"role=mann")
+        head = await _call("HEAD", "/api/state", query=b"role=mann")
+        stream = await asyncio.wait_for(_call("HEAD", "/api/stream"), 5)
+        return get, head, stream
+
+    get, head, stream = _run(main)
+    assert head["status"] == 200
+    assert head["body"] == b""
+    assert head["headers"][b"content-length"] == str(len(get["body"])).encode()
+    assert stream["status"] == 200
+    assert stream["body"] == b""
+
+
+def test_state_is_compressed_like_flask():
+    async def main():
+        packed = await _call("GET", "/api/state", headers=[("Accept-Encoding", "gzip")], query=b"role=mann")
+        etag = packed["headers"][b"etag"].decode()
+        unchanged = await _call("GET", "/api/state", headers=[("Accept-Encoding", "gzip"), ("If-None-Match", etag)], query=b"role=mann")
+        return packed, unchanged
+
+    packed, unchanged = _run(main)
+    assert packed["headers"][b"content-encoding"] == b"gzip"
+    assert packed["headers"][b"vary"] == b"Accept-Encoding"
+    assert json.loads(gzip.decompress(packed["body"]))["version"] >= 1
+    assert unchanged["status"] == 304
+    assert b"content-encoding" not in unchanged["headers"]
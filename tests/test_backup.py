@@ -0,0 +1,120 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+import app
+from backup import BackupManager, state_digest
+
+
+def _toggle(state, action, key):
+    person = app.member_ids(state)[0]
+    reducer = app._idempotent(lambda st: (list(action(st, person, "squats")[1:]), True), key)
+    return reducer(state)
+
+
+def test_idempotency_keys_do_not_defeat_dedup(tmp_path):
+    state = app._initial_state()
+    manager = BackupManager(str(tmp_path / "backups"), lambda: [])
+    assert manager.add("_default", state, now=1)
+
+    _toggle(state, app._apply_exercise, "k1")
+    assert manager.add("_default", state, now=2)
+    _toggle(state, app._apply_exercise_undo, "k2")
+    assert set(state["idempotency"]) == {"k1", "k2"}
+
+    assert state_digest(state)[0] == manager.catalog("_default")[0]["h"]
+    assert manager.add("_default", state, now=3)
+    assert len({e["h"] for e in manager.catalog("_default")}) == 2
+    assert "idempotency" not in manager.load("_default", manager.catalog("_default")[-1])
+
+
+def _objects(manager, scope="_default"):
+    return sorted(name for _, _, files in os.walk(os.path.join(manager.directory, scope, "objects")) for name in files)
+
+
+def _exercise(state, ex):
+    app._apply_exercise(state, "male", ex)
+    return state
+
+
+def test_unchanged_state_adds_no_backup():
+    app.update_state(lambda st: (_exercise(st, "squats"), True))
+    manager = BackupManager("backups", app._instance_sources)
+    assert manager.run_once() == 1
+    assert manager.run_once() == 0  # mtime unverändert
+    assert manager.run_once(force=True) == 0  # Inhalt unverändert
+    app.update_state(lambda st: (None, True))  # nur die Version ändert sich
+    assert manager.run_once() == 0
+    assert len(manager.catalog("_default")) == 1
+    assert len(_objects(manager)) == 1
+    assert manager.last_success() is not None
+
+
+def test_retention_prunes_catalog_and_objects(tmp_path):
+    manager = BackupManager(str(tmp_path / "backups"), lambda: [], keep=(2, 2, 0, 0))
+    state = app._initial_state()
+    hour = 3600
+    # je zwei Backups in drei Stunden
+    for t, ex in [(0, "squats"), (60, "situps"), (hour, "pushups"), (hour + 60, None), (2 * hour, None), (2 * hour + 60, None)]:
+        if ex:
+            _exercise(state, ex)
+        else:
+            state["day"] += 1
+        assert manager.add("_default", state, now=100 * hour + t)
+
+    kept = [e["t"] - 100 * hour for e in manager.catalog("_default")]
+    # die zwei neuesten, dazu das neueste der Stunde davor
+    assert kept == [hour + 60, 2 * hour, 2 * hour + 60]
+    assert _objects(manager) == sorted(f"{e['h']}.json.gz" for e in manager.catalog("_default"))
+
+
+def test_failed_rounds_are_counted_and_reported():
+    calls, failures = [], []
+
+    def sources():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("Platte weg")
+        return []
+
+    manager = BackupManager("backups", sources, interval=0.01)
+    manager.on_failure = failures.append
+    manager.ensure_started()
+    deadline = time.time() + 5
+    while len(calls) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    manager.interval = 3600  # Thread schlafen legen
+
+    assert [type(exc) for exc in failures] == [OSError]
+    assert manager.failures == 0  # spätere Runden waren erfolgreich
+    assert manager.last_success() is not None
+
+
+@pytest.mark.parametrize("mode", ["file", "sqlite"])
+def test_restore_backup_at_a_point_in_time(mode, monkeypatch):
+    monkeypatch.setattr(app, "STORAGE_MODE", mode)
+    monkeypatch.setattr(app, "STORE", app._make_store())
+    monkeypatch.setattr(app, "BACKUPS", BackupManager("backups", app._instance_sources))
+
+    def done():
+        return {ex for ex, flag in app.load_state()["done"]["male"].items() if flag}
+
+    app.update_state(lambda st: (_exercise(st, "squats"), True))
+    app.BACKUPS.add("_default", app.STORE.snapshot(), now=1_000_000)
+    app.update_state(lambda st: (_exercise(st, "situps"), True))
+    app.BACKUPS.add("_default", app.STORE.snapshot(), now=2_000_000)
+    app.update_state(lambda st: (_exercise(st, "pushups"), True))
+
+    runner = app.app.test_cli_runner()
+    at = datetime.fromtimestamp(1_500_000).isoformat()
+    result = runner.invoke(args=["restore-backup", "--at", at])
+    assert result.exit_code == 0, result.output
+    assert done() == {"squats"}
+    # der Stand vor dem Zurückspielen wurde mitgesichert und lässt sich zurückholen
+    assert len(app.BACKUPS.catalog("_default")) == 3
+    result = runner.invoke(args=["restore-backup"])
+    assert result.exit_code == 0, result.output
+    assert done() == {"squats", "situps", "pushups"}
+    assert runner.invoke(args=["restore-backup", "--at", datetime.fromtimestamp(10).isoformat()]).exit_code != 0
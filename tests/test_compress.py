@@ -0,0 +1,66 @@
+import gzip
+
+import pytest
+
+import app
+import serializer
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.1", "br"),  # br bevorzugt, solange erlaubt
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("*;q=0", None),
+    ("identity", None),
+    ("*", "br"),
+    ("GZIP;q=0.5", "gzip"),
+    ("", None),
+    (None, None),
+])
+def test_negotiate(header, expected, monkeypatch):
+    monkeypatch.setattr(serializer, "ENCODINGS", ("br", "gzip"))
+    assert serializer.negotiate(header) == expected
+
+
+def test_negotiate_skips_br_without_brotli(monkeypatch):
+    monkeypatch.setattr(serializer, "ENCODINGS", ("gzip",))
+    assert serializer.negotiate("br, gzip") == "gzip"
+    assert serializer.negotiate("br") is None
+
+
+def test_state_is_gzipped_with_vary_and_weak_etag():
+    client = app.app.test_client()
+    plain = client.get("/api/state?role=mann")
+    assert len(plain.get_data()) >= app.COMPRESS_MIN_BYTES
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    packed = client.get("/api/state?role=mann", headers={"Accept-Encoding": "gzip"})
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in packed.headers["Vary"]
+    assert packed.headers["ETag"].startswith("W/")
+    assert gzip.decompress(packed.get_data()) == plain.get_data()
+
+
+def test_identity_when_gzip_is_refused():
+    resp = app.app.test_client().get("/api/state?role=mann", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in resp.headers
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert serializer.loads(resp.get_data())["version"] >= 1
+
+
+def test_small_responses_stay_uncompressed(monkeypatch):
+    monkeypatch.setattr(app, "COMPRESS_MIN_BYTES", 10**9)
+    resp = app.app.test_client().get("/api/state?role=mann", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert "Accept-Encoding" not in resp.headers.get("Vary", "")
+
+
+def test_not_modified_is_not_compressed():
+    client = app.app.test_client()
+    first = client.get("/api/state?role=mann", headers={"Accept-Encoding": "gzip"})
+    resp = client.get("/api/state?role=mann", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+    assert resp.status_code == 304
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_data() == b""
@@ -0,0 +1,100 @@
+import app
+
+
+def _finish_day(state, person):
+    for ex in app.EXERCISES:
+        app._apply_exercise(state, person, ex)
+    app._update_today(state, person)
+
+
+def test_cant_after_done_keeps_history_consistent():
+    state = app._initial_state()
+    ids = app.member_ids(state)
+    for _ in range(12):
+        for p in ids:
+            _finish_day(state, p)
+        assert app._reduce_nextday(state) == (None, True)
+
+    first = ids[0]
+    _finish_day(state, first)
+    credited = dict(state["reps"][first])
+    _, status = app._apply_cant(state, first, app.CANT_PASSWORD)
+    assert status == "ok"
+    assert state["reps"][first]["squats"] == credited["squats"] - app.CANT_REDUCTION
+    assert app.check_history(state) == []
+
+    app._update_today(state, first)
+    for p in ids[1:]:
+        _finish_day(state, p)
+    assert app._reduce_nextday(state) == (None, True)
+    assert app.check_history(state) == []
+    hist = app.DayHistory(state["history"])
+    assert hist.reps(first, "squats")[-1] == credited["squats"]
+
+
+def test_undo_after_cant_removes_credited_reps():
+    state = app._initial_state()
+    first = app.member_ids(state)[0]
+    app._apply_exercise(state, first, "squats")
+    app._apply_cant(state, first, app.CANT_PASSWORD)
+    app._apply_exercise_undo(state, first, "squats")
+    assert state["overall"][first]["squats"] == 0
+    assert state["credited"][first]["squats"] == 0
+
+
+def test_migration_derives_credited_from_done():
+    state = app._initial_state()
+    first = app.member_ids(state)[0]
+    app._apply_exercise(state, first, "situps")
+    del state["credited"]
+    state["schema_version"] = 4
+    app.migrate_state(state)
+    assert state["credited"][first] == {"squats": 0, "situps": app.START_REPS, "pushups": 0}
+
+
+def _play_day(state):
+    for p in app.member_ids(state):
+        _finish_day(state, p)
+    return app._reduce_nextday(state)
+
+
+def _journal_lines(path):
+    with open(path, "rb") as f:
+        return f.read().splitlines()
+
+
+def test_nextday_journals_only_the_new_day(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = app.JsonFileStore(path, app._initial_state, app._normalize_state, journal=True,
+                              compact_bytes=1 << 30, fsync_ms=0, compact=app._compact_snapshot)
+    sizes = []
+    for _ in range(300):
+        store.update(_play_day)
+        sizes.append(len(_journal_lines(path + ".journal")[-1]))
+    # bis auf längere Zahlen konstant statt proportional zur Länge der Historie
+    assert sizes[-1] <= sizes[9] + 64
+
+    fresh = app.JsonFileStore(path, app._initial_state, app._normalize_state, journal=True)
+    state = fresh.load()
+    assert state["day"] == 301
+    assert app.check_history(state) == []
+    hist = app.DayHistory(state["history"])
+    assert list(hist.reps(app.member_ids(state)[0], "squats")) == list(range(app.START_REPS, app.START_REPS + 300))
+
+
+def test_snapshot_merges_history_blocks(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = app.JsonFileStore(path, app._initial_state, app._normalize_state, journal=True,
+                              compact_bytes=1, fsync_ms=0, compact=app._compact_snapshot)
+    for _ in range(20):
+        store.update(_play_day)
+    store._compact()
+    raw = store.snapshot(normalize=False)
+    assert all(len(chunks) == 1 for chunks in raw["history"]["columns"].values())
+    state = store.snapshot()
+    expected = app.DayHistory(store.load()["history"])
+    actual = app.DayHistory(state["history"])
+    for p in app.member_ids(state):
+        for ex in app.EXERCISES:
+            assert actual.reps(p, ex) == expected.reps(p, ex)
+        assert actual.statuses(p) == expected.statuses(p)
@@ -0,0 +1,46 @@
+import sqlite3
+
+import app
+from storage import SqliteStore
+
+
+def _post(client, body, key):
+    return client.post("/api/action", json=body, headers={"Idempotency-Key": key})
+
+
+def test_reused_key_with_other_payload_is_rejected():
+    client = app.app.test_client()
+    squats = {"role": "mann", "action": "exercise", "exercise": "squats"}
+    first = _post(client, squats, "k1")
+    assert first.status_code == 200
+
+    replay = _post(client, squats, "k1")
+    assert replay.status_code == 200
+    assert replay.get_json()["message"] == first.get_json()["message"]
+
+    undo = _post(client, {"role": "mann", "action": "exercise_undo", "exercise": "squats"}, "k1")
+    assert undo.status_code == 422
+    assert app.load_state()["done"]["male"]["squats"] is True
+    assert app.load_state()["overall"]["male"]["squats"] == first.get_json()["totals"]["mann"]["squats"]
+
+
+def test_legacy_keys_without_fingerprint_still_replay():
+    state = app._initial_state()
+    state["idempotency"] = {"old": {"t": 2**31, "result": ["Squats erledigt.", 200]}}
+    reducer = app._idempotent(lambda st: (("neu", 200), True), "old", app._request_fingerprint("x"))
+    assert reducer(state) == (("Squats erledigt.", 200), False)
+
+
+def test_sqlite_keeps_fingerprint_and_upgrades_old_table(tmp_path):
+    path = str(tmp_path / "state.db")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE idempotency (key TEXT PRIMARY KEY, t INTEGER NOT NULL, result TEXT NOT NULL)")
+    db.commit()
+    db.close()
+
+    store = SqliteStore(path, app._initial_state, app._normalize_state)
+    reducer = app._idempotent(lambda st: (("ok", 200), True), "k", app._request_fingerprint("a"))
+    store.update(reducer)
+
+    fresh = SqliteStore(path, app._initial_state, app._normalize_state).load()
+    assert fresh["idempotency"]["k"]["f"] == app._request_fingerprint("a")
@@ -0,0 +1,83 @@
+import io
+
+import pytest
+
+import app
+import export
+
+
+def _play(state, days):
+    """days Tage spielen: alle erledigen, ein Skip und ein Cant nach dem Abhaken; Tageswechsel per Button."""
+    ids = app.member_ids(state)
+    for _ in range(days):
+        for i, p in enumerate(ids):
+            for ex in app.EXERCISES:
+                app._apply_exercise(state, p, ex)
+            if i == 0 and state["day"] % 12 == 5:
+                assert app._apply_cant(state, p, app.CANT_PASSWORD)[1] == "ok"
+            app._update_today(state, p)
+        assert app._reduce_nextday(state) == (None, True)
+    skipper = ids[-1]
+    assert app._apply_skip(state, skipper)[1] == "ok"
+    app._update_today(state, skipper)
+    app._apply_exercise(state, ids[0], "squats")
+    return state
+
+
+def _roundtrip(state, fmt):
+    text = "".join(export.encode(app.export_rows(state), fmt))
+    return app.import_rows(state, export.decode(io.StringIO(text, newline=""), fmt))
+
+
+@pytest.mark.parametrize("fmt", sorted(export.FORMATS))
+def test_export_import_roundtrip(fmt):
+    # Tag 1 heute: nach 30 Tagen per Button liegt der aktuelle Tag 30 Tage in der Zukunft
+    state = _play(app._initial_state(), 30)
+    assert app.calculate_current_date(state)[0] > app._today()
+
+    imported, errors = _roundtrip(state, fmt)
+    assert errors == []
+    assert app.overall_changes(state, imported) == []
+    for key in ("day", "start_date", "reps", "done", "overall", "credited"):
+        assert imported[key] == state[key], key
+    assert app.check_history(imported) == []
+
+    old, new = app.DayHistory(state["history"]), app.DayHistory(imported["history"])
+    assert (new.first_day, new.days) == (old.first_day, old.days)
+    for p in app.member_ids(state):
+        for ex in app.EXERCISES:
+            assert new.reps(p, ex) == old.reps(p, ex)
+        assert new.done_masks(p) == old.done_masks(p)
+        assert new.statuses(p) == old.statuses(p)
+        for kind in ("skip", "cant"):
+            assert app.calendar(imported, p).count(kind) == app.calendar(state, p).count(kind)
+
+
+def test_import_reports_overall_changes():
+    state = _play(app._initial_state(), 3)
+    edited = _play(app._initial_state(), 3)
+    first = app.member_ids(edited)[0]
+    app._apply_exercise(edited, first, "pushups")
+
+    imported, errors = app.import_rows(state, [(n, dict(zip(export.FIELDS, row))) for n, row in
+                                               enumerate(app.export_rows(edited), 2)])
+    assert errors == []
+    role = app._role_label(state, first)
+    assert app.overall_changes(state, imported) == [
+        (role, "pushups", state["overall"][first]["pushups"], state["overall"][first]["pushups"] + state["reps"][first]["pushups"]),
+    ]
+
+
+def test_http_import_needs_admin_password(monkeypatch):
+    client = app.app.test_client()
+    text = "".join(export.encode(app.export_rows(app.load_state()), "csv"))
+
+    def post(password):
+        return client.post("/api/import?dry_run=1", data=text, content_type="text/csv",
+                           headers={"X-Workout-Password": password})
+
+    monkeypatch.setattr(app, "ADMIN_PASSWORD", "")
+    assert post(app.CANT_PASSWORD).status_code == 403
+    monkeypatch.setattr(app, "ADMIN_PASSWORD", "s3cret")
+    assert post(app.CANT_PASSWORD).status_code == 403
+    assert post("s3cret").status_code == 200
@@ -0,0 +1,80 @@
+import os
+
+import app
+from leaderboard import LeaderboardIndex
+
+KEY = ("squats", "overall")
+
+
+def _index():
+    return LeaderboardIndex(lambda: [], None, interval=0)
+
+
+def _people(**values):
+    return [(person, {}, {KEY: value}) for person, value in values.items()]
+
+
+def _ranking(index, n=10):
+    return [(rank, scope, person, value) for rank, scope, person, _, value in index.top(*KEY, n)]
+
+
+def test_replace_reorders_after_an_update():
+    index = _index()
+    index._replace("a", _people(mann=10, frau=30))
+    index._replace("b", _people(mann=20))
+    assert _ranking(index) == [(1, "a", "frau", 30), (2, "b", "mann", 20), (3, "a", "mann", 10)]
+
+    index._replace("a", _people(mann=40, frau=5))
+    assert _ranking(index) == [(1, "a", "mann", 40), (2, "b", "mann", 20), (3, "a", "frau", 5)]
+    assert _ranking(index, 1) == [(1, "a", "mann", 40)]
+    assert len(index._lists[KEY]) == 3  # alte Einträge sind weg, nicht doppelt
+
+
+def test_replace_with_nothing_removes_the_scope():
+    index = _index()
+    index._replace("a", _people(mann=10))
+    index._replace("b", _people(mann=20, frau=15))
+    index._replace("b", [])
+    assert _ranking(index) == [(1, "a", "mann", 10)]
+    assert index.instances() == 1
+    assert ("b", "frau") not in index._info
+
+
+def test_ties_share_a_rank():
+    index = _index()
+    index._replace("a", _people(mann=20, frau=10))
+    index._replace("b", _people(mann=20, frau=10))
+    index._replace("c", _people(mann=5))
+    assert [(rank, value) for rank, _, _, value in _ranking(index)] == [(1, 20), (1, 20), (3, 10), (3, 10), (5, 5)]
+    index._replace("a", _people(mann=10, frau=10))  # Gleichstand beim Entfernen trifft nur den eigenen Eintrag
+    assert _ranking(index) == [
+        (1, "b", "mann", 20), (2, "a", "frau", 10), (2, "a", "mann", 10), (2, "b", "frau", 10), (5, "c", "mann", 5),
+    ]
+
+
+def test_refresh_reuses_stores_and_reads_only_changed_instances():
+    opened, snapshots = [], []
+
+    def sources():
+        def open_store():
+            store = app._make_store()
+            opened.append(store)
+            snapshot = store.snapshot
+            store.snapshot = lambda: snapshots.append(1) or snapshot()
+            return store
+        return [(app.DEFAULT_SCOPE, open_store)]
+
+    app.update_state(lambda st: (None, True))
+    index = LeaderboardIndex(sources, app._leaderboard_values, interval=0)
+    assert index.refresh() == 1
+    assert index.refresh() == 0
+    assert (len(opened), len(snapshots)) == (1, 1)
+
+    app.update_state(lambda st: (app._apply_exercise(st, "male", "squats"), True))
+    mtime = app.STORE.mtime_ns()
+    for path in app.STORE.paths():  # grobe mtime-Auflösung mancher Dateisysteme
+        if os.path.exists(path):
+            os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+    assert index.refresh() == 1
+    assert (len(opened), len(snapshots)) == (1, 2)
+    assert _ranking(index)[0][2:] == ("mann", app._leaderboard_values(app.load_state())[0][2][KEY])
@@ -0,0 +1,85 @@
+import json
+import os
+
+import app
+from metrics import BUCKETS, Metrics
+
+
+def _dead_pid():
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - läuft im Kind
+        os._exit(0)
+    os.waitpid(pid, 0)
+    return pid
+
+
+def _write_worker(directory, pid, counters=(), histograms=()):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"worker-{pid}.json"), "w", encoding="utf-8") as f:
+        json.dump({"counters": list(counters), "histograms": list(histograms)}, f)
+
+
+def test_render_prometheus_text(tmp_path):
+    metrics = Metrics(str(tmp_path), help_texts={"req_total": "Requests."})
+    metrics.inc("req_total", (("path", 'a"b'),))
+    metrics.inc("req_total", (("path", 'a"b'),), 2)
+    metrics.observe("lat_seconds", 0.003)
+    metrics.observe("lat_seconds", 10.0)
+    lines = metrics.render(gauges=[("size_bytes", (), 42)]).splitlines()
+
+    assert lines[:3] == ["# HELP req_total Requests.", "# TYPE req_total counter", 'req_total{path="a\\"b"} 3']
+    assert "# TYPE lat_seconds histogram" in lines
+    assert 'lat_seconds_bucket{le="0.0025"} 0' in lines
+    assert 'lat_seconds_bucket{le="0.005"} 1' in lines
+    assert f'lat_seconds_bucket{{le="{BUCKETS[-1]!r}"}} 1' in lines
+    assert 'lat_seconds_bucket{le="+Inf"} 2' in lines
+    assert "lat_seconds_sum 10.003000" in lines
+    assert "lat_seconds_count 2" in lines
+    assert lines[-2:] == ["# TYPE size_bytes gauge", "size_bytes 42"]
+
+
+def test_counters_of_dead_workers_never_go_down(tmp_path):
+    directory = str(tmp_path)
+    metrics = Metrics(directory)
+    hist = [0] * len(BUCKETS) + [1, 3.0]
+    first, second = _dead_pid(), _dead_pid()
+    _write_worker(directory, first, [["req_total", [], 5]], [["lat_seconds", [], hist]])
+    _write_worker(directory, os.getppid(), [["req_total", [], 1]])  # lebt
+
+    counters, histograms = metrics._collect()
+    assert counters[("req_total", ())] == 6
+    assert histograms[("lat_seconds", ())][-2:] == [1, 3.0]
+    assert not os.path.exists(os.path.join(directory, f"worker-{first}.json"))
+
+    assert metrics._collect()[0][("req_total", ())] == 6  # nicht doppelt
+    _write_worker(directory, second, [["req_total", [], 2]])
+    counters, histograms = metrics._collect()
+    assert counters[("req_total", ())] == 8
+    assert histograms[("lat_seconds", ())][-2:] == [1, 3.0]
+    with open(os.path.join(directory, "retired.json"), encoding="utf-8") as f:
+        assert json.load(f)["counters"] == [["req_total", [], 7]]
+
+
+def test_metrics_need_the_token(monkeypatch):
+    client = app.app.test_client()
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/api/cache-stats").status_code == 403
+
+    monkeypatch.setattr(app, "METRICS_TOKEN", "geheim")
+    assert client.get("/metrics", headers={"Authorization": "Bearer falsch"}).status_code == 403
+    assert client.get("/api/cache-stats", headers={"Authorization": "Bearer geheim"}).status_code == 200
+
+
+def test_stage_timings_are_exported(monkeypatch):
+    monkeypatch.setattr(app, "METRICS_TOKEN", "geheim")
+    monkeypatch.setattr(app, "METRICS", Metrics("metrics", help_texts=app.METRICS.help_texts))
+    client = app.app.test_client()
+    client.post("/api/action", json={"role": "mann", "action": "exercise", "exercise": "squats"})
+    client.get("/api/state?role=mann")
+    body = client.get("/metrics", headers={"Authorization": "Bearer geheim"}).get_data(as_text=True)
+
+    assert "# TYPE workout_stage_seconds histogram" in body
+    for stage in ("update", "write", "build"):
+        assert f'workout_stage_seconds_count{{stage="{stage}"}}' in body
+    assert "# TYPE workout_http_requests_total counter" in body
+    assert "workout_state_bytes " in body
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+import app
+import projection
+from daycalendar import encode_days
+
+
+def _random_state(rng):
+    """Zufälliger Stand: Tag, Reps (auch nahe der Untergrenze), erledigte Übungen, Skip-/Cant-Tage."""
+    state = app._initial_state()
+    day = rng.randint(1, 200)
+    state["day"] = day
+    for p in app.member_ids(state):
+        for ex in app.EXERCISES:
+            state["reps"][p][ex] = rng.choice([1, 2, rng.randint(1, 40)])
+            state["done"][p][ex] = rng.random() < 0.5
+            state["overall"][p][ex] = rng.randint(0, 5000)
+        lanes = {}
+        skips = sorted(rng.sample(range(1, day + 1), min(day, rng.randint(0, day // 7 + 1))))
+        if skips:
+            lanes["skip"] = encode_days(skips)
+        if rng.random() < 0.5:
+            lanes["cant"] = encode_days([rng.randint(max(1, day - 12), day)])
+        state["calendar"][p] = lanes
+    app._recount_today(state)
+    return state
+
+
+def _python_engine(reps0, overall0, schedules, days):
+    return {
+        name: projection._project_python(reps0, overall0, cant, skip, days, app.CANT_REDUCTION)
+        for name, (cant, skip) in schedules.items()
+    }
+
+
+@pytest.mark.parametrize("seed", range(12))
+@pytest.mark.parametrize("days", [1, 30, 120])
+def test_projection_matches_reducers(seed, days):
+    state = _random_state(random.Random(seed))
+    reps0, overall0, schedules = app._projection_inputs(state, days)
+    simulated = app._simulate_projection(state, schedules, days)
+
+    assert _python_engine(reps0, overall0, schedules, days) == simulated
+    if projection.np is not None:
+        assert projection._project_numpy(reps0, overall0, schedules, days, app.CANT_REDUCTION) == simulated
+    assert app.project(reps0, overall0, schedules, days, app.CANT_REDUCTION) == simulated
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import app
+from ratelimit import RateLimiter, parse_rate
+
+
+def test_parse_rate():
+    assert parse_rate("0.1,5") == (0.1, 5.0)
+    assert parse_rate("3") == (3.0, 3.0)
+
+
+def test_bucket_refills_over_time(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.bin"))
+    assert [limiter.check("a", 1.0, 2.0, now=100.0) for _ in range(2)] == [0.0, 0.0]
+    assert limiter.check("a", 1.0, 2.0, now=100.0) == pytest.approx(1.0)
+    assert limiter.check("b", 1.0, 2.0, now=100.0) == 0.0  # eigener Bucket
+    assert limiter.check("a", 1.0, 2.0, now=100.5) == pytest.approx(0.5)
+    assert limiter.check("a", 1.0, 2.0, now=101.0) == 0.0
+    # nie mehr als burst ansparen
+    assert [limiter.check("a", 1.0, 2.0, now=200.0) for _ in range(3)][2] > 0
+    assert limiter.check("a", 0, 0) == 0.0  # rate 0 = unbegrenzt
+
+
+def test_bucket_is_shared_between_forked_processes(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.bin"))
+    assert limiter.check("client", 0.001, 10.0, now=100.0) == 0.0  # Parent blendet vor dem Fork ein
+
+    children = []
+    for _ in range(2):
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - läuft im Kind
+            allowed = sum(limiter.check("client", 0.001, 10.0, now=100.0) == 0.0 for _ in range(4))
+            os._exit(allowed)
+        children.append(pid)
+    allowed = [os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) for pid in children]
+
+    assert allowed == [4, 4]
+    assert limiter.check("client", 0.001, 10.0, now=100.0) == 0.0  # das zehnte Token
+    assert limiter.check("client", 0.001, 10.0, now=100.0) > 0
+
+
+def test_production_profile_enables_the_limit(monkeypatch):
+    monkeypatch.delenv("WORKOUT_RATE_LIMIT", raising=False)
+    assert app.create_app("production").config["RATE_LIMIT"] is True
+    assert app.create_app("development").config["RATE_LIMIT"] is False
+    monkeypatch.setenv("WORKOUT_RATE_LIMIT", "0")
+    assert app.create_app("production").config["RATE_LIMIT"] is False
+
+
+def test_empty_bucket_answers_429_with_retry_after(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "RATE_LIMITER", RateLimiter(str(tmp_path / "rl.bin")))
+    limits = dict(app.RATE_LIMITS_DEFAULT, read=(0.25, 2.0))
+    client = app.create_app({"PROFILE": "production", "RATE_LIMITS": limits}).test_client()
+
+    assert [client.get("/api/state?role=mann").status_code for _ in range(2)] == [200, 200]
+    limited = client.get("/api/state?role=mann")
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "4"
+    # andere Rolle, anderer Bucket
+    assert client.get("/api/state?role=frau").status_code == 200
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+import pytest
+
+import app
+from history import STATUS_INDEX, DayHistory
+
+
+def _finish(state, internal):
+    for ex in app.EXERCISES:
+        app._apply_exercise(state, internal, ex)
+    app._update_today(state, internal)
+
+
+def _skip_days(state, internal):
+    return app.calendar(state, internal).count("skip")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Kalender verschieben: clock(n) = heute ist n Tage nach dem Start."""
+    start = app._today()
+
+    def shift(days):
+        monkeypatch.setattr(app, "_today", lambda: start + timedelta(days=days))
+
+    return shift
+
+
+def test_advance_days_catches_up_missed_days():
+    state = app._initial_state()
+    _finish(state, "male")
+    app._advance_days(state, 5)
+
+    assert state["day"] == 6
+    assert all(state["reps"][p][ex] == app.START_REPS + 5 for p in ("male", "female") for ex in app.EXERCISES)
+    assert not any(state["done"]["male"].values())
+    hist = DayHistory(state["history"])
+    assert (hist.first_day, hist.days) == (1, 5)
+    assert list(hist.statuses("male")) == [STATUS_INDEX["done"]] + [STATUS_INDEX["open"]] * 4
+    assert list(hist.statuses("female")) == [STATUS_INDEX["open"]] * 5
+    # verpasste Tage mit dem Ziel des jeweiligen Tages, nichts gutgeschrieben
+    assert list(hist.reps("female", "squats")) == [15, 16, 17, 18, 19]
+    assert state["overall"]["female"]["squats"] == 0
+    assert _skip_days(state, "female") == 0
+    assert app.check_history(state) == []
+
+
+def test_advance_days_skip_policy():
+    state = app._initial_state()
+    _finish(state, "male")
+    app._advance_days(state, 5, "skip")
+
+    # offener heutiger Tag und die vier übersprungenen zählen als Skip, erledigte nicht
+    assert _skip_days(state, "female") == 5
+    assert _skip_days(state, "male") == 4
+    assert list(DayHistory(state["history"]).statuses("female")) == [STATUS_INDEX["skip"]] * 5
+    assert app.check_history(state) == []
+
+
+def test_rollover_is_idempotent_on_the_same_calendar_day(clock, monkeypatch):
+    monkeypatch.setattr(app, "ROLLOVER_POLICY", "open")
+    state = app._initial_state()
+    assert app._reduce_rollover(state) == (0, False)
+
+    clock(3)
+    assert app._reduce_rollover(state) == (3, True)
+    assert state["day"] == 4
+    before = app.clone_state(state)
+    assert app._reduce_rollover(state) == (0, False)
+    assert state == before
+
+
+def test_auto_rollover_hook_advances_once(clock, monkeypatch):
+    monkeypatch.setattr(app, "AUTO_ROLLOVER", True)
+    client = app.app.test_client()
+    first = client.get("/api/state").get_json()
+    assert first["day"] == 1
+
+    clock(10)
+    caught_up = client.get("/api/state").get_json()
+    assert caught_up["day"] == 11
+    again = client.get("/api/state").get_json()
+    assert again["version"] == caught_up["version"]
+    # Endpoints ausserhalb von ROLLOVER_ENDPOINTS spulen nicht vor
+    clock(12)
+    client.get("/api/cache-stats")
+    assert app.peek_state()["day"] == 11
+
+    resp = client.post("/api/nextday")
+    assert resp.status_code == 400
+
+
+def test_fastforward_needs_separate_admin_password(monkeypatch):
+    client = app.app.test_client()
+    body = {"days": 3, "password": app.CANT_PASSWORD}
+    monkeypatch.setattr(app, "ADMIN_PASSWORD", "")
+    assert client.post("/api/fastforward", json=body).status_code == 403
+
+    monkeypatch.setattr(app, "ADMIN_PASSWORD", "s3cret")
+    assert client.post("/api/fastforward", json=body).status_code == 403
+    resp = client.post("/api/fastforward", json={"days": 3, "password": "s3cret"})
+    assert resp.status_code == 200
+    assert resp.get_json()["day"] == 4
@@ -0,0 +1,41 @@
+import app
+
+
+def test_recreated_state_gets_new_etag_and_event_id():
+    first, second = app._initial_state(), app._initial_state()
+    assert first["version"] == second["version"]
+    assert app._state_etag(first["epoch"], first["version"], "mann") != app._state_etag(
+        second["epoch"], second["version"], "mann")
+
+    last_id = app._event_id(first["epoch"], 7)
+    assert app._parse_event_id(last_id, first["epoch"]) == 7
+    # Reconnect gegen einen neu angelegten State: kein Anschluss, voller State
+    assert app._parse_event_id(last_id, second["epoch"]) == -1
+    assert app._parse_event_id("7", first["epoch"]) == -1
+    assert app._parse_event_id(None, first["epoch"]) == -1
+
+
+def test_migration_adds_epoch():
+    state = app._initial_state()
+    del state["epoch"]
+    state["schema_version"] = 5
+    migrated = app._normalize_state(state)
+    assert migrated["schema_version"] == app.SCHEMA_VERSION
+    assert len(migrated["epoch"]) == 8
+    assert app._build_client_state(migrated, "mann")["epoch"] == migrated["epoch"]
+
+
+def test_index_renders_group_members():
+    runner = app.app.test_cli_runner()
+    result = runner.invoke(args=["create-group", "wg-index", "--member", "anna:female", "--member", "ben",
+                                 "--member", "cem"])
+    assert result.exit_code == 0, result.output
+
+    html = app.app.test_client().get("/g/wg-index/?view=ben&cem=Cem").get_data(as_text=True)
+    assert 'data-role="ben"' in html
+    assert 'data-member="cem" data-field="crunches"' in html
+    assert "Total Cem" in html and "Total Anna" in html
+    assert "mann" not in html.split("<body", 1)[1].split("<script>", 1)[0]
+
+    html = app.app.test_client().get("/g/wg-index/?view=f").get_data(as_text=True)
+    assert 'data-role="anna"' in html
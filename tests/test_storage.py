@@ -0,0 +1,223 @@
+import multiprocessing
+import sqlite3
+import threading
+
+import pytest
+
+import app
+import serializer
+from storage import JsonFileStore, SqliteStore, StateConflict
+
+
+def _play_day(state):
+    for p in app.member_ids(state):
+        for ex in app.EXERCISES:
+            app._apply_exercise(state, p, ex)
+        app._update_today(state, p)
+    assert app._reduce_nextday(state) == (None, True)
+    return ("ok", 200), True
+
+
+def test_sqlite_history_and_idempotency_in_tables(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = SqliteStore(path, app._initial_state, app._normalize_state)
+    for n in range(40):
+        store.update(app._idempotent(_play_day, f"key-{n}"))
+
+    db = sqlite3.connect(path)
+    assert db.execute("SELECT value FROM meta WHERE key = 'history'").fetchone()[0].find("columns") == -1
+    rows = db.execute("SELECT count(*) FROM history_days").fetchone()[0]
+    assert rows == 40 * len(app.member_ids(app._initial_state())) * (len(app.EXERCISES) + 2)
+    assert db.execute("SELECT count(*) FROM idempotency").fetchone()[0] == 40
+
+    fresh = SqliteStore(path, app._initial_state, app._normalize_state).load()
+    assert fresh["day"] == 41
+    assert list(fresh["idempotency"]) == [f"key-{n}" for n in range(40)]
+    assert app.check_history(fresh) == []
+    assert app._compact_snapshot(fresh)["history"] == app._compact_snapshot(store.load())["history"]
+
+
+def _make(mode, path):
+    if mode == "sqlite":
+        return SqliteStore(path, app._initial_state, app._normalize_state)
+    return JsonFileStore(path, app._initial_state, app._normalize_state, journal=(mode == "journal"),
+                         compact=app._compact_snapshot)
+
+
+def _increment(state):
+    state["overall"]["male"]["pushups"] += 1
+    return None, True
+
+
+def _worker(mode, path, threads, count):
+    # wie ein Gunicorn-Worker: eigener Store, mehrere Threads darauf
+    store = _make(mode, path)
+
+    def run():
+        for _ in range(count):
+            while True:
+                try:
+                    store.update(_increment)
+                    break
+                except StateConflict:
+                    pass
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+@pytest.mark.parametrize("mode", ["file", "journal", "sqlite"])
+def test_concurrent_updates_lose_nothing(tmp_path, mode):
+    path = str(tmp_path / ("state.db" if mode == "sqlite" else "state.json"))
+    base = _make(mode, path).load()["version"]  # State anlegen, bevor die Worker starten
+    procs, threads, count = 4, 4, 25
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_worker, args=(mode, path, threads, count)) for _ in range(procs)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+        assert w.exitcode == 0
+
+    state = _make(mode, path).load()
+    assert state["overall"]["male"]["pushups"] == procs * threads * count
+    assert state["version"] == base + procs * threads * count
+
+
+def _increment_both(state):
+    # eine Aktion, zwei Felder: ein Leser darf nie nur eines davon sehen
+    state["overall"]["male"]["pushups"] += 1
+    state["overall"]["female"]["pushups"] += 1
+    state["history"].setdefault("probe", []).append(state["version"])
+    return None, True
+
+
+def test_peek_never_sees_half_applied_journal_commit(tmp_path):
+    path = str(tmp_path / "state.json")
+    writer = _make("journal", path)
+    other = _make("journal", path)  # zweiter Worker: Tail-Replay im Leser
+    reader = _make("journal", path)
+    reader.load()
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                state = reader.peek()
+                overall = state["overall"]
+                assert overall["male"]["pushups"] == overall["female"]["pushups"]
+                serializer.dumps(state)
+                assert len(state["history"].get("probe", [])) == overall["male"]["pushups"]
+            except Exception as exc:  # noqa: BLE001 - im Haupt-Thread melden
+                errors.append(exc)
+                stop.set()
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for n in range(150):
+        (writer if n % 2 else other).update(_increment_both)
+        reader.update(_increment_both)
+    stop.set()
+    for t in readers:
+        t.join()
+
+    assert errors == []
+    assert reader.load()["overall"]["male"]["pushups"] == 300
+
+
+def test_sqlite_reads_one_snapshot_per_miss(tmp_path):
+    path = str(tmp_path / "state.db")
+    writer = _make("sqlite", path)
+    reader = _make("sqlite", path)  # eigene Verbindung wie ein anderer Worker
+    reader.load()
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                state = reader.peek()
+                overall = state["overall"]
+                assert overall["male"]["pushups"] == overall["female"]["pushups"]
+                assert len(state["history"].get("probe", [])) == overall["male"]["pushups"]
+            except Exception as exc:  # noqa: BLE001 - im Haupt-Thread melden
+                errors.append(exc)
+                stop.set()
+
+    t = threading.Thread(target=read)
+    t.start()
+    for _ in range(1000):
+        writer.update(_increment_both)
+    stop.set()
+    t.join()
+
+    assert errors == []
+
+
+def _open_and_report(path, barrier, queue):
+    barrier.wait()
+    queue.put(_make("sqlite", path).load()["epoch"])
+
+
+def test_sqlite_initial_state_written_once(tmp_path):
+    path = str(tmp_path / "state.db")
+    ctx = multiprocessing.get_context("fork")
+    barrier, queue = ctx.Barrier(6), ctx.Queue()
+    workers = [ctx.Process(target=_open_and_report, args=(path, barrier, queue)) for _ in range(6)]
+    for w in workers:
+        w.start()
+    epochs = {queue.get(timeout=30) for _ in workers}
+    for w in workers:
+        w.join(30)
+    # alle Worker sehen denselben, einmal angelegten State
+    assert len(epochs) == 1
+    assert _make("sqlite", path).load()["version"] == 1
+
+
+@pytest.mark.parametrize("mode", ["file", "journal", "sqlite"])
+def test_cache_hits_share_the_state_and_external_writes_invalidate(tmp_path, mode):
+    path = str(tmp_path / ("state.db" if mode == "sqlite" else "state.json"))
+    reader, writer = _make(mode, path), _make(mode, path)
+    first = reader.load()
+    misses = reader.cache_stats()["misses"]
+    assert reader.load() is first  # Treffer: keine Kopie
+    assert reader.peek() is first
+    assert reader.cache_stats()["hits"] == 2
+
+    writer.update(_increment)  # anderer "Worker"
+    fresh = reader.load()
+    assert fresh is not first
+    assert fresh["overall"]["male"]["pushups"] == first["overall"]["male"]["pushups"] + 1
+    assert fresh["version"] == first["version"] + 1
+    stats = reader.cache_stats()
+    assert stats["misses"] == misses + 1
+    assert stats["hit_rate"] == round(stats["hits"] / (stats["hits"] + stats["misses"]), 4)
+
+    # eigene Updates arbeiten auf einer Kopie, der ausgegebene Stand bleibt
+    reader.update(_increment)
+    assert fresh["overall"]["male"]["pushups"] == first["overall"]["male"]["pushups"] + 1
+    assert reader.load()["overall"]["male"]["pushups"] == fresh["overall"]["male"]["pushups"] + 1
+
+
+def test_cache_stats_count_every_thread(tmp_path):
+    store = _make("file", str(tmp_path / "state.json"))
+    store.load()
+    threads, count = 8, 2000
+
+    def read():
+        for _ in range(count):
+            store.load()
+
+    pool = [threading.Thread(target=read) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    stats = store.cache_stats()
+    assert stats["hits"] + stats["misses"] == threads * count + 1
@@ -0,0 +1,34 @@
+import threading
+
+import app
+import changefeed
+from changefeed import ChangeNotifier
+
+
+def test_streams_capped_per_worker():
+    application = app.create_app({"PROFILE": "development", "STREAMS_PER_WORKER": 1})
+    client = application.test_client()
+
+    first = client.get("/api/stream?role=mann", buffered=False)
+    assert next(first.response).startswith(b"retry: 3000")
+
+    busy = client.get("/api/stream?role=mann").get_data(as_text=True)
+    assert "event: busy" in busy and busy.startswith("retry: ")
+
+    first.close()
+    again = client.get("/api/stream?role=mann", buffered=False)
+    assert next(again.response).startswith(b"retry: 3000")
+    again.close()
+
+
+def test_notifiers_share_one_watcher(tmp_path):
+    notifiers = [ChangeNotifier(str(tmp_path / f"{n}.notify"), poll_interval=0.01) for n in range(5)]
+    seqs = [n.seq() for n in notifiers]
+    assert all(n in changefeed._WATCHER._idle for n in notifiers)
+    assert sum(t.name.endswith("(_run)") for t in threading.enumerate()) == 1
+
+    # Commit eines anderen Workers: nur die Datei ändert sich
+    with open(notifiers[3].path, "w", encoding="utf-8") as f:
+        f.write("7")
+    assert notifiers[3].wait(seqs[3], 2) != seqs[3]
+    assert notifiers[0].wait(seqs[0], 0.05) == seqs[0]